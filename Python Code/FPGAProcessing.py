@@ -1,17 +1,126 @@
-import serial
 import numpy as np
 import scipy.io.wavfile as wav
-import scipy.signal as signal
 import time
+import wave
 import os
 
+from serial_stream import stream_full_duplex, print_stats, baca_tersedia, WINDOW_SIZE
+from stream_resampler import StreamResampler
+# serial, framed_transport, sharded_stream, serial_trace dan capture_log
+# di-import di cabang yang memakainya: replay / PenulisAudio tidak perlu pyserial
+
 # === KONFIGURASI ===
 SERIAL_PORT  = 'COM7'                    # Ganti Port FPGA
 BAUD_RATE    = 2000000                   # 2 Mbps
 INPUT_FM_WAV = 'fm_modulated_signal.wav' # Input dari script pertama
 OUTPUT_FINAL = 'hasil_demodulasi.wav'    # Output audio final
+FULL_DUPLEX  = True                      # True = engine writer/reader paralel (tanpa sleep)
+FRAMED       = False                     # True = protokol frame + CRC, kirim ulang frame yang hilang
+                                         # (butuh FPGA/personality 'framed' di virtual_fpga.py)
+SHARD_PORTS  = []                        # >1 port = sinyal dibagi ke beberapa board sekaligus
+                                         # (mis. ['COM7', 'COM8']), lihat sharded_stream.py
+TARGET_RATE  = 44100                     # Rate audio output (Standar Audio)
+TRACE        = False                     # True = catat tiap write/read -> serial_trace.csv/.json
+WINDOW       = WINDOW_SIZE               # Maks. byte in-flight (mode full-duplex)
+CHUNK_SIZE   = 4096                      # Byte per kirim (mode bergantian)
+SLEEP_TIME   = 0.004                     # Jeda setelah tiap kirim (mode bergantian)
+CAPTURE      = True                      # True = byte TX/RX + konfigurasi dicatat ke CAPTURE_LOG
+CAPTURE_LOG  = 'capture.fmlog'           # Log append-only, lihat capture_log.py
+REPLAY       = None                      # ID sesi di CAPTURE_LOG (-1 = terakhir): proses ulang
+                                         # byte RX terekam tanpa FPGA
+
+class PenulisAudio:
+    """
+    Byte demodulasi (uint8) -> WAV 16-bit, diproses begitu byte datang:
+    view tanpa salinan (np.frombuffer), resample polyphase 200000 -> 44100
+    yang menyimpan state antar potongan, lalu langsung ditulis ke file.
+    """
+
+    def __init__(self, path, fpga_rate, target_rate=TARGET_RATE):
+        self.resampler = StreamResampler(fpga_rate, target_rate)
+        self.f = wave.open(path, 'wb')
+        self.f.setnchannels(1)
+        self.f.setsampwidth(2)
+        self.f.setframerate(target_rate)
+        self.n_out = 0
+
+    def _tulis(self, audio):
+        self.f.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+        self.n_out += len(audio)
+
+    def tulis(self, data):
+        rx_array = np.frombuffer(data, dtype=np.uint8)
+        # Unsigned (0..255) -> Float Audio (-1.0..1.0)
+        audio = (rx_array.astype(np.float32) - 128.0) / 128.0
+        self._tulis(self.resampler.process(audio))
+
+    def tutup(self):
+        self._tulis(self.resampler.flush())
+        self.f.close()
+
+def stream_bergantian(ser, tx_bytes, tracer=None):
+    """Mode lama: kirim chunk, jeda, lalu baca (TX & RX bergantian)."""
+    rx_data = bytearray()
+
+    for i in range(0, len(tx_bytes), CHUNK_SIZE):
+        chunk = tx_bytes[i:i+CHUNK_SIZE]
+        if tracer is not None:
+            t_write = tracer.now()
+        ser.write(chunk)
+        if tracer is not None:
+            tracer.catat('write', t_write, tracer.now(), len(chunk), i + len(chunk) - len(rx_data))
+        
+        # Jeda kecil untuk stabilitas buffer
+        time.sleep(SLEEP_TIME)
+        
+        # Baca balasan
+        baca_tersedia(ser, rx_data, tracer)
+        
+        # Progress Bar
+        if i % (CHUNK_SIZE*20) == 0:
+            print(f"\rProgress: {(i/len(tx_bytes))*100:.1f}%", end="")
+
+    # Tunggu sisa data
+    retry = 0
+    while len(rx_data) < len(tx_bytes) and retry < 50:
+        if ser.in_waiting:
+            baca_tersedia(ser, rx_data, tracer)
+            retry = 0
+        else:
+            if tracer is not None:
+                t_wait = tracer.now()
+            time.sleep(0.05)
+            if tracer is not None:
+                tracer.catat('stall', t_wait, tracer.now())
+            retry += 1
+    if tracer is not None:
+        tracer.catat_sisa(len(tx_bytes), len(rx_data))
+    return rx_data
+
+def replay(sesi):
+    """Byte RX sesi terekam -> OUTPUT_FINAL, lewat PenulisAudio yang sama, secepat disk."""
+    from capture_log import buka_replay
+    try:
+        reader, sesi = buka_replay(CAPTURE_LOG, sesi)
+        info = reader.info(sesi)
+    except (OSError, ValueError) as e:
+        print(f"Replay gagal: {e}")
+        return
+    fpga_rate = info['config'].get('FPGA_RATE', 200000)
+    print(f"Replay sesi {sesi} ({info.get('script', '?')}, {info.get('waktu', '?')}) dari {CAPTURE_LOG}...")
+    penulis = PenulisAudio(OUTPUT_FINAL, fpga_rate)
+    start_time = time.time()
+    n = reader.replay(sesi, penulis.tulis)
+    penulis.tutup()
+    elapsed = time.time() - start_time
+    print(f"Replay {n} bytes dalam {elapsed:.2f} detik ({n/max(elapsed, 1e-9)/1e6:.1f} MB/s)")
+    print(f"BERHASIL! Audio tersimpan di: {OUTPUT_FINAL} ({penulis.n_out} sampel @ {TARGET_RATE} Hz)")
 
 def main():
+    if REPLAY is not None:
+        replay(REPLAY)
+        return
+
     # 1. BACA FILE SINYAL FM
     if not os.path.exists(INPUT_FM_WAV):
         print(f"Error: '{INPUT_FM_WAV}' tidak ditemukan.")
@@ -19,7 +128,7 @@ def main():
         return
 
     print(f"Membaca file modulasi: {INPUT_FM_WAV}...")
-    fpga_rate, fm_data = wav.read(INPUT_FM_WAV)
+    fpga_rate, fm_data = wav.read(INPUT_FM_WAV, mmap=True)
 
     # Pastikan data bertipe uint8 (0-255)
     if fm_data.dtype != np.uint8:
@@ -27,10 +136,26 @@ def main():
         # Jika terbaca int16, konversi paksa ke uint8
         fm_data = (fm_data / 256 + 128).astype(np.uint8)
 
-    tx_bytes = fm_data.tobytes()
+    tx_bytes = memoryview(np.ascontiguousarray(fm_data)).cast('B')
     print(f"Siap mengirim {len(tx_bytes)} bytes ke FPGA...")
 
+    if len(SHARD_PORTS) > 1:
+        # Tiap board memproses satu segmen secara paralel, hasil disambung
+        print(f"Mode sharding: {len(SHARD_PORTS)} board ({', '.join(SHARD_PORTS)})")
+        from sharded_stream import stream_sharded
+        try:
+            rx_data, _ = stream_sharded(SHARD_PORTS, tx_bytes, BAUD_RATE)
+        except Exception as e:
+            print(f"Streaming gagal: {e}")
+            return
+        penulis = PenulisAudio(OUTPUT_FINAL, fpga_rate)
+        penulis.tulis(rx_data)
+        penulis.tutup()
+        print(f"BERHASIL! Audio tersimpan di: {OUTPUT_FINAL} ({penulis.n_out} sampel @ {TARGET_RATE} Hz)")
+        return
+
     # 2. BUKA KONEKSI UART
+    import serial
     try:
         ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=2)
         ser.reset_input_buffer()
@@ -38,61 +163,57 @@ def main():
     except Exception as e:
         print(f"Gagal membuka port: {e}")
         return
+    log = None
+    if CAPTURE:
+        # Semua byte yang lewat port dicatat, bisa diproses ulang dengan REPLAY
+        from capture_log import mulai_capture, konfigurasi
+        ser, log = mulai_capture(ser, CAPTURE_LOG, 'FPGAProcessing',
+                                 dict(konfigurasi(globals()), FPGA_RATE=int(fpga_rate)))
 
     # 3. KIRIM & TERIMA (STREAMING)
+    # Konversi balik ke audio berjalan selama byte masih datang
+    penulis = PenulisAudio(OUTPUT_FINAL, fpga_rate)
+    tracer = None
+    if TRACE:
+        from serial_trace import SerialTracer, print_ringkasan
+        tracer = SerialTracer()
     print("Mulai streaming ke FPGA...")
-    rx_data = bytearray()
-    CHUNK_SIZE = 4096
-    
-    start_time = time.time()
-
-    for i in range(0, len(tx_bytes), CHUNK_SIZE):
-        chunk = tx_bytes[i:i+CHUNK_SIZE]
-        ser.write(chunk)
-        
-        # Jeda kecil untuk stabilitas buffer
-        time.sleep(0.004)
-        
-        # Baca balasan
-        while ser.in_waiting > 0:
-            rx_data.extend(ser.read(ser.in_waiting))
-        
-        # Progress Bar
-        if i % (CHUNK_SIZE*20) == 0:
-            print(f"\rProgress: {(i/len(tx_bytes))*100:.1f}%", end="")
-
-    # Tunggu sisa data
-    retry = 0
-    while len(rx_data) < len(tx_bytes) and retry < 50:
-        if ser.in_waiting:
-            rx_data.extend(ser.read(ser.in_waiting))
-            retry = 0
+    try:
+        if FRAMED:
+            # Output dirakit per frame, baru diubah ke audio setelah semua frame lengkap
+            from framed_transport import stream_framed, print_framed_stats
+            rx_data, fstats = stream_framed(ser, tx_bytes)
+            print_framed_stats(fstats)
+            penulis.tulis(rx_data)
+        elif FULL_DUPLEX:
+            # Writer & reader jalan bersamaan, dibatasi window sebesar FIFO FPGA
+            print(f"Mode full-duplex, window {WINDOW} bytes")
+            try:
+                rx_data, stats = stream_full_duplex(ser, tx_bytes, window=WINDOW,
+                                                   on_data=penulis.tulis, tracer=tracer)
+            except Exception as e:
+                print(f"Streaming gagal: {e}")
+                return
+            print_stats(stats)
         else:
-            time.sleep(0.05)
-            retry += 1
-    
-    ser.close()
+            rx_data = stream_bergantian(ser, tx_bytes, tracer)
+            penulis.tulis(rx_data)
+    finally:
+        ser.close()
+        penulis.tutup()
+        if log is not None:
+            log.close()
+        if tracer is not None:
+            print_ringkasan(tracer.ringkasan())
+            print(f"Trace tersimpan di: {', '.join(tracer.simpan())}")
+
     print(f"\nSelesai! Dikirim: {len(tx_bytes)}, Diterima: {len(rx_data)}")
 
     if len(rx_data) == 0:
         print("Data kosong diterima dari FPGA.")
         return
 
-    # 4. KONVERSI BALIK KE AUDIO
-    print("Memproses hasil demodulasi...")
-    rx_array = np.array(list(rx_data), dtype=np.uint8)
-    
-    # Unsigned (0..255) -> Float Audio (-1.0..1.0)
-    audio_recovered = (rx_array.astype(float) - 128.0) / 128.0
-
-    # Downsample ke 44.1 kHz (Standar Audio)
-    TARGET_RATE = 44100
-    num_samples_out = int(len(audio_recovered) * TARGET_RATE / fpga_rate)
-    audio_final = signal.resample(audio_recovered, num_samples_out)
-
-    # Simpan
-    wav.write(OUTPUT_FINAL, TARGET_RATE, (audio_final * 32767).astype(np.int16))
-    print(f"BERHASIL! Audio tersimpan di: {OUTPUT_FINAL}")
+    print(f"BERHASIL! Audio tersimpan di: {OUTPUT_FINAL} ({penulis.n_out} sampel @ {TARGET_RATE} Hz)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
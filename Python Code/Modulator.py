@@ -2,6 +2,11 @@ import numpy as np
 import scipy.io.wavfile as wav
 import scipy.signal as signal
 import os
+import time
+import wave
+
+from stream_resampler import StreamResampler
+from signal_cache import SignalCache
 
 # === KONFIGURASI ===
 INPUT_FILE   = 'Prague.wav'              # File lagu/suara asli
@@ -9,8 +14,152 @@ OUTPUT_FM    = 'fm_modulated_signal.wav'# File output berisi sinyal FM
 FPGA_RATE    = 200000                   # Sample rate sistem (200 kSps)
 CARRIER_FREQ = 50000                    # 50 kHz
 DEV_FREQ     = 5000                     # 5 kHz Deviation
+STREAM_MODE  = True                     # True = proses per blok (memori konstan)
+BLOCK_SIZE   = 65536                    # Jumlah sampel input per blok (mode stream)
+DDS_MODE     = False                    # True = phase accumulator uint32 + LUT nco.vhd (mode stream)
+USE_CACHE    = True                     # Simpan hasil modulasi, pakai ulang jika input & setting sama
+
+def baca_blok_mono(audio_data, block_size):
+    """Generator blok audio mono (kanal pertama) dari array WAV (bisa memmap)."""
+    for i in range(0, len(audio_data), block_size):
+        blok = audio_data[i:i+block_size]
+        if len(blok.shape) > 1:
+            blok = blok[:, 0]
+        yield blok
+
+def modulasi_blok(audio_resampled, phase):
+    """
+    Modulasi FM satu blok audio (sudah di FPGA_RATE) dengan fase awal 'phase'.
+    Mengembalikan (sampel uint8, fase akhir dibatasi 0..2pi agar presisi tidak turun).
+    """
+    if len(audio_resampled) == 0:
+        return np.zeros(0, dtype=np.uint8), phase
+    d_phase = 2 * np.pi * (CARRIER_FREQ + DEV_FREQ * audio_resampled) / FPGA_RATE
+    inst_phase = phase + np.cumsum(d_phase)
+    fm_signal = 127.5 + 127.5 * np.sin(inst_phase)
+    return fm_signal.astype(np.uint8), inst_phase[-1] % (2 * np.pi)
+
+def stream_modulasi(audio_data, orig_rate, block_size=None):
+    """
+    Generator mode streaming: yield (audio_resampled, fm_uint8) per blok.
+    Audio dinormalisasi ke -1..1 (pass pertama mencari nilai puncak),
+    di-resample polyphase ke FPGA_RATE, lalu dimodulasi dengan fase kontinu.
+    """
+    block_size = block_size or BLOCK_SIZE
+    max_val = 0.0
+    for blok in baca_blok_mono(audio_data, block_size):
+        max_val = max(max_val, float(np.max(np.abs(blok.astype(float)))))
+    skala = 1.0 / max_val if max_val > 0 else 1.0
+
+    resampler = StreamResampler(orig_rate, FPGA_RATE)
+
+    if DDS_MODE:
+        # Integer DDS: sampel FM identik dengan keluaran NCO hardware
+        # (import di sini: dds_modulator membawa fm_golden_model + numba)
+        from dds_modulator import DDSModulator
+        dds = DDSModulator(FPGA_RATE, CARRIER_FREQ, DEV_FREQ)
+        for blok in baca_blok_mono(audio_data, block_size):
+            audio_resampled = resampler.process(blok.astype(float) * skala)
+            yield audio_resampled, dds.process(audio_resampled)
+        audio_resampled = resampler.flush()
+        yield audio_resampled, dds.process(audio_resampled)
+        return
+
+    # Nilai awal dibuat supaya sampel pertama sama dengan rumus di main()
+    phase = -2 * np.pi * CARRIER_FREQ / FPGA_RATE
+
+    for blok in baca_blok_mono(audio_data, block_size):
+        audio_resampled = resampler.process(blok.astype(float) * skala)
+        fm_bytes, phase = modulasi_blok(audio_resampled, phase)
+        yield audio_resampled, fm_bytes
+    audio_resampled = resampler.flush()
+    fm_bytes, phase = modulasi_blok(audio_resampled, phase)
+    yield audio_resampled, fm_bytes
+
+def main_streaming(input_file=None, output_fm=None):
+    """
+    Mode streaming: baca input per blok, resample polyphase (L/M),
+    modulasi dengan fase kontinu, lalu langsung tulis ke WAV output.
+    Memori tetap kecil berapapun panjang filenya.
+    """
+    input_file = input_file or INPUT_FILE
+    output_fm = output_fm or OUTPUT_FM
+    if not os.path.exists(input_file):
+        print(f"Error: '{input_file}' tidak ditemukan.")
+        return
+
+    # 1. BUKA AUDIO ASLI (memmap, tidak dimuat semua ke RAM)
+    print(f"Membaca audio (streaming): {input_file}...")
+    orig_rate, audio_data = wav.read(input_file, mmap=True)
+    start_time = time.time()
+
+    cache = SignalCache() if USE_CACHE else None
+    if cache is not None:
+        params = {'FPGA_RATE': FPGA_RATE, 'CARRIER_FREQ': CARRIER_FREQ,
+                  'DEV_FREQ': DEV_FREQ, 'DDS_MODE': DDS_MODE}
+        if DDS_MODE:
+            from fm_golden_model import nco_lut_hash
+            params['NCO_LUT'] = nco_lut_hash()      # Tabel baru = sinyal DDS baru
+        key = cache.key('modulator', params, input_file)
+        cached = cache.load(key)
+        if cached is not None:
+            # Hasil modulasi sudah ada: langsung salin dari .npy (mmap) ke WAV
+            print(f"Memakai cache modulasi ({key})")
+            fm_all = cached['fm']
+            with wave.open(output_fm, 'wb') as f_out:
+                f_out.setnchannels(1)
+                f_out.setsampwidth(1)
+                f_out.setframerate(FPGA_RATE)
+                for i in range(0, len(fm_all), BLOCK_SIZE * 16):
+                    f_out.writeframes(fm_all[i:i + BLOCK_SIZE * 16].tobytes())
+            elapsed = time.time() - start_time
+            print(f"Selesai! {len(fm_all)} sampel FM ditulis ke '{output_fm}' dalam {elapsed:.2f} detik")
+            return len(fm_all)
+
+        # Hasil ditulis juga ke .npy cache selama streaming (panjang output sudah diketahui)
+        n_total = StreamResampler(orig_rate, FPGA_RATE).output_length(len(audio_data))
+        tmp_dir = cache.begin(key)
+        fm_cache = np.lib.format.open_memmap(os.path.join(tmp_dir, 'fm.npy'), mode='w+',
+                                             dtype=np.uint8, shape=(n_total,))
+
+    # 2 & 3. RESAMPLE + MODULASI PER BLOK
+    print(f"Resampling ke {FPGA_RATE} Hz & modulasi FM per blok ({BLOCK_SIZE} sampel, "
+          f"{'DDS integer' if DDS_MODE else 'float'})...")
+    n_out = 0
+
+    # 4. TULIS WAV 8-BIT SECARA BERTAHAP
+    print(f"Menyimpan sinyal ter-modulasi ke '{output_fm}'...")
+    with wave.open(output_fm, 'wb') as f_out:
+        f_out.setnchannels(1)
+        f_out.setsampwidth(1)          # 8-bit unsigned
+        f_out.setframerate(FPGA_RATE)
+
+        for _, fm_bytes in stream_modulasi(audio_data, orig_rate):
+            f_out.writeframes(fm_bytes.tobytes())
+            if cache is not None:
+                fm_cache[n_out:n_out + len(fm_bytes)] = fm_bytes
+            n_out += len(fm_bytes)
+
+    if cache is not None:
+        fm_cache.flush()
+        del fm_cache
+        if n_out == n_total:
+            cache.commit(key, tmp_dir, 'modulator', params)
+        else:
+            cache.abort(tmp_dir)
+
+    elapsed = time.time() - start_time
+    print(f"Selesai! {len(audio_data)} sampel input -> {n_out} sampel FM dalam {elapsed:.2f} detik")
+    if elapsed > 0:
+        print(f"Throughput: {len(audio_data)/elapsed:,.0f} sampel input/detik, "
+              f"{n_out/elapsed:,.0f} sampel output/detik")
+    return n_out
 
 def main():
+    if STREAM_MODE:
+        main_streaming()
+        return
+
     if not os.path.exists(INPUT_FILE):
         print(f"Error: '{INPUT_FILE}' tidak ditemukan.")
         return
@@ -6,7 +6,129 @@ import os
 
 # CONFIGURATION
 # You can change this to 'fm_signal.wav' or 'input.wav' too
-FILENAME = 'demodulated_audio.wav' 
+FILENAME = 'demodulated_audio.wav'
+
+# Level-of-detail settings
+LOD_BASE_BLOCK = 64        # Samples per min/max pair at the finest envelope level
+LOD_FACTOR     = 4         # Each coarser level merges this many blocks
+MAX_POINTS     = 4000      # Max min/max pairs (or raw samples) drawn at once
+CHUNK_SIZE     = 1 << 22   # Samples read per pass when building the cache
+
+def cache_path(filename):
+    return filename + '.lod.npz'
+
+def level_histogram(data):
+    """Count every level with bincount (no sort). Returns (values, counts)."""
+    if data.dtype == np.uint8:
+        counts = np.zeros(256, dtype=np.int64)
+        for i in range(0, len(data), CHUNK_SIZE):
+            counts += np.bincount(data[i:i+CHUNK_SIZE], minlength=256)
+        return np.arange(256), counts
+    if data.dtype == np.int16:
+        counts = np.zeros(65536, dtype=np.int64)
+        for i in range(0, len(data), CHUNK_SIZE):
+            counts += np.bincount(data[i:i+CHUNK_SIZE].view(np.uint16) ^ 0x8000, minlength=65536)
+        return np.arange(65536) - 32768, counts
+    # Other formats (int32/float): fall back to unique on the whole array
+    values, counts = np.unique(data, return_counts=True)
+    return values, counts
+
+def build_pyramid(data):
+    """Min/max envelope per LOD_BASE_BLOCK samples, then coarser levels by LOD_FACTOR."""
+    n_blocks = -(-len(data) // LOD_BASE_BLOCK)
+    mins = np.empty(n_blocks, dtype=data.dtype)
+    maxs = np.empty(n_blocks, dtype=data.dtype)
+    step = (CHUNK_SIZE // LOD_BASE_BLOCK) * LOD_BASE_BLOCK
+    for i in range(0, len(data), step):
+        chunk = np.asarray(data[i:i+step])
+        b0 = i // LOD_BASE_BLOCK
+        full = len(chunk) // LOD_BASE_BLOCK
+        if full:
+            blocks = chunk[:full * LOD_BASE_BLOCK].reshape(full, LOD_BASE_BLOCK)
+            mins[b0:b0+full] = blocks.min(axis=1)
+            maxs[b0:b0+full] = blocks.max(axis=1)
+        if len(chunk) % LOD_BASE_BLOCK:
+            tail = chunk[full * LOD_BASE_BLOCK:]
+            mins[b0+full] = tail.min()
+            maxs[b0+full] = tail.max()
+
+    levels = [(mins, maxs)]
+    while len(levels[-1][0]) > MAX_POINTS:
+        lo, hi = levels[-1]
+        pad = (-len(lo)) % LOD_FACTOR
+        lo = np.concatenate((lo, np.repeat(lo[-1:], pad))).reshape(-1, LOD_FACTOR).min(axis=1)
+        hi = np.concatenate((hi, np.repeat(hi[-1:], pad))).reshape(-1, LOD_FACTOR).max(axis=1)
+        levels.append((lo, hi))
+    return levels
+
+def load_or_build_cache(filename, data):
+    """Load the envelope pyramid + histogram next to the WAV, rebuild if the WAV changed."""
+    st = os.stat(filename)
+    path = cache_path(filename)
+    if os.path.exists(path):
+        try:
+            cache = np.load(path)
+            if int(cache['size']) == st.st_size and float(cache['mtime']) == st.st_mtime:
+                n_levels = int(cache['n_levels'])
+                levels = [(cache[f'min_{k}'], cache[f'max_{k}']) for k in range(n_levels)]
+                return levels, cache['hist_values'], cache['hist_counts']
+        except Exception as e:
+            print(f"Cache unreadable ({e}), rebuilding...")
+
+    print("Building level-of-detail cache...")
+    levels = build_pyramid(data)
+    hist_values, hist_counts = level_histogram(data)
+    arrays = {f'min_{k}': lo for k, (lo, _) in enumerate(levels)}
+    arrays.update({f'max_{k}': hi for k, (_, hi) in enumerate(levels)})
+    try:
+        with open(path, 'wb') as f:
+            np.savez(f, size=st.st_size, mtime=st.st_mtime, n_levels=len(levels),
+                     hist_values=hist_values, hist_counts=hist_counts, **arrays)
+    except OSError as e:
+        print(f"Could not write cache: {e}")
+    return levels, hist_values, hist_counts
+
+class EnvelopeView:
+    """Draws only what is visible: raw samples when zoomed in, min/max envelope otherwise."""
+
+    def __init__(self, ax, data, levels):
+        self.ax = ax
+        self.data = data
+        self.levels = levels
+        self.line, = ax.plot([], [], color='blue', linewidth=0.5)
+        self.busy = False
+        ax.set_xlim(0, len(data))
+        self.refresh()
+        ax.callbacks.connect('xlim_changed', lambda _ax: self.refresh())
+
+    def refresh(self):
+        if self.busy:
+            return
+        self.busy = True
+        x0, x1 = self.ax.get_xlim()
+        start = max(0, int(np.floor(x0)))
+        stop = min(len(self.data), int(np.ceil(x1)) + 1)
+
+        if stop - start <= MAX_POINTS:
+            x = np.arange(start, stop)
+            y = np.asarray(self.data[start:stop])
+        else:
+            # Pick the finest level that still fits in MAX_POINTS pairs
+            block = LOD_BASE_BLOCK
+            k = 0
+            while (stop - start) / block > MAX_POINTS and k < len(self.levels) - 1:
+                block *= LOD_FACTOR
+                k += 1
+            lo, hi = self.levels[k]
+            b0, b1 = start // block, min(len(lo), -(-stop // block))
+            x = np.repeat(np.arange(b0, b1) * block + block / 2, 2)
+            y = np.empty(2 * (b1 - b0), dtype=lo.dtype)
+            y[0::2] = lo[b0:b1]
+            y[1::2] = hi[b0:b1]
+
+        self.line.set_data(x, y)
+        self.ax.figure.canvas.draw_idle()
+        self.busy = False
 
 def plot_waveform():
     if not os.path.exists(FILENAME):
@@ -15,37 +137,42 @@ def plot_waveform():
 
     print(f"Loading {FILENAME}...")
     try:
-        fs, data = wav.read(FILENAME)
-        
-        # Diagnostics
+        fs, data = wav.read(FILENAME, mmap=True)
+        if len(data.shape) > 1:
+            data = data[:, 0]
+
+        levels, hist_values, hist_counts = load_or_build_cache(FILENAME, data)
+        present = hist_values[hist_counts > 0]
+
+        # Diagnostics (from the level histogram, no full-array sort)
         print(f"Sample Rate: {fs} Hz")
         print(f"Data Type:   {data.dtype}")
-        print(f"Min Value:   {np.min(data)}")
-        print(f"Max Value:   {np.max(data)}")
-        print(f"Mean Value:  {np.mean(data):.2f}")
-        
+        print(f"Min Value:   {present.min()}")
+        print(f"Max Value:   {present.max()}")
+        print(f"Mean Value:  {np.dot(hist_values.astype(float), hist_counts) / hist_counts.sum():.2f}")
+
         # Calculate Activity
-        unique_vals = np.unique(data)
+        unique_vals = present
         print(f"Unique Levels: {len(unique_vals)}")
         if len(unique_vals) < 10:
              print(f"Values found: {unique_vals}")
-        
+
         if len(unique_vals) == 1 and unique_vals[0] == 128:
             print("\n[DIAGNOSIS]: The file is PERFECT SILENCE (Constant 128).")
             print("This usually means the FPGA logic is stuck in Reset or IDLE.")
-        
+
         # Setup Plot
         plt.figure(figsize=(12, 6))
-        
-        # Plot 1: The Whole Wave
-        plt.subplot(2, 1, 1)
-        plt.plot(data, color='blue', linewidth=0.5)
+
+        # Plot 1: The Whole Wave (envelope, refines when zooming)
+        ax = plt.subplot(2, 1, 1)
+        view = EnvelopeView(ax, data, levels)
         plt.title(f"Waveform: {FILENAME}")
         plt.ylabel("Amplitude (0-255)")
         plt.xlabel("Sample Number")
         plt.grid(True, alpha=0.3)
         plt.ylim(0, 255) # Fixed range for 8-bit audio
-        
+
         # Plot 2: Zoomed in (First 1000 samples)
         plt.subplot(2, 1, 2)
         zoom_range = min(1000, len(data))
@@ -54,7 +181,7 @@ def plot_waveform():
         plt.ylabel("Amplitude")
         plt.xlabel("Sample Number")
         plt.grid(True, alpha=0.3)
-        
+
         plt.tight_layout()
         plt.show()
 
@@ -62,4 +189,4 @@ def plot_waveform():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    plot_waveform()
\ No newline at end of file
+    plot_waveform()
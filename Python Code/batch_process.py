@@ -0,0 +1,217 @@
+import os
+import io
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing as mp
+
+import numpy as np
+import scipy.io.wavfile as wav
+import scipy.signal as signal
+
+import Modulator
+import local_demodulator
+
+# Proses banyak WAV sekaligus: modulasi -> demodulasi software -> skor kualitas,
+# satu file per worker (semua core). Tiap file yang selesai ditandai dengan
+# file JSON hasil di folder output; saat dijalankan ulang, file yang input
+# dan setting-nya tidak berubah dilewati (resume setelah terhenti).
+
+# === KONFIGURASI ===
+INPUT_PATH   = '.'                     # Folder atau pola glob (mis. 'corpus/*.wav')
+OUTPUT_DIR   = 'batch_output'
+SUMMARY_CSV  = 'batch_summary.csv'
+NUM_WORKERS  = None                    # None = semua core
+MAX_LAG      = 0.05                    # Pencarian delay demodulasi maksimum (detik)
+SKIP_START   = 0.05                    # Detik awal (transien filter) tidak dinilai
+
+
+def daftar_file(path):
+    """Folder -> semua *.wav di dalamnya, selain itu dianggap pola glob."""
+    if os.path.isdir(path):
+        files = glob.glob(os.path.join(path, '*.wav'))
+    else:
+        files = glob.glob(path)
+    return sorted(f for f in files if os.path.isfile(f))
+
+
+def parameter_proses():
+    """Setting yang mempengaruhi hasil; berubah = file diproses ulang."""
+    return {
+        'FPGA_RATE': Modulator.FPGA_RATE, 'CARRIER_FREQ': Modulator.CARRIER_FREQ,
+        'DEV_FREQ': Modulator.DEV_FREQ, 'DDS_MODE': Modulator.DDS_MODE,
+        'CHANNEL_BW': local_demodulator.CHANNEL_BW, 'NUM_TAPS': local_demodulator.NUM_TAPS,
+        'AUDIO_RATE': local_demodulator.AUDIO_RATE,
+    }
+
+
+def nama_output(input_wav, output_dir):
+    base = os.path.splitext(os.path.basename(input_wav))[0]
+    return {
+        'fm': os.path.join(output_dir, base + '_fm.wav'),
+        'demod': os.path.join(output_dir, base + '_demod.wav'),
+        'result': os.path.join(output_dir, base + '.json'),
+    }
+
+
+def sudah_terbaru(input_wav, output_dir, params):
+    """Hasil lama (dict) jika semua output ada dan dibuat dari input & setting yang sama."""
+    out = nama_output(input_wav, output_dir)
+    if not all(os.path.exists(p) for p in out.values()):
+        return None
+    try:
+        with open(out['result']) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    st = os.stat(input_wav)
+    if (result.get('input_size') != st.st_size or result.get('input_mtime') != st.st_mtime
+            or result.get('params') != params):
+        return None
+    return result
+
+
+def skor_kualitas(original_wav, demod_wav):
+    """SNR (dB) & korelasi hasil demodulasi terhadap audio asli, setelah delay & gain disesuaikan."""
+    orig_rate, orig = wav.read(original_wav, mmap=True)
+    demod_rate, demod = wav.read(demod_wav, mmap=True)
+    if orig.ndim > 1:
+        orig = orig[:, 0]
+    ref = signal.resample_poly(orig.astype(np.float64), demod_rate, orig_rate)
+    y = demod.astype(np.float64)
+
+    skip = int(SKIP_START * demod_rate)
+    n = min(len(y), len(ref))
+    y, ref = y[skip:n] - np.mean(y[skip:n]), ref[skip:n] - np.mean(ref[skip:n])
+    if len(y) < 16 or not np.any(y) or not np.any(ref):
+        return float('nan'), float('nan'), 0
+
+    max_lag = min(int(MAX_LAG * demod_rate), len(y) - 1)
+    corr = signal.correlate(y, ref, mode='full', method='fft')
+    center = len(y) - 1
+    lag = int(np.argmax(np.abs(corr[center - max_lag:center + max_lag + 1]))) - max_lag
+    if lag >= 0:
+        y_al, r_al = y[lag:], ref[:len(ref) - lag]
+    else:
+        y_al, r_al = y[:len(y) + lag], ref[-lag:]
+
+    gain = np.dot(y_al, r_al) / np.dot(r_al, r_al)
+    resid = y_al - gain * r_al
+    snr = 10 * np.log10(np.sum((gain * r_al) ** 2) / max(np.sum(resid ** 2), 1e-20))
+    korelasi = np.dot(y_al, r_al) / np.sqrt(np.dot(y_al, y_al) * np.dot(r_al, r_al))
+    return float(snr), float(korelasi), lag
+
+
+def proses_file(args):
+    """Worker: modulasi, demodulasi, skor untuk satu file. Output ditulis atomik (tmp -> rename)."""
+    input_wav, output_dir, params = args
+    out = nama_output(input_wav, output_dir)
+    st = os.stat(input_wav)
+    start = time.time()
+    try:
+        tmp_fm, tmp_demod = out['fm'] + '.tmp', out['demod'] + '.tmp'
+        with contextlib.redirect_stdout(io.StringIO()):
+            n_fm = Modulator.main_streaming(input_wav, tmp_fm)
+            if not n_fm:
+                raise RuntimeError("modulasi gagal")
+            local_demodulator.demodulate_streaming(tmp_fm, tmp_demod)
+        if not os.path.exists(tmp_demod):
+            raise RuntimeError("demodulasi gagal")
+        os.replace(tmp_fm, out['fm'])
+        os.replace(tmp_demod, out['demod'])
+
+        snr, korelasi, lag = skor_kualitas(input_wav, out['demod'])
+        result = {
+            'file': os.path.basename(input_wav), 'status': 'ok',
+            'durasi_detik': round(n_fm / Modulator.FPGA_RATE, 2),
+            'snr_db': round(snr, 2), 'korelasi': round(korelasi, 5), 'delay_sampel': lag,
+            'waktu_proses': round(time.time() - start, 2),
+            'input_size': st.st_size, 'input_mtime': st.st_mtime, 'params': params,
+        }
+        # File JSON ditulis paling akhir: penanda file ini sudah selesai
+        with open(out['result'] + '.tmp', 'w') as f:
+            json.dump(result, f, indent=1)
+        os.replace(out['result'] + '.tmp', out['result'])
+    except Exception as e:
+        for tmp in (out['fm'] + '.tmp', out['demod'] + '.tmp'):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        result = {'file': os.path.basename(input_wav), 'status': f"error: {e}",
+                  'waktu_proses': round(time.time() - start, 2)}
+    return result
+
+
+def _init_worker():
+    # Cache modulasi memakai satu index.json; batch punya mekanisme resume sendiri
+    Modulator.USE_CACHE = False
+
+
+def cetak_ringkasan(results):
+    print(f"\n{'File':<30} {'Status':<8} {'Durasi':>8} {'SNR (dB)':>9} {'Korelasi':>9} {'Waktu':>7}")
+    for r in sorted(results, key=lambda r: r['file']):
+        if r['status'] in ('ok', 'skip'):
+            print(f"{r['file']:<30} {r['status']:<8} {r['durasi_detik']:>7.1f}s {r['snr_db']:>9.2f} "
+                  f"{r['korelasi']:>9.4f} {r['waktu_proses']:>6.1f}s")
+        else:
+            print(f"{r['file']:<30} {r['status']}")
+    ok = [r for r in results if r['status'] in ('ok', 'skip')]
+    if ok:
+        print(f"Rata-rata SNR: {np.nanmean([r['snr_db'] for r in ok]):.2f} dB "
+              f"({len(ok)}/{len(results)} file berhasil)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modulasi + demodulasi + skor untuk banyak WAV")
+    parser.add_argument('input', nargs='?', default=INPUT_PATH, help="Folder atau pola glob")
+    parser.add_argument('--out', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS)
+    parser.add_argument('--force', action='store_true', help="Proses ulang semua file")
+    args = parser.parse_args()
+
+    files = daftar_file(args.input)
+    if not files:
+        print(f"Error: tidak ada file WAV di '{args.input}'.")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    params = parameter_proses()
+
+    results, todo = [], []
+    for f in files:
+        old = None if args.force else sudah_terbaru(f, args.out, params)
+        if old is not None:
+            results.append(dict(old, status='skip'))
+        else:
+            todo.append(f)
+    workers = max(1, min(args.workers or os.cpu_count(), len(todo) or 1))
+    print(f"{len(files)} file: {len(results)} sudah terbaru, {len(todo)} diproses ({workers} worker)")
+
+    start = time.time()
+    if todo:
+        with mp.Pool(workers, initializer=_init_worker) as pool:
+            jobs = [(f, args.out, params) for f in todo]
+            for i, r in enumerate(pool.imap_unordered(proses_file, jobs), 1):
+                results.append(r)
+                if r['status'] == 'ok':
+                    print(f"[{i}/{len(todo)}] {r['file']}: SNR {r['snr_db']:.2f} dB "
+                          f"({r['waktu_proses']:.1f} s)")
+                else:
+                    print(f"[{i}/{len(todo)}] {r['file']}: {r['status']}")
+    print(f"Selesai dalam {time.time() - start:.1f} detik")
+
+    cetak_ringkasan(results)
+    fields = ['file', 'status', 'durasi_detik', 'snr_db', 'korelasi', 'delay_sampel', 'waktu_proses']
+    summary = os.path.join(args.out, SUMMARY_CSV)
+    with open(summary, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda r: r['file']))
+    print(f"Ringkasan tersimpan di {summary}")
+    return 0 if all(r['status'] in ('ok', 'skip') for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import importlib
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing as mp
+from queue import Empty
+
+import numpy as np
+
+# Benchmark end-to-end: tiap tahap pipeline diukur terpisah pada WAV bawaan.
+# Setiap tahap dijalankan di proses baru (spawn) supaya peak RSS yang
+# terukur (ru_maxrss) benar-benar milik tahap itu saja; sinyal FM untuk
+# tahap selain modulate dibuat di proses tersendiri sebelumnya. Tiap tahap
+# diulang REPEATS kali (proses baru tiap kali, tahap singkat juga diulang
+# di dalam proses sampai MIN_TIME): waktu = run tercepat (noise mesin hanya
+# memperlambat), peak RSS = median, supaya satu pengukuran
+# puluhan ms yang kebetulan lambat tidak jadi "regresi". Peak RSS dibaca
+# dari 'resource' (Linux/macOS) atau psutil (Windows, jika terpasang); jika
+# tidak bisa diukur, cek RSS dilewati.
+# Hasil ditambahkan ke riwayat JSON; run dianggap GAGAL (exit code 1) jika
+# sampel/detik turun atau peak RSS naik melebihi toleransi dibanding
+# median beberapa run sebelumnya yang lolos.
+
+# === KONFIGURASI ===
+DATA_DIR       = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+INPUT_FILES    = ['Prague.wav', 'London.wav', 'HBDInstrument.wav']
+STAGES         = ['modulate', 'hex', 'serial', 'demod', 'resample']
+HISTORY_FILE   = 'benchmark_history.json'
+BASELINE_RUNS  = 5             # Jumlah run lolos terakhir untuk baseline (median)
+SPEED_TOL      = 0.15          # Gagal jika sampel/detik < baseline x (1 - SPEED_TOL)
+RSS_TOL        = 0.20          # Gagal jika peak RSS > baseline x (1 + RSS_TOL)
+SERIAL_BYTES   = 100000        # Byte yang dikirim ke FPGA virtual (0.5 detik @ 2 Mbaud)
+RX_CHUNK       = 4096          # Ukuran potongan byte yang "datang" di tahap resample
+REPEATS        = 5             # Pengukuran per tahap (waktu tercepat, RSS median)
+MIN_TIME       = 0.3           # Tahap singkat diulang di proses yang sama sampai selama ini
+CHILD_TIMEOUT  = 600           # Batas waktu satu pengukuran (detik), lewat = tahap gagal
+
+
+def _stage_modulate(input_wav, fm_wav, workdir):
+    import scipy.io.wavfile as wav
+    import Modulator
+    Modulator.USE_CACHE = False     # Ukur modulasinya, bukan cache hit dari run sebelumnya
+    rate, audio = wav.read(input_wav, mmap=True)
+    Modulator.main_streaming(input_wav, fm_wav)
+    return len(audio)
+
+
+def _stage_hex(input_wav, fm_wav, workdir):
+    import scipy.io.wavfile as wav
+    import wavtohex
+    wavtohex.convert_wav_to_hex(fm_wav, os.path.join(workdir, 'simulation_input.txt'), 'hex')
+    return len(wav.read(fm_wav, mmap=True)[1])
+
+
+def _stage_serial(input_wav, fm_wav, workdir):
+    import serial
+    import scipy.io.wavfile as wav
+    from serial_stream import stream_full_duplex
+    from virtual_fpga import VirtualFPGA
+    fm = wav.read(fm_wav, mmap=True)[1][:SERIAL_BYTES]
+    with VirtualFPGA(personality='demod') as dev:
+        ser = serial.Serial(dev.port, 2000000, timeout=2)
+        try:
+            rx, stats = stream_full_duplex(ser, np.ascontiguousarray(fm), show_progress=False)
+        finally:
+            ser.close()
+    return stats['received']
+
+
+def _stage_demod(input_wav, fm_wav, workdir):
+    import scipy.io.wavfile as wav
+    import local_demodulator
+    local_demodulator.demodulate_streaming(fm_wav, os.path.join(workdir, 'software_demod.wav'))
+    return len(wav.read(fm_wav, mmap=True)[1])
+
+
+def _stage_resample(input_wav, fm_wav, workdir):
+    import scipy.io.wavfile as wav
+    from FPGAProcessing import PenulisAudio
+    rate, fm = wav.read(fm_wav, mmap=True)
+    buf = memoryview(np.ascontiguousarray(fm)).cast('B')
+    penulis = PenulisAudio(os.path.join(workdir, 'hasil_demodulasi.wav'), rate)
+    for i in range(0, len(buf), RX_CHUNK):
+        penulis.tulis(buf[i:i+RX_CHUNK])
+    penulis.tutup()
+    return len(buf)
+
+
+# Modul yang di-import sebelum timer mulai (waktu import tidak ikut diukur)
+STAGE_MODULES = {
+    'modulate': ['Modulator'],
+    'hex':      ['wavtohex'],
+    'serial':   ['serial', 'serial_stream', 'virtual_fpga', 'fm_golden_model'],
+    'demod':    ['local_demodulator'],
+    'resample': ['FPGAProcessing'],
+}
+
+STAGE_FUNCS = {
+    'modulate': _stage_modulate,
+    'hex':      _stage_hex,
+    'serial':   _stage_serial,
+    'demod':    _stage_demod,
+    'resample': _stage_resample,
+}
+
+
+def _peak_rss_mb():
+    """Peak RSS proses ini dalam MB, None jika tidak bisa diukur di platform ini."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: byte di macOS, KiB di Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _child(stage, input_wav, fm_wav, workdir, queue):
+    """Dijalankan di proses baru: ukur satu tahap, kirim hasil lewat queue."""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for module in STAGE_MODULES[stage]:
+                importlib.import_module(module)
+            elapsed, total = float('inf'), 0.0
+            while total < MIN_TIME:
+                start = time.perf_counter()
+                n = STAGE_FUNCS[stage](input_wav, fm_wav, workdir)
+                t = time.perf_counter() - start
+                elapsed = min(elapsed, t)
+                total += t
+        queue.put({'samples': int(n), 'elapsed': elapsed,
+                   'samples_per_sec': n / elapsed if elapsed > 0 else 0.0,
+                   'peak_rss_mb': _peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def _jalankan_child(stage, input_wav, fm_wav, workdir):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    p = ctx.Process(target=_child, args=(stage, input_wav, fm_wav, workdir, queue))
+    p.start()
+    # Child yang mati sebelum queue.put (crash numba/segfault, OOM killer,
+    # gagal import) dicatat sebagai tahap gagal, bukan ditunggu selamanya
+    deadline = time.time() + CHILD_TIMEOUT
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except Empty:
+            if not p.is_alive():
+                p.join()
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    result = {'error': f"child exited {p.exitcode}"}
+            elif time.time() > deadline:
+                p.terminate()
+                result = {'error': f"timeout setelah {CHILD_TIMEOUT} detik"}
+    p.join()
+    return result
+
+
+def ukur_tahap(stage, input_wav, fm_wav, workdir, repeats=REPEATS):
+    """Waktu tercepat & median peak RSS dari 'repeats' pengukuran, masing-masing di proses baru."""
+    runs = []
+    for _ in range(repeats):
+        r = _jalankan_child(stage, input_wav, fm_wav, workdir)
+        if 'error' in r:
+            return r
+        runs.append(r)
+    elapsed = min(r['elapsed'] for r in runs)
+    n = runs[0]['samples']
+    rss = [r['peak_rss_mb'] for r in runs if r['peak_rss_mb'] is not None]
+    return {'samples': n, 'elapsed': elapsed,
+            'samples_per_sec': n / elapsed if elapsed > 0 else 0.0,
+            'peak_rss_mb': float(np.median(rss)) if rss else None,
+            'repeats': len(runs),
+            'spread': (max(r['elapsed'] for r in runs) - min(r['elapsed'] for r in runs)) / elapsed
+                      if elapsed > 0 else 0.0}
+
+
+def muat_riwayat(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def versi_git():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DATA_DIR,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def baseline(history, host, file, stage):
+    """Median sampel/detik & peak RSS dari BASELINE_RUNS run lolos terakhir (host yang sama)."""
+    past = [run['results'][file][stage] for run in history
+            if run.get('passed') and run.get('host') == host
+            and 'error' not in run['results'].get(file, {}).get(stage, {'error': 1})]
+    past = past[-BASELINE_RUNS:]
+    if not past:
+        return None
+    rss = [r['peak_rss_mb'] for r in past if r.get('peak_rss_mb') is not None]
+    return (float(np.median([r['samples_per_sec'] for r in past])),
+            float(np.median(rss)) if rss else None)
+
+
+def cek_regresi(results, history, host, speed_tol=SPEED_TOL, rss_tol=RSS_TOL):
+    """Daftar pesan regresi (kosong = lolos)."""
+    problems = []
+    for file, stages in results.items():
+        for stage, r in stages.items():
+            if 'error' in r:
+                problems.append(f"{file}/{stage}: {r['error']}")
+                continue
+            base = baseline(history, host, file, stage)
+            if base is None:
+                continue
+            sps, rss = base
+            if r['samples_per_sec'] < sps * (1 - speed_tol):
+                problems.append(f"{file}/{stage}: {r['samples_per_sec']:,.0f} sampel/detik "
+                                f"< baseline {sps:,.0f} (-{(1 - r['samples_per_sec']/sps)*100:.1f}%)")
+            if rss is None or r['peak_rss_mb'] is None:
+                continue
+            if r['peak_rss_mb'] > rss * (1 + rss_tol):
+                problems.append(f"{file}/{stage}: peak RSS {r['peak_rss_mb']:.1f} MB "
+                                f"> baseline {rss:.1f} MB (+{(r['peak_rss_mb']/rss - 1)*100:.1f}%)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline FM per tahap")
+    parser.add_argument('files', nargs='*', default=INPUT_FILES, help="WAV input (default: WAV bawaan)")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Tahap dipisah koma")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--speed-tol', type=float, default=SPEED_TOL)
+    parser.add_argument('--rss-tol', type=float, default=RSS_TOL)
+    parser.add_argument('--repeat', type=int, default=REPEATS, help="Pengukuran per tahap")
+    parser.add_argument('--no-save', action='store_true', help="Jangan tambahkan run ini ke riwayat")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = [s for s in stages if s not in STAGE_FUNCS]
+    if unknown:
+        print(f"Error: tahap tidak dikenal: {', '.join(unknown)}")
+        return 2
+
+    host = platform.node()
+    history = muat_riwayat(args.history)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='fm_bench_')
+
+    print(f"{'File':<20} {'Tahap':<10} {'Sampel':>10} {'Waktu (s)':>10} {'Sampel/detik':>14} {'Peak RSS':>10} {'Sebaran':>8}")
+    try:
+        for file in args.files:
+            input_wav = file if os.path.exists(file) else os.path.join(DATA_DIR, file)
+            name = os.path.basename(file)
+            if not os.path.exists(input_wav):
+                print(f"Lewati {file}: tidak ditemukan.")
+                continue
+            fm_wav = os.path.join(workdir, os.path.splitext(name)[0] + '_fm.wav')
+            results[name] = {}
+            if any(stage != 'modulate' for stage in stages):
+                # Sinyal FM dibuat di proses sendiri, RSS-nya tidak ikut ke tahap lain
+                r = _jalankan_child('modulate', input_wav, fm_wav, workdir)
+                if 'error' in r:
+                    print(f"{name:<20} {'modulate':<10} ERROR: {r['error']}")
+                    for stage in stages:
+                        if stage != 'modulate':
+                            results[name][stage] = {'error': f"sinyal FM gagal dibuat: {r['error']}"}
+                    continue
+            for stage in stages:
+                r = ukur_tahap(stage, input_wav, fm_wav, workdir, args.repeat)
+                results[name][stage] = r
+                if 'error' in r:
+                    print(f"{name:<20} {stage:<10} ERROR: {r['error']}")
+                else:
+                    rss = 'n/a' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.1f} MB"
+                    print(f"{name:<20} {stage:<10} {r['samples']:>10} {r['elapsed']:>10.3f} "
+                          f"{r['samples_per_sec']:>14,.0f} {rss:>10} "
+                          f"{r['spread']*100:>7.1f}%")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if any(r.get('peak_rss_mb', 0) is None for per_file in results.values() for r in per_file.values()):
+        print("Peak RSS tidak bisa diukur di platform ini (butuh 'resource' atau psutil): cek RSS dilewati.")
+    problems = cek_regresi(results, history, host, args.speed_tol, args.rss_tol)
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': versi_git(),
+        'host': host,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'passed': not problems,
+        'results': results,
+    }
+    if not args.no_save:
+        history.append(run)
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=1)
+        print(f"Riwayat tersimpan di {args.history} ({len(history)} run)")
+
+    if problems:
+        print("\nREGRESI TERDETEKSI:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print("\nTidak ada regresi.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:             # Windows
+    fcntl = None
+    import msvcrt
+
+# Log rekaman sesi hardware, append-only, supaya byte mentah TX/RX tidak
+# hilang setelah post-processing dan bisa diproses ulang tanpa transfer
+# serial lagi.
+#
+# <LOG_FILE>      : header 16 byte, lalu record berurutan:
+#                   [jenis u8, pad, sesi u16, n u32, t f64, offset u64] + n byte payload
+#                   jenis: config (JSON konfigurasi run), tx, rx
+#                   t      = detik sejak awal sesi (perf_counter) saat byte pertama record
+#                            ditulis/diterima
+#                   offset = posisi byte pertama record di stream TX/RX sesi itu
+# <LOG_FILE>.idx  : satu entri INDEX_DTYPE per record (posisi payload di file log),
+#                   bisa di-memory-map; pencarian waktu = searchsorted pada kolom t.
+# <LOG_FILE>.lock : dikunci eksklusif oleh penulis selama sesi berjalan.
+#
+# Chunk searah yang berurutan digabung jadi satu record (>= FLUSH_BYTES atau
+# tiap FLUSH_INTERVAL), jadi header + entri index tidak membengkakkan log
+# saat write/read serial kecil-kecil; resolusi pencarian waktu tetap beberapa ms.
+# Record ditulis utuh (header + payload) dalam satu write, dulu ke log baru
+# ke index. Pembaca tidak pernah mengubah file: record terakhir yang belum
+# lengkap (mis. sesi yang sedang direkam) diabaikan saja. Hanya penulis yang
+# memegang lock yang membuang ekor terpotong (sisa proses yang mati) dan
+# menyinkronkan index.
+#
+# Perekaman lewat SerialRekam: proxy objek serial yang mencatat setiap
+# write()/read()/readinto(), jadi loop kirim/terima yang ada tidak berubah.
+
+# === KONFIGURASI ===
+LOG_FILE       = 'capture.fmlog'
+REPLAY_CHUNK   = 1 << 20        # Byte per panggilan callback saat replay
+FLUSH_BYTES    = 4096           # Record ditulis jika chunk searah terkumpul sebesar ini...
+FLUSH_INTERVAL = 0.005          # ...atau byte pertamanya sudah selama ini (detik)
+
+MAGIC = b'FMCAPLOG\x01\x00\x00\x00\x00\x00\x00\x00'
+JENIS = ('config', 'tx', 'rx')
+CONFIG, TX, RX = range(3)
+_RECORD = struct.Struct('<BxHIdQ')
+INDEX_DTYPE = np.dtype([('sesi', '<u2'), ('jenis', 'u1'), ('t', '<f8'),
+                        ('pos', '<u8'), ('offset', '<u8'), ('n', '<u4')])
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def _kunci(f):
+    """Lock eksklusif tanpa menunggu, OSError jika sudah dipegang proses lain."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _scan_log(path, start=len(MAGIC)):
+    """Record lengkap di log mulai dari posisi start. Mengembalikan (entri index, akhir record terakhir)."""
+    entries = []
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: bukan capture log")
+        size = os.fstat(f.fileno()).st_size
+        f.seek(start)
+        end = start
+        while end + _RECORD.size <= size:
+            jenis, sesi, n, t, offset = _RECORD.unpack(f.read(_RECORD.size))
+            pos = end + _RECORD.size
+            if pos + n > size:
+                break                                   # Record terakhir belum lengkap
+            f.seek(n, os.SEEK_CUR)
+            entries.append((sesi, jenis, t, pos, offset, n))
+            end = pos + n
+    return np.array(entries, dtype=INDEX_DTYPE), end
+
+
+def _load_index(path):
+    """
+    (index, akhir record lengkap terakhir), hanya membaca. Entri .idx yang
+    cocok dengan log dipakai, record sesudahnya dipindai langsung dari log.
+    """
+    size = os.path.getsize(path)
+    index = np.zeros(0, dtype=INDEX_DTYPE)
+    ipath = index_path(path)
+    if os.path.exists(ipath):
+        raw = np.fromfile(ipath, dtype=np.uint8)
+        index = raw[:len(raw) - len(raw) % INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+    if len(index):
+        # Prefix konsisten: record bersambung dan seluruhnya ada di log
+        ends = index['pos'].astype(np.int64) + index['n']
+        expected = np.concatenate(([len(MAGIC)], ends[:-1])) + _RECORD.size
+        ok = (index['pos'].astype(np.int64) == expected) & (ends <= size)
+        index = index[:len(ok) if ok.all() else int(np.argmin(ok))]
+    end = int(index['pos'][-1] + index['n'][-1]) if len(index) else len(MAGIC)
+    tail, end = _scan_log(path, end)
+    return np.concatenate((index, tail)), end
+
+
+def _perbaiki(path):
+    """Khusus penulis yang memegang lock: buang ekor terpotong, tulis ulang .idx jika tertinggal."""
+    index, end = _load_index(path)
+    size = os.path.getsize(path)
+    if end != size:
+        print(f"Peringatan: {size - end} byte terakhir {path} terpotong, dibuang.")
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+    ipath = index_path(path)
+    if not os.path.exists(ipath) or os.path.getsize(ipath) != index.nbytes:
+        index.tofile(ipath)
+    return index
+
+
+def _tulis_semua(f, data):
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
+def konfigurasi(namespace):
+    """Konstanta KONFIGURASI (nama huruf besar, nilai JSON) dari globals() sebuah modul."""
+    return {k: v for k, v in namespace.items()
+            if k.isupper() and isinstance(v, (int, float, str, bool, list, tuple, type(None)))}
+
+
+class CaptureLog:
+    """Penulis satu sesi. Aman dipanggil dari thread writer & reader sekaligus."""
+
+    def __init__(self, path=LOG_FILE, script='', config=None):
+        self.path = path
+        self.f_lock = open(path + '.lock', 'a+b')
+        try:
+            _kunci(self.f_lock)
+        except OSError:
+            self.f_lock.close()
+            raise OSError(f"{path} sedang direkam proses lain") from None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            index = _perbaiki(path)
+            self.sesi = int(index['sesi'].max()) + 1 if len(index) else 0
+        else:
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+            open(index_path(path), 'wb').close()
+            self.sesi = 0
+        # Tanpa buffer Python: tiap record sampai ke file dalam satu write
+        self.f = open(path, 'ab', buffering=0)
+        self.f_idx = open(index_path(path), 'ab', buffering=0)
+        self.pos = os.path.getsize(path)
+        self.lock = threading.Lock()
+        self.bytes = [0, 0, 0]
+        self.pending = [bytearray(), bytearray(), bytearray()]
+        self.t_pending = [0.0, 0.0, 0.0]
+        self.t0 = time.perf_counter()
+        info = {'script': script, 'waktu': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'config': config or {}}
+        with self.lock:
+            self.pending[CONFIG] += json.dumps(info).encode()
+            self._tulis_record(CONFIG)
+
+    def _tulis_record(self, jenis):
+        """Tulis chunk yang terkumpul sebagai satu record (dipanggil dengan self.lock)."""
+        buf = self.pending[jenis]
+        n = len(buf)
+        t = self.t_pending[jenis]
+        pos = self.pos + _RECORD.size
+        _tulis_semua(self.f, _RECORD.pack(jenis, self.sesi, n, t, self.bytes[jenis]) + buf)
+        entry = np.array([(self.sesi, jenis, t, pos, self.bytes[jenis], n)], dtype=INDEX_DTYPE)
+        _tulis_semua(self.f_idx, entry.tobytes())
+        self.pos = pos + n
+        self.bytes[jenis] += n
+        buf.clear()
+
+    def _catat(self, jenis, data):
+        t = time.perf_counter() - self.t0
+        with self.lock:
+            buf = self.pending[jenis]
+            if not buf:
+                self.t_pending[jenis] = t
+            buf += data
+            if len(buf) >= FLUSH_BYTES or t - self.t_pending[jenis] >= FLUSH_INTERVAL:
+                self._tulis_record(jenis)
+
+    def tx(self, data):
+        self._catat(TX, data)
+
+    def rx(self, data):
+        self._catat(RX, data)
+
+    def close(self):
+        with self.lock:
+            if self.f.closed:
+                return
+            for jenis in (TX, RX):
+                if self.pending[jenis]:
+                    self._tulis_record(jenis)
+            self.f.close()
+            self.f_idx.close()
+            self.f_lock.close()         # Melepas lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SerialRekam:
+    """Proxy serial.Serial: semua atribut diteruskan, byte write/read dicatat ke CaptureLog."""
+
+    def __init__(self, ser, log):
+        object.__setattr__(self, '_ser', ser)
+        object.__setattr__(self, '_log', log)
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._ser, name, value)         # mis. ser.timeout = ...
+
+    def write(self, data):
+        n = self._ser.write(data)
+        view = memoryview(data).cast('B')
+        self._log.tx(view[:len(view) if n is None else n])
+        return n
+
+    def read(self, size=1):
+        data = self._ser.read(size)
+        if data:
+            self._log.rx(data)
+        return data
+
+    def readinto(self, b):
+        n = self._ser.readinto(b)
+        if n:
+            self._log.rx(memoryview(b)[:n])
+        return n
+
+    def __enter__(self):
+        self._ser.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._ser.__exit__(*exc)
+
+
+class CaptureReader:
+    """Pembaca log: memory-map, daftar sesi, pencarian waktu, replay."""
+
+    def __init__(self, path=LOG_FILE):
+        self.path = path
+        self.index, _ = _load_index(path)       # Record yang sedang ditulis diabaikan
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+
+    def _entri(self, sesi, jenis):
+        idx = self.index
+        return idx[(idx['sesi'] == sesi) & (idx['jenis'] == JENIS.index(jenis))]
+
+    def sesi_terakhir(self):
+        if len(self.index) == 0:
+            raise ValueError(f"{self.path}: log kosong")
+        return int(self.index['sesi'].max())
+
+    def info(self, sesi):
+        """Dict sesi: id, script, waktu, config, durasi, tx_bytes, rx_bytes."""
+        e = self.index[self.index['sesi'] == sesi]
+        if len(e) == 0:
+            raise ValueError(f"{self.path}: sesi {sesi} tidak ada")
+        cfg = e[e['jenis'] == CONFIG]
+        info = json.loads(self.payload(cfg[0]).tobytes()) if len(cfg) else {'config': {}}
+        return dict(info, id=int(sesi), durasi=float(e['t'].max()),
+                    tx_bytes=int(e['n'][e['jenis'] == TX].sum()),
+                    rx_bytes=int(e['n'][e['jenis'] == RX].sum()))
+
+    def daftar_sesi(self):
+        return [self.info(int(s)) for s in np.unique(self.index['sesi'])]
+
+    def payload(self, entry):
+        return self.data[int(entry['pos']):int(entry['pos']) + int(entry['n'])]
+
+    def cari_waktu(self, sesi, t, jenis='rx'):
+        """Offset byte di stream 'jenis' untuk waktu t (detik sejak awal sesi)."""
+        e = self._entri(sesi, jenis)
+        k = int(np.searchsorted(e['t'], t))
+        return int(e['offset'][k]) if k < len(e) else int(e['offset'][-1] + e['n'][-1]) if len(e) else 0
+
+    def chunks(self, sesi, jenis='rx', t_mulai=0.0, t_akhir=None, chunk=REPLAY_CHUNK):
+        """
+        Generator array uint8 (<= chunk byte, record digabung) dari stream
+        'jenis' sesi, mulai dari record pertama dengan t >= t_mulai.
+        """
+        e = self._entri(sesi, jenis)
+        k0 = int(np.searchsorted(e['t'], t_mulai))
+        k1 = len(e) if t_akhir is None else int(np.searchsorted(e['t'], t_akhir, side='right'))
+        e = e[k0:k1]
+        ends = np.cumsum(e['n'].astype(np.int64))
+        start = 0
+        while start < len(e):
+            base = int(ends[start - 1]) if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + chunk, side='right')))
+            part = e[start:stop]
+            # Kumpulkan semua payload sekaligus: indeks byte = pos record + 0..n-1
+            n = part['n'].astype(np.int64)
+            first = np.concatenate(([0], np.cumsum(n)[:-1]))
+            idx = np.repeat(part['pos'].astype(np.int64) - first, n) + np.arange(int(n.sum()))
+            yield self.data[idx]
+            start = stop
+
+    def baca(self, sesi, jenis='rx', t_mulai=0.0, t_akhir=None):
+        parts = list(self.chunks(sesi, jenis, t_mulai, t_akhir))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+
+    def replay(self, sesi, on_data, jenis='rx', t_mulai=0.0, t_akhir=None, chunk=REPLAY_CHUNK):
+        """Kirim byte terekam ke on_data(array uint8) secepat disk. Mengembalikan jumlah byte."""
+        total = 0
+        for part in self.chunks(sesi, jenis, t_mulai, t_akhir, chunk):
+            on_data(part)
+            total += len(part)
+        return total
+
+
+def mulai_capture(ser, path, script, config):
+    """(SerialRekam, log) untuk sesi baru; (ser, None) jika log sedang direkam proses lain."""
+    try:
+        log = CaptureLog(path, script, config)
+    except OSError as e:
+        print(f"Peringatan: capture nonaktif ({e})")
+        return ser, None
+    print(f"Capture sesi {log.sesi} -> {path}")
+    return SerialRekam(ser, log), log
+
+
+def buka_replay(path, sesi):
+    """(reader, id sesi); sesi negatif dihitung dari belakang (-1 = sesi terakhir)."""
+    reader = CaptureReader(path)
+    if sesi < 0:
+        sesi = reader.sesi_terakhir() + 1 + sesi
+    return reader, sesi
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lihat / ekspor capture log sesi hardware")
+    parser.add_argument('--log', default=LOG_FILE)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('list')
+    p = sub.add_parser('export', help="Tulis byte mentah satu sesi ke file")
+    p.add_argument('sesi', type=int, help="ID sesi (-1 = terakhir)")
+    p.add_argument('output')
+    p.add_argument('--jenis', choices=['tx', 'rx'], default='rx')
+    p.add_argument('--dari', type=float, default=0.0, help="Detik sejak awal sesi")
+    p.add_argument('--sampai', type=float, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"Error: '{args.log}' tidak ditemukan.")
+        return 1
+    if args.cmd == 'list':
+        reader = CaptureReader(args.log)
+        print(f"{'Sesi':>4}  {'Waktu':<19}  {'Script':<16} {'Durasi':>8} {'TX':>10} {'RX':>10}")
+        for s in reader.daftar_sesi():
+            print(f"{s['id']:>4}  {s.get('waktu', '?'):<19}  {s.get('script', '?'):<16} "
+                  f"{s['durasi']:>7.2f}s {s['tx_bytes']:>10} {s['rx_bytes']:>10}")
+        return 0
+
+    reader, sesi = buka_replay(args.log, args.sesi)
+    start = time.time()
+    with open(args.output, 'wb') as f:
+        n = reader.replay(sesi, lambda part: f.write(part.tobytes()), args.jenis, args.dari, args.sampai)
+    print(f"Sesi {sesi}: {n} byte {args.jenis} -> {args.output} dalam {time.time() - start:.2f} detik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import numpy as np
+
+from fm_golden_model import nco_lut, lut_width
+
+# Modulator FM integer (DDS) yang meniru nco.vhd:
+#   phase_acc <= phase_acc + phase_in        (unsigned 32-bit, wrap otomatis)
+#   sine_out  <= LUT(phase_acc(31 downto 24)) (256 entri x 8 bit)
+#   (tabel dari nco_lut.npy jika dibuat dengan Testing nco/lookuptable.py;
+#   alamat = log2(entri) bit atas phase_acc, tabel > 8 bit dipotong ke
+#   8 bit teratas karena sampel FM ke UART tetap 8-bit)
+# phase_in = tuning word carrier + tuning word deviasi x audio.
+# Fase tidak pernah tumbuh tanpa batas (selalu modulo 2^32), jadi carrier
+# tetap stabil bit-per-bit berapapun panjang audionya, dan semua aritmetika
+# per sampel berjalan di uint32.
+
+# === KONFIGURASI ===
+PHASE_BITS = 32
+OUT_WIDTH  = 8                  # Sampel FM uint8
+
+
+def tuning_word(freq, fs):
+    """Frekuensi (Hz) -> tuning word 32-bit: round(freq x 2^32 / fs)."""
+    return int(round(freq * 2**PHASE_BITS / fs)) % 2**PHASE_BITS
+
+
+class DDSModulator:
+    """
+    Modulator FM per blok dengan phase accumulator uint32.
+    Phase accumulator disimpan antar panggilan process(), jadi blok-blok
+    berurutan menghasilkan sinyal yang sama dengan memproses sekaligus.
+    """
+
+    def __init__(self, fs, carrier_freq, dev_freq):
+        self.fs = fs
+        self.tw_carrier = tuning_word(carrier_freq, fs)
+        self.tw_dev = dev_freq * 2**PHASE_BITS / fs        # Tuning word per 1.0 audio
+        lut = nco_lut()
+        self.lut_shift = PHASE_BITS - (len(lut).bit_length() - 1)   # 256 entri: phase_acc(31 downto 24)
+        self.lut = (lut >> (lut_width(lut) - OUT_WIDTH)).astype(np.uint8)
+        self.reset()
+
+    def reset(self):
+        """Kondisi setelah reset nco.vhd: phase_acc = 0."""
+        self.phase_acc = np.uint32(0)
+
+    def tuning_words(self, audio):
+        """Audio (-1..1) -> phase_in per sampel (uint32, deviasi negatif wrap seperti di hardware)."""
+        dev = np.rint(np.asarray(audio) * self.tw_dev).astype(np.int64)
+        return (dev + self.tw_carrier).astype(np.uint32)
+
+    def process_words(self, tw):
+        """Tuning word uint32 -> sampel uint8. Output ke-n = LUT(phase_acc sebelum ditambah tw[n])."""
+        tw = np.asarray(tw, dtype=np.uint32)
+        if len(tw) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        acc = np.cumsum(tw, dtype=np.uint32)
+        acc -= tw                       # Cumsum eksklusif (wrap modulo 2^32)
+        acc += self.phase_acc
+        self.phase_acc = np.uint32((int(acc[-1]) + int(tw[-1])) & 0xFFFFFFFF)
+        acc >>= self.lut_shift
+        return self.lut[acc]
+
+    def process(self, audio):
+        """Modulasi satu blok audio (-1..1, sudah di rate fs) -> sampel FM uint8."""
+        return self.process_words(self.tuning_words(audio))
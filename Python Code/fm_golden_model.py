@@ -0,0 +1,301 @@
+import numpy as np
+import time
+import os
+import hashlib
+
+# Model Python bit-exact dari fm_demodulator_top.vhd (phase_detector, nco,
+# loop_filter, low_pass_filter) seperti dipakai di uart_fm_system.vhd.
+# Satu sampel = satu pulsa 'enable'. Semua register di-update bersamaan
+# (pakai nilai lama), persis seperti sinyal VHDL di rising edge.
+#
+# Loop PLL bersifat rekursif (output NCO -> phase detector -> loop filter
+# -> NCO) jadi tidak bisa divektorisasi. Kernel dikompilasi dengan numba
+# jika tersedia (puluhan juta sampel/detik), jika tidak jalan sebagai
+# Python biasa (lambat, tapi hasilnya sama).
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# === KONFIGURASI (default = uart_fm_system.vhd) ===
+CW0_VAL_OVERRIDE = 1073741824   # Center frequency word
+FILTER_SHIFT     = 4            # SHIFT_FACTOR low_pass_filter
+KP_VAL           = 32000        # kp_config (Q12)
+KI_VAL           = 50           # ki_config (Q12)
+LPF_STAGES       = 3            # STAGES low_pass_filter
+LF_SHIFT_AMT     = 0            # SHIFT_AMT loop_filter (di-map 0 di top level)
+
+INPUT_FM_WAV = 'fm_modulated_signal.wav'
+OUTPUT_WAV   = 'hasil_model.wav'
+AUDIO_RATE   = 44100
+# Tabel NCO dari Testing nco/lookuptable.py (opsional, jika tidak ada tabel dihitung).
+# Ukuran apapun (2^n entri x 8..16 bit) dipakai apa adanya: alamat = bit atas
+# phase_acc sebanyak log2(entri), produk phase detector diskalakan ke 8 bit.
+NCO_LUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nco_lut.npy')
+
+# Konstanta hardware
+FIR_COEFF  = np.array([1, 2, 3, 4, 4, 3, 2, 1], dtype=np.int64)   # Total bobot 20
+INT_LIMIT  = 16777216
+DATA_WIDTH = 24
+OUT_WIDTH  = 8
+NCO_WIDTH  = 8              # Lebar sine_out nco.vhd yang masuk phase detector
+PHASE_BITS = 32
+
+# Layout array state (int64)
+S_PD      = 0               # mult_result (phase_detector)
+S_TAPS    = 1               # taps(0..7) loop_filter
+S_INTEG   = 9               # integrator_acc
+S_CW      = 10              # cw_out
+S_KP_REG  = 11              # kp_reg
+S_KI_REG  = 12              # ki_reg
+S_PACC    = 13              # phase_acc NCO (unsigned 32-bit)
+S_SINE    = 14              # sine_out NCO (hanya mode enable kontinu)
+S_SAT_INT = 15              # Jumlah clamp anti-windup integrator
+S_SAT_LPF = 16              # Jumlah clamp saturasi low_pass_filter
+S_STAGES  = 17              # filter_stages(1..STAGES)
+
+
+def lut_width(lut):
+    """Lebar bit tabel sinus (puncak tabel = 2^width - 1), minimal NCO_WIDTH."""
+    return max(NCO_WIDTH, int(np.max(lut)).bit_length())
+
+
+def nco_lut(depth=None, width=None, path=NCO_LUT_FILE):
+    """
+    Tabel sinus NCO. Dibaca dari path (.npy hasil Testing nco/lookuptable.py)
+    jika ada dan valid (depth/width None = ukuran apapun, jika diberikan harus
+    cocok), jika tidak dihitung sama dengan sine_lookup_table di nco.vhd.
+    """
+    if path and os.path.exists(path):
+        lut = np.load(path).astype(np.int64)
+        n = len(lut)
+        valid = (n >= 8 and n & (n - 1) == 0 and lut.min() >= 0 and lut_width(lut) <= 16)
+        if valid and depth in (None, n) and width in (None, lut_width(lut)):
+            return lut
+        print(f"Peringatan: {path} bukan tabel sinus yang didukung "
+              f"({n} entri), tabel nco.vhd dihitung ulang.")
+    depth = depth or 256
+    width = width or NCO_WIDTH
+    i = np.arange(depth)
+    val = (np.sin(i / depth * 2 * np.pi) + 1) * (2**width - 1) / 2
+    return np.round(val).astype(np.int64)
+
+
+def nco_lut_hash():
+    """Sidik tabel NCO yang sedang dipakai (bagian dari kunci cache sinyal DDS)."""
+    return hashlib.sha1(np.ascontiguousarray(nco_lut(), dtype=np.int64).tobytes()).hexdigest()[:16]
+
+
+def _wrap32(v):
+    return ((v + 2147483648) & 0xFFFFFFFF) - 2147483648
+
+
+def _kernel(x, out, st, lut, lut_shift, nco_mid, nco_scale, fir, cw0, kp, ki, lf_shift,
+            lpf_shift, stages, continuous, dbg_on, dbg_pd, dbg_err, dbg_cw):
+    acc_bits = DATA_WIDTH + lpf_shift
+    lpf_max = (1 << (acc_bits - 1)) - 1
+    lpf_min = -(1 << (acc_bits - 1))
+    out_lo = DATA_WIDTH - OUT_WIDTH - 11
+    out_mask = (1 << OUT_WIDTH) - 1
+    out_msb = 1 << (OUT_WIDTH - 1)
+
+    pd = st[S_PD]
+    integ = st[S_INTEG]
+    cw = st[S_CW]
+    kp_reg = st[S_KP_REG]
+    ki_reg = st[S_KI_REG]
+    pacc = st[S_PACC]
+    sine = st[S_SINE]
+
+    for n in range(len(x)):
+        # --- NCO output yang terlihat oleh phase detector ---
+        # uart_fm_system: enable tiap >= 3 clock, sine_out sudah = LUT(phase_acc)
+        # testbench enable kontinu: sine_out tertinggal satu enable
+        if continuous:
+            nco_val = sine
+            sine = lut[pacc >> lut_shift]
+        else:
+            nco_val = lut[pacc >> lut_shift]
+
+        # --- 1. PHASE DETECTOR (register) ---
+        # Tabel > 8 bit: produk diskalakan balik ke rentang NCO 8-bit (nco_scale = 0 di nco.vhd)
+        pd_new = ((int(x[n]) - 128) * (nco_val - nco_mid)) >> nco_scale
+
+        # --- 2. LOOP FILTER ---
+        # FIR memakai taps lama (sinyal), hasil dibagi 20 (truncate ke nol)
+        fir_sum = 0
+        for i in range(8):
+            fir_sum += st[S_TAPS + i] * fir[i]
+        if fir_sum < 0:
+            err = -((-fir_sum) // 20)
+        else:
+            err = fir_sum // 20
+        for i in range(7, 0, -1):
+            st[S_TAPS + i] = st[S_TAPS + i - 1]
+        st[S_TAPS] = pd
+
+        ki_product = err * ki_reg
+        kp_product = err * kp_reg
+
+        # Integrator + anti-windup (cek memakai nilai integrator lama)
+        integ_new = _wrap32(integ + (ki_product >> lf_shift))
+        if integ > INT_LIMIT:
+            integ_new = INT_LIMIT
+            st[S_SAT_INT] += 1
+        elif integ < -INT_LIMIT:
+            integ_new = -INT_LIMIT
+            st[S_SAT_INT] += 1
+
+        combined = _wrap32((kp_product >> lf_shift) + integ)
+        cw_corr = combined >> lf_shift
+        cw_new = _wrap32(cw0 + cw_corr)
+
+        # --- 3. NCO phase accumulator (pakai cw_out lama) ---
+        pacc = (pacc + (cw & 0xFFFFFFFF)) & 0xFFFFFFFF
+
+        # --- 4. LOW PASS FILTER (cascaded IIR, saturasi) ---
+        audio_centered = _wrap32(cw - cw0) >> 18
+        prev = audio_centered << lpf_shift
+        for i in range(stages):
+            cur = st[S_STAGES + i]
+            nxt = cur + ((prev - cur) >> lpf_shift)
+            if nxt > lpf_max:
+                nxt = lpf_max
+                st[S_SAT_LPF] += 1
+            elif nxt < lpf_min:
+                nxt = lpf_min
+                st[S_SAT_LPF] += 1
+            st[S_STAGES + i] = nxt
+            prev = cur          # Stage berikutnya melihat nilai lama stage ini
+
+        if dbg_on:
+            dbg_pd[n] = pd_new
+            dbg_err[n] = err
+            dbg_cw[n] = cw_new
+
+        pd = pd_new
+        integ = integ_new
+        cw = cw_new
+        kp_reg = kp
+        ki_reg = ki
+
+        # audio_out dibaca FIFO TX setelah enable ini
+        r = st[S_STAGES + stages - 1] >> lpf_shift
+        out[n] = ((r >> out_lo) & out_mask) ^ out_msb
+
+    st[S_PD] = pd
+    st[S_INTEG] = integ
+    st[S_CW] = cw
+    st[S_KP_REG] = kp_reg
+    st[S_KI_REG] = ki_reg
+    st[S_PACC] = pacc
+    st[S_SINE] = sine
+
+
+if njit is not None:
+    _wrap32 = njit(cache=True)(_wrap32)
+    _kernel = njit(cache=True)(_kernel)
+
+
+class FMDemodulatorModel:
+    """
+    Golden model fm_demodulator_top. Generic & port sama dengan VHDL:
+    cw0 = CW0_VAL_OVERRIDE, filter_shift = FILTER_SHIFT, kp/ki = kp_config/ki_config,
+    stages = STAGES low_pass_filter, lf_shift = SHIFT_AMT loop_filter.
+    State disimpan antar panggilan process(), jadi bisa dipakai per blok.
+    """
+
+    def __init__(self, cw0=CW0_VAL_OVERRIDE, filter_shift=FILTER_SHIFT, kp=KP_VAL,
+                 ki=KI_VAL, stages=LPF_STAGES, lf_shift=LF_SHIFT_AMT, continuous_enable=False):
+        self.cw0 = int(cw0)
+        self.filter_shift = int(filter_shift)
+        self.kp = int(kp)
+        self.ki = int(ki)
+        self.stages = int(stages)
+        self.lf_shift = int(lf_shift)
+        self.continuous_enable = bool(continuous_enable)
+        self.lut = nco_lut()
+        self.lut_shift = PHASE_BITS - (len(self.lut).bit_length() - 1)
+        width = lut_width(self.lut)
+        self.nco_mid = 1 << (width - 1)
+        self.nco_scale = width - NCO_WIDTH
+        self.reset()
+
+    def reset(self):
+        """Kondisi setelah rst = '1'."""
+        self.state = np.zeros(S_STAGES + self.stages, dtype=np.int64)
+        self.state[S_CW] = self.cw0
+        self.state[S_SINE] = self.lut[0]
+
+    @property
+    def integrator_saturations(self):
+        return int(self.state[S_SAT_INT])
+
+    @property
+    def lpf_saturations(self):
+        return int(self.state[S_SAT_LPF])
+
+    def process(self, data, debug=False):
+        """
+        Proses blok sampel uint8 (data_in), kembalikan audio_out uint8.
+        debug=True juga mengembalikan dict berisi pd_out, error_smooth, cw_out.
+        """
+        x = np.ascontiguousarray(data, dtype=np.uint8)     # Tanpa salinan jika sudah uint8
+        out = np.empty(len(x), dtype=np.uint8)
+        n_dbg = len(x) if debug else 0
+        dbg_pd = np.empty(n_dbg, dtype=np.int64)
+        dbg_err = np.empty(n_dbg, dtype=np.int64)
+        dbg_cw = np.empty(n_dbg, dtype=np.int64)
+
+        _kernel(x, out, self.state, self.lut, self.lut_shift, self.nco_mid, self.nco_scale,
+                FIR_COEFF, self.cw0, self.kp, self.ki, self.lf_shift, self.filter_shift, self.stages, self.continuous_enable,
+                debug, dbg_pd, dbg_err, dbg_cw)
+
+        if not debug:
+            return out
+        return out, {
+            'pd_out': dbg_pd.astype(np.int16),
+            'error_smooth': dbg_err.astype(np.int16),
+            'cw_out': dbg_cw.astype(np.int32),
+        }
+
+
+def demodulate(data, **params):
+    """Shortcut: demodulasi satu array sampel FM 8-bit dari kondisi reset."""
+    return FMDemodulatorModel(**params).process(data)
+
+
+def main():
+    import scipy.io.wavfile as wav
+    from stream_resampler import StreamResampler
+
+    if not os.path.exists(INPUT_FM_WAV):
+        print(f"Error: '{INPUT_FM_WAV}' tidak ditemukan.")
+        return
+
+    fpga_rate, fm_data = wav.read(INPUT_FM_WAV, mmap=True)
+    if fm_data.dtype != np.uint8:
+        print("Error: input harus WAV 8-bit unsigned.")
+        return
+
+    if njit is None:
+        print("Peringatan: numba tidak terpasang, model berjalan lambat (Python murni).")
+
+    print(f"Demodulasi {len(fm_data)} sampel dengan golden model...")
+    model = FMDemodulatorModel()
+    start_time = time.time()
+    audio_out = model.process(fm_data)
+    elapsed = time.time() - start_time
+    print(f"Selesai dalam {elapsed:.2f} detik ({len(fm_data)/elapsed/1e6:.2f} juta sampel/detik)")
+    print(f"Saturasi integrator: {model.integrator_saturations}, saturasi LPF: {model.lpf_saturations}")
+
+    # Sama dengan konversi di FPGAProcessing.py
+    audio_float = (audio_out.astype(float) - 128.0) / 128.0
+    resampler = StreamResampler(fpga_rate, AUDIO_RATE)
+    audio_final = np.concatenate((resampler.process(audio_float), resampler.flush()))
+    wav.write(OUTPUT_WAV, AUDIO_RATE, (audio_final * 32767).astype(np.int16))
+    print(f"Audio tersimpan di: {OUTPUT_WAV}")
+
+
+if __name__ == "__main__":
+    main()
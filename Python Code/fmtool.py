@@ -0,0 +1,173 @@
+import os
+import sys
+import argparse
+import importlib
+import contextlib
+
+# Satu entry point untuk script-script pipeline FM:
+#   python fmtool.py modulate    --input Prague.wav --dds
+#   python fmtool.py stream      --port /dev/ttyUSB0 --window 384
+#   python fmtool.py demod-local --input fm_modulated_signal.wav
+#   python fmtool.py hex         --format readmemh
+#   python fmtool.py plot        hasil_demodulasi.wav
+#   python fmtool.py baudtest    --baud 2000000 3125000 --blocks 128 256
+#   python fmtool.py loopback    --virtual
+# File ini hanya meng-import modul standar. Script tujuan (beserta numpy,
+# scipy, matplotlib, serial) baru di-import saat subcommand-nya dijalankan,
+# jadi --help dan subcommand ringan mulai dalam puluhan milidetik.
+#
+# Tiap opsi menimpa satu konstanta KONFIGURASI di script tujuan (dest opsi =
+# nama konstanta) sebelum fungsi utamanya dipanggil. Opsi yang tidak diisi
+# memakai nilai di file script, jadi default tidak diduplikasi di sini.
+
+# === KONFIGURASI ===
+BAUD_TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                             'Testing', 'Testing UART Baudrate')
+
+# subcommand -> (modul, fungsi utama, personality FPGA virtual untuk --virtual)
+SUBCOMMANDS = {
+    'modulate':    ('Modulator', 'main', None),
+    'stream':      ('FPGAProcessing', 'main', 'demod'),
+    'demod-local': ('local_demodulator', 'main', None),
+    'hex':         ('wavtohex', 'convert_wav_to_hex', None),
+    'plot':        ('audio_visualisation', 'plot_waveform', None),
+    'baudtest':    ('Baudtester', 'main', 'loopback'),
+    'loopback':    ('Audiotest', 'run_audio_loopback', 'loopback'),
+}
+
+
+def atur(modul, args):
+    """Timpa konstanta modul dengan semua opsi (dest huruf besar) yang diisi."""
+    for nama, nilai in vars(args).items():
+        if not nama.isupper() or nilai is None:
+            continue
+        if not hasattr(modul, nama):
+            raise AttributeError(f"{modul.__name__} tidak punya konstanta {nama}")
+        setattr(modul, nama, nilai)
+
+
+@contextlib.contextmanager
+def port_target(args, personality):
+    """Nama port: FPGA virtual (pty) jika --virtual, jika tidak --port / default script."""
+    if not getattr(args, 'virtual', False):
+        yield None
+        return
+    from virtual_fpga import VirtualFPGA
+    with VirtualFPGA(personality=personality) as dev:
+        print(f"FPGA virtual ({personality}) di {dev.port}")
+        yield dev.port
+
+
+def jalankan(args):
+    nama_modul, fungsi, personality = SUBCOMMANDS[args.command]
+    if nama_modul in ('Baudtester', 'Audiotest') and BAUD_TEST_DIR not in sys.path:
+        sys.path.insert(0, BAUD_TEST_DIR)
+    modul = importlib.import_module(nama_modul)
+    with port_target(args, personality) as port:
+        if port is not None:
+            args.SERIAL_PORT = port
+        atur(modul, args)
+        getattr(modul, fungsi)()
+    return 0
+
+
+def opsi_serial(p, baud=True):
+    p.add_argument('--port', dest='SERIAL_PORT', help="Port serial (mis. COM7, /dev/ttyUSB0)")
+    if baud:
+        p.add_argument('--baud', dest='BAUD_RATE', type=int)
+    p.add_argument('--virtual', action='store_true', help="Pakai FPGA virtual (virtual_fpga.py)")
+
+
+def buat_parser():
+    parser = argparse.ArgumentParser(
+        description="Pipeline FM: modulasi, streaming ke FPGA, demodulasi, utilitas uji",
+        epilog="Opsi yang tidak diisi memakai konstanta KONFIGURASI di script masing-masing.")
+    sub = parser.add_subparsers(dest='command', required=True, metavar='subcommand')
+
+    p = sub.add_parser('modulate', help="Audio WAV -> sinyal FM 8-bit (Modulator.py)")
+    p.add_argument('--input', dest='INPUT_FILE')
+    p.add_argument('--output', dest='OUTPUT_FM')
+    p.add_argument('--rate', dest='FPGA_RATE', type=int, help="Sample rate FPGA (Hz)")
+    p.add_argument('--carrier', dest='CARRIER_FREQ', type=float)
+    p.add_argument('--dev', dest='DEV_FREQ', type=float)
+    p.add_argument('--block-size', dest='BLOCK_SIZE', type=int)
+    p.add_argument('--dds', dest='DDS_MODE', action='store_const', const=True,
+                   help="Phase accumulator uint32 + LUT nco.vhd")
+    p.add_argument('--no-cache', dest='USE_CACHE', action='store_const', const=False)
+    p.add_argument('--whole-file', dest='STREAM_MODE', action='store_const', const=False,
+                   help="Metode lama (seluruh file di memori, signal.resample)")
+
+    p = sub.add_parser('stream', help="Kirim sinyal FM ke FPGA, simpan audio (FPGAProcessing.py)")
+    opsi_serial(p)
+    p.add_argument('--input', dest='INPUT_FM_WAV')
+    p.add_argument('--output', dest='OUTPUT_FINAL')
+    p.add_argument('--rate', dest='TARGET_RATE', type=int, help="Rate audio output (Hz)")
+    p.add_argument('--window', dest='WINDOW', type=int, help="Maks. byte in-flight (full-duplex)")
+    p.add_argument('--chunk', dest='CHUNK_SIZE', type=int, help="Byte per kirim (--lockstep)")
+    p.add_argument('--sleep', dest='SLEEP_TIME', type=float, help="Jeda per kirim (--lockstep)")
+    p.add_argument('--lockstep', dest='FULL_DUPLEX', action='store_const', const=False,
+                   help="Mode lama kirim-jeda-baca")
+    p.add_argument('--framed', dest='FRAMED', action='store_const', const=True)
+    p.add_argument('--shard-ports', dest='SHARD_PORTS', nargs='+', metavar='PORT')
+    p.add_argument('--trace', dest='TRACE', action='store_const', const=True)
+    p.add_argument('--no-capture', dest='CAPTURE', action='store_const', const=False,
+                   help="Jangan catat byte TX/RX ke capture log")
+    p.add_argument('--capture-log', dest='CAPTURE_LOG')
+    p.add_argument('--replay', dest='REPLAY', type=int, metavar='SESI',
+                   help="Proses ulang sesi terekam tanpa FPGA (-1 = terakhir)")
+
+    p = sub.add_parser('demod-local', help="Demodulasi FM di software (local_demodulator.py)")
+    p.add_argument('--input', dest='INPUT_FILE')
+    p.add_argument('--output', dest='OUTPUT_FILE')
+    p.add_argument('--carrier', dest='CARRIER_FREQ', type=float)
+    p.add_argument('--dev', dest='DEV_FREQ', type=float)
+    p.add_argument('--bandwidth', dest='CHANNEL_BW', type=float)
+    p.add_argument('--taps', dest='NUM_TAPS', type=int)
+    p.add_argument('--rate', dest='AUDIO_RATE', type=int)
+    p.add_argument('--block-size', dest='BLOCK_SIZE', type=int)
+    p.add_argument('--no-normalize', dest='NORMALIZE', action='store_const', const=False)
+    p.add_argument('--hilbert', dest='STREAM_MODE', action='store_const', const=False,
+                   help="Metode lama (Hilbert seluruh file)")
+
+    p = sub.add_parser('hex', help="WAV -> file input testbench Questa (wavtohex.py)")
+    p.add_argument('--input', dest='INPUT_WAV')
+    p.add_argument('--output', dest='OUTPUT_TXT')
+    p.add_argument('--format', dest='OUTPUT_FORMAT', choices=['hex', 'readmemh', 'bin', 'split'])
+    p.add_argument('--parts', dest='SPLIT_PARTS', type=int)
+    p.add_argument('--overlap', dest='SPLIT_OVERLAP', type=int)
+    p.add_argument('--per-line', dest='READMEMH_PER_LINE', type=int)
+    p.add_argument('--block-size', dest='BLOCK_SIZE', type=int)
+
+    p = sub.add_parser('plot', help="Plot waveform WAV 8-bit (audio_visualisation.py)")
+    p.add_argument('FILENAME', nargs='?')
+    p.add_argument('--max-points', dest='MAX_POINTS', type=int)
+
+    p = sub.add_parser('baudtest', help="Uji BER/throughput UART loopback (Baudtester.py)")
+    opsi_serial(p, baud=False)
+    p.add_argument('--baud', dest='BAUD_RATES', type=int, nargs='+')
+    p.add_argument('--blocks', dest='BLOCK_SIZES', type=int, nargs='+')
+    p.add_argument('--bytes', dest='BENCH_BYTES', type=int)
+    p.add_argument('--prbs', dest='PRBS_ORDER', type=int, choices=[7, 15])
+    p.add_argument('--window', dest='WINDOW', type=int, help="Maks. byte in-flight")
+    p.add_argument('--csv', dest='RESULTS_CSV')
+    p.add_argument('--json', dest='RESULTS_JSON')
+    p.add_argument('--single-byte', dest='BENCHMARK_MODE', action='store_const', const=False,
+                   help="Uji lama 1000 round trip per byte (baud = --baud pertama)")
+
+    p = sub.add_parser('loopback', help="Kirim file lewat UART loopback (Audiotest.py)")
+    opsi_serial(p)
+    p.add_argument('--input', dest='INPUT_FILE')
+    p.add_argument('--output', dest='OUTPUT_FILE')
+    p.add_argument('--chunk', dest='CHUNK_SIZE', type=int)
+    return parser
+
+
+def main(argv=None):
+    args = buat_parser().parse_args(argv)
+    if args.command == 'baudtest' and args.BAUD_RATES:
+        args.BAUD_RATE = args.BAUD_RATES[0]
+    return jalankan(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
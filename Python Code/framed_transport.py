@@ -0,0 +1,162 @@
+import struct
+import binascii
+
+import numpy as np
+
+from serial_stream import stream_full_duplex, WINDOW_SIZE
+
+# Transport UART ber-frame: sampel dikirim dalam frame kecil dengan nomor
+# urut dan CRC, perangkat membalas dengan frame yang sama panjang.
+# Frame yang hilang/rusak (mis. FIFO RX overflow) terdeteksi per frame,
+# lalu HANYA frame itu yang dikirim ulang. Karena PLL punya state, frame
+# ulang didahului beberapa frame sebelumnya sebagai warm-up (outputnya
+# dibuang) supaya loop sudah lock lagi saat sampel yang dibutuhkan tiba.
+#
+# Format frame (little-endian), sama untuk host -> FPGA dan FPGA -> host:
+#   A5 5A | seq (u32) | warmup (u16) | length (u16) | payload (length byte) | crc (u16)
+#   warmup = jumlah sampel awal payload yang hanya untuk warm-up
+#   crc    = binascii.crc_hqx(seq..payload, 0xFFFF)  (CRC-16-CCITT)
+
+# === KONFIGURASI ===
+FRAME_SYNC     = b'\xA5\x5A'
+FRAME_PAYLOAD  = 240               # Sampel per frame (frame 252 byte < window in-flight)
+MAX_PAYLOAD    = 4096
+WARMUP_SAMPLES = 2000              # Sampel warm-up PLL sebelum frame yang dikirim ulang (10 ms)
+MAX_PASSES     = 4                 # 1 pass penuh + maksimal 3 pass kirim ulang
+CRC_INIT       = 0xFFFF
+
+_HEADER = struct.Struct('<IHH')
+HEADER_SIZE = len(FRAME_SYNC) + _HEADER.size
+FRAME_OVERHEAD = HEADER_SIZE + 2
+
+
+def encode_frame(seq, payload, warmup=0):
+    """Bangun satu frame (bytes) dari nomor urut dan payload."""
+    payload = bytes(payload)
+    body = _HEADER.pack(seq & 0xFFFFFFFF, warmup, len(payload)) + payload
+    return FRAME_SYNC + body + struct.pack('<H', binascii.crc_hqx(body, CRC_INIT))
+
+
+class FrameDecoder:
+    """
+    Pengurai frame streaming: feed() menerima potongan byte sembarang dan
+    mengembalikan frame yang sudah lengkap & valid. Byte sampah atau frame
+    dengan CRC salah dilewati dengan mencari sync berikutnya.
+    """
+
+    def __init__(self, max_payload=MAX_PAYLOAD):
+        self.max_payload = max_payload
+        self.buf = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.skipped = 0
+
+    def feed(self, data):
+        """
+        Mengembalikan list (seq, warmup, payload, end); end = jumlah byte
+        'data' yang sudah terpakai saat frame itu lengkap.
+        """
+        base = len(self.buf)
+        self.buf.extend(data)
+        buf = self.buf
+        frames = []
+        pos = 0
+        while True:
+            i = buf.find(FRAME_SYNC, pos)
+            if i < 0:
+                # Sisakan byte terakhir jika mungkin awal sync
+                keep = len(buf) - 1 if buf[-1:] == FRAME_SYNC[:1] else len(buf)
+                self.skipped += keep - pos
+                pos = keep
+                break
+            self.skipped += i - pos
+            pos = i
+            if len(buf) - i < HEADER_SIZE:
+                break
+            seq, warmup, length = _HEADER.unpack_from(buf, i + len(FRAME_SYNC))
+            if length > self.max_payload or warmup > length:
+                self.skipped += 1
+                pos = i + 1
+                continue
+            end = i + HEADER_SIZE + length + 2
+            if len(buf) < end:
+                break
+            body = bytes(buf[i + len(FRAME_SYNC):end - 2])
+            if binascii.crc_hqx(body, CRC_INIT) != struct.unpack_from('<H', buf, end - 2)[0]:
+                self.crc_errors += 1
+                pos = i + 1
+                continue
+            frames.append((seq, warmup, body[_HEADER.size:], end - base))
+            self.frames += 1
+            pos = end
+        del buf[:pos]
+        return frames
+
+
+def stream_framed(ser, samples, frame_size=FRAME_PAYLOAD, warmup=WARMUP_SAMPLES,
+                  max_passes=MAX_PASSES, window=WINDOW_SIZE, show_progress=True):
+    """
+    Kirim sampel uint8 ber-frame dan rakit kembali outputnya.
+    Pass pertama mengirim semua frame berurutan (tanpa warm-up, PLL
+    berjalan kontinu). Pass berikutnya hanya mengirim frame yang belum
+    diterima, masing-masing didahului frame warm-up sepanjang 'warmup'
+    sampel. Mengembalikan (output uint8, stats).
+    """
+    data = np.frombuffer(memoryview(samples).cast('B'), dtype=np.uint8)
+    n = len(data)
+    n_frames = -(-n // frame_size)
+    out = np.full(n, 128, dtype=np.uint8)
+    done = np.zeros(n_frames, dtype=bool)
+    decoder = FrameDecoder()
+    warm_frames = -(-warmup // frame_size)
+    stats = {'frames': n_frames, 'passes': 0, 'retransmitted': 0, 'warmup_frames': 0,
+             'elapsed': 0.0, 'bytes_sent': 0}
+
+    def on_data(view):
+        for seq, warm, payload, _ in decoder.feed(view):
+            if seq >= n_frames or done[seq]:
+                continue
+            start = seq * frame_size
+            count = min(frame_size, n - start)
+            if len(payload) - warm != count:
+                continue
+            out[start:start + count] = np.frombuffer(payload, dtype=np.uint8, offset=warm)
+            done[seq] = True
+
+    todo = np.arange(n_frames)
+    while len(todo) and stats['passes'] < max_passes:
+        parts = []
+        for seq in todo.tolist():
+            start = seq * frame_size
+            end = min(start + frame_size, n)
+            if stats['passes'] > 0:
+                # Warm-up: frame-frame sebelumnya, output seluruhnya dibuang
+                for w in range(max(0, seq - warm_frames), seq):
+                    ws = w * frame_size
+                    parts.append(encode_frame(seq, data[ws:ws + frame_size], frame_size))
+                    stats['warmup_frames'] += 1
+                stats['retransmitted'] += 1
+            parts.append(encode_frame(seq, data[start:end]))
+        tx = b''.join(parts)
+        if show_progress:
+            label = "Pass 1" if stats['passes'] == 0 else f"Kirim ulang {len(todo)} frame"
+            print(f"{label}: {len(tx)} byte")
+        _, st = stream_full_duplex(ser, tx, window=window, show_progress=show_progress,
+                                   on_data=on_data)
+        stats['passes'] += 1
+        stats['elapsed'] += st['elapsed']
+        stats['bytes_sent'] += st['sent']
+        todo = np.nonzero(~done)[0]
+
+    stats['missing_frames'] = int(len(todo))
+    stats['crc_errors'] = decoder.crc_errors
+    stats['efficiency'] = n / stats['bytes_sent'] if stats['bytes_sent'] else 0.0
+    return out, stats
+
+
+def print_framed_stats(stats):
+    print(f"Frame          : {stats['frames']} dalam {stats['passes']} pass, "
+          f"{stats['retransmitted']} dikirim ulang (+{stats['warmup_frames']} frame warm-up)")
+    print(f"CRC error      : {stats['crc_errors']}, frame hilang: {stats['missing_frames']}")
+    print(f"Waktu transfer : {stats['elapsed']:.2f} detik, "
+          f"efisiensi payload {stats['efficiency']*100:.1f}%")
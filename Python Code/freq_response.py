@@ -0,0 +1,244 @@
+import sys
+import csv
+import argparse
+
+import numpy as np
+import scipy.signal as signal
+
+import Modulator
+
+# Respons frekuensi demodulator dalam SATU transfer: semua nada uji
+# (stepped sweep) atau satu chirp logaritmik dimodulasi menjadi satu sinyal
+# FM kontinu, dikirim sekali (hardware, FPGA virtual, atau golden model),
+# lalu gain & fase tiap frekuensi diukur dari output.
+#   - Latensi disejajarkan otomatis dengan korelasi silang (FFT) terhadap
+#     audio asli, bukan 'latency = 20' tetap.
+#   - Stepped: tiap nada di-fit least-squares [cos, sin, DC] di jendelanya,
+#     semua nada sekaligus (matriks jendela x sampel).
+#   - Chirp : H(f) = Pxy / Pxx (Welch cross-spectrum) di frekuensi nada.
+# Gain dilaporkan relatif terhadap gain di REF_FREQ.
+
+# === KONFIGURASI ===
+SAMPLE_RATE     = Modulator.FPGA_RATE
+SERIAL_PORT     = 'COM7'
+BAUD_RATE       = 2000000
+SWEEP_MODE      = 'stepped'       # 'stepped' atau 'chirp'
+F_MIN           = 50.0
+F_MAX           = 15000.0
+N_TONES         = 30              # Titik frekuensi (log-spaced)
+AMPLITUDE       = 0.8             # Amplitudo audio (1.0 = deviasi penuh DEV_FREQ)
+LEAD_IN         = 0.05            # Detik carrier tanpa modulasi di awal (PLL lock)
+TONE_TIME       = 0.03            # Detik per nada (stepped)
+GUARD_TIME      = 0.005           # Detik awal tiap nada yang tidak diukur (transien)
+CHIRP_TIME      = 1.0             # Detik chirp F_MIN -> F_MAX
+CHIRP_OVERSHOOT = 1.25            # Chirp berakhir di F_MAX x ini
+CSD_NPERSEG     = 8192            # Panjang segmen cross-spectrum (chirp)
+MAX_LAG         = 0.005           # Pencarian latensi maksimum (detik)
+REF_FREQ        = 1000.0          # Gain 0 dB
+RESULT_CSV      = 'freq_response.csv'
+
+
+def frekuensi_uji(f_min=F_MIN, f_max=F_MAX, n=N_TONES):
+    return np.geomspace(f_min, f_max, n)
+
+
+def buat_sweep(mode=SWEEP_MODE, freqs=None, fs=SAMPLE_RATE):
+    """
+    Audio uji di rate FPGA: lead-in hening, sweep, lalu ekor hening sepanjang
+    MAX_LAG (output nada terakhir tetap terukur setelah digeser latensi).
+    Mengembalikan (audio float64, daftar jendela ukur (mulai, akhir) atau None untuk chirp).
+    """
+    freqs = frekuensi_uji() if freqs is None else freqs
+    lead = int(LEAD_IN * fs)
+    tail = np.zeros(int(MAX_LAG * fs))
+    if mode == 'chirp':
+        # Chirp sedikit melewati F_MAX supaya titik terakhir tidak di tepi spektrum
+        t = np.arange(int(CHIRP_TIME * fs)) / fs
+        sweep = AMPLITUDE * signal.chirp(t, freqs[0], CHIRP_TIME, freqs[-1] * CHIRP_OVERSHOOT,
+                                         method='logarithmic', phi=-90)
+        return np.concatenate((np.zeros(lead), sweep, tail)), None
+    if mode != 'stepped':
+        raise ValueError(f"Mode sweep tidak dikenal: {mode}")
+
+    n_tone = int(TONE_TIME * fs)
+    guard = int(GUARD_TIME * fs)
+    # Fase kontinu antar nada: frekuensi sesaat per sampel, lalu cumsum
+    f_inst = np.repeat(freqs, n_tone)
+    phase = 2 * np.pi * np.cumsum(f_inst) / fs
+    sweep = AMPLITUDE * np.sin(phase)
+    starts = lead + np.arange(len(freqs)) * n_tone + guard
+    windows = np.stack((starts, starts + n_tone - guard), axis=1)
+    return np.concatenate((np.zeros(lead), sweep, tail)), windows
+
+
+def modulasi(audio):
+    """Audio (-1..1) di SAMPLE_RATE -> sampel FM uint8, sama dengan Modulator.py."""
+    fm, _ = Modulator.modulasi_blok(audio, -2 * np.pi * Modulator.CARRIER_FREQ / SAMPLE_RATE)
+    return fm
+
+
+def demodulasi_model(fm):
+    from fm_golden_model import FMDemodulatorModel
+    return FMDemodulatorModel().process(fm)
+
+
+def demodulasi_serial(fm, port, baud_rate=BAUD_RATE):
+    """Kirim satu transfer full-duplex ke FPGA (atau pty FPGA virtual)."""
+    import serial
+    from serial_stream import stream_full_duplex, print_stats
+    ser = serial.Serial(port, baud_rate, timeout=2)
+    try:
+        ser.reset_input_buffer()
+        rx, stats = stream_full_duplex(ser, np.ascontiguousarray(fm))
+    finally:
+        ser.close()
+    print_stats(stats)
+    return np.frombuffer(rx, dtype=np.uint8).copy()
+
+
+def estimasi_latensi(audio, out, fs=SAMPLE_RATE, max_lag=MAX_LAG):
+    """Delay (sampel) output terhadap audio dari puncak korelasi silang FFT di +-max_lag."""
+    n = min(len(audio), len(out))
+    x = audio[:n] - np.mean(audio[:n])
+    y = out[:n].astype(np.float64) - np.mean(out[:n])
+    corr = signal.correlate(y, x, mode='full', method='fft')
+    lag_max = int(max_lag * fs)
+    center = n - 1
+    window = corr[center - lag_max:center + lag_max + 1]
+    return int(np.argmax(np.abs(window))) - lag_max
+
+
+def fit_nada(x, y, freqs, windows, fs=SAMPLE_RATE):
+    """
+    Least-squares y ~ a cos(wn) + b sin(wn) + c per jendela, untuk x dan y,
+    semua nada sekaligus. Mengembalikan H = Y / X (kompleks) per nada.
+    """
+    w_len = int(np.min(windows[:, 1] - windows[:, 0]))
+    idx = windows[:, :1] + np.arange(w_len)                      # (nada, sampel)
+    wn = 2 * np.pi * freqs[:, None] * idx / fs
+    basis = np.stack((np.cos(wn), np.sin(wn), np.ones_like(wn)), axis=2)   # (nada, sampel, 3)
+    gram = np.einsum('kni,knj->kij', basis, basis)
+
+    def amplitudo(sig):
+        rhs = np.einsum('kni,kn->ki', basis, sig[idx])
+        a, b, _ = np.linalg.solve(gram, rhs[..., None])[..., 0].T
+        return a - 1j * b                                        # a cos + b sin = Re{(a - jb) e^{jwn}}
+
+    return amplitudo(y) / amplitudo(x)
+
+
+def respons_chirp(x, y, freqs, fs=SAMPLE_RATE, nperseg=CSD_NPERSEG):
+    """H(f) = Pxy / Pxx (Welch) diinterpolasi ke frekuensi nada."""
+    f, pxy = signal.csd(x, y, fs, nperseg=nperseg)
+    _, pxx = signal.welch(x, fs, nperseg=nperseg)
+    h = pxy / np.maximum(pxx, 1e-30)
+    return np.interp(freqs, f, h.real) + 1j * np.interp(freqs, f, h.imag)
+
+
+def ukur_respons(audio, out, freqs, windows, fs=SAMPLE_RATE):
+    """Sejajarkan latensi lalu ukur respons. Mengembalikan dict hasil."""
+    delay = estimasi_latensi(audio, out, fs)
+    y = out.astype(np.float64) - 128.0
+    # Geser output supaya sampel ke-n sejajar dengan audio ke-n
+    if delay >= 0:
+        y = y[delay:]
+    else:
+        y = np.concatenate((np.zeros(-delay), y))
+    n = min(len(audio), len(y))
+    x, y = audio[:n], y[:n]
+    if windows is None:
+        lead = int(LEAD_IN * fs)
+        h = respons_chirp(x[lead:], y[lead:], freqs, fs)
+    else:
+        windows = windows[windows[:, 1] <= n]
+        freqs = freqs[:len(windows)]
+        h = fit_nada(x, y, freqs, windows, fs)
+
+    ref = h[np.argmin(np.abs(freqs - REF_FREQ))]
+    gain_db = 20 * np.log10(np.abs(h) / np.abs(ref))
+    phase = np.unwrap(np.angle(h / ref))
+    below = np.nonzero((gain_db < -3.0) & (freqs > REF_FREQ))[0]
+    return {
+        'freqs': freqs, 'h': h, 'gain_db': gain_db, 'phase_deg': np.degrees(phase),
+        'delay': delay, 'lsb_per_unit': float(np.abs(ref)),
+        'f_3db': float(freqs[below[0]]) if len(below) else None,
+    }
+
+
+def cetak_hasil(res):
+    print(f"Latensi: {res['delay']} sampel ({res['delay'] / SAMPLE_RATE * 1e6:.0f} us), "
+          f"gain di {REF_FREQ:.0f} Hz = {res['lsb_per_unit']:.1f} LSB per satuan audio")
+    print(f"{'Frekuensi':>10} {'Gain (dB)':>10} {'Fase (deg)':>11}")
+    for f, g, p in zip(res['freqs'], res['gain_db'], res['phase_deg']):
+        print(f"{f:>9.0f}  {g:>10.2f} {p:>11.1f}")
+    if res['f_3db']:
+        print(f"Titik -3 dB: ~{res['f_3db']:.0f} Hz")
+    else:
+        print(f"Gain tidak turun 3 dB sampai {res['freqs'][-1]:.0f} Hz")
+
+
+def simpan_csv(res, path=RESULT_CSV):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['freq_hz', 'gain_db', 'phase_deg'])
+        for row in zip(res['freqs'], res['gain_db'], res['phase_deg']):
+            writer.writerow([f"{v:.3f}" for v in row])
+
+
+def plot_respons(res, judul):
+    import matplotlib.pyplot as plt
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+    ax1.semilogx(res['freqs'], res['gain_db'], 'o-', color='blue')
+    ax1.axhline(-3, color='red', linestyle='--', linewidth=0.8)
+    ax1.set_ylabel("Gain (dB)")
+    ax1.set_title(judul)
+    ax1.grid(True, which='both', alpha=0.3)
+    ax2.semilogx(res['freqs'], res['phase_deg'], 'o-', color='green')
+    ax2.set_ylabel("Fase (derajat)")
+    ax2.set_xlabel("Frekuensi audio (Hz)")
+    ax2.grid(True, which='both', alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respons frekuensi demodulator dalam satu transfer")
+    parser.add_argument('--mode', choices=['stepped', 'chirp'], default=SWEEP_MODE)
+    parser.add_argument('--target', choices=['model', 'hardware', 'virtual'], default='model')
+    parser.add_argument('--port', default=SERIAL_PORT)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    freqs = frekuensi_uji()
+    audio, windows = buat_sweep(args.mode, freqs)
+    fm = modulasi(audio)
+    print(f"Sweep {args.mode}: {len(freqs)} titik {freqs[0]:.0f}-{freqs[-1]:.0f} Hz, "
+          f"{len(fm)} sampel ({len(fm) / SAMPLE_RATE:.2f} detik) dalam satu transfer")
+
+    if args.target == 'model':
+        out = demodulasi_model(fm)
+    elif args.target == 'virtual':
+        from virtual_fpga import VirtualFPGA
+        with VirtualFPGA(personality='demod') as dev:
+            out = demodulasi_serial(fm, dev.port)
+    else:
+        try:
+            out = demodulasi_serial(fm, args.port)
+        except Exception as e:
+            print(f"Gagal: {e}")
+            return 1
+    if len(out) < len(fm) // 2:
+        print(f"Error: hanya {len(out)} dari {len(fm)} byte diterima.")
+        return 1
+
+    res = ukur_respons(audio, out, freqs, windows)
+    cetak_hasil(res)
+    simpan_csv(res)
+    print(f"Hasil tersimpan di {RESULT_CSV}")
+    if not args.no_plot:
+        plot_respons(res, f"Respons frekuensi demodulator ({args.target}, {args.mode})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,12 @@ import numpy as np
 import matplotlib.pyplot as plt
 import time
 
+from dds_modulator import DDSModulator
+from signal_cache import SignalCache
+from serial_stream import baca_tersedia
+from serial_trace import SerialTracer, print_ringkasan
+from capture_log import mulai_capture, buka_replay, konfigurasi, LOG_FILE
+
 # ==============================================================================
 # KONFIGURASI
 # ==============================================================================
@@ -13,8 +19,15 @@ CARRIER_FREQ = 50000
 DEV_FREQ     = 5000        
 MSG_FREQ     = 440         
 SAMPLE_RATE  = 200000   
+DDS_MODE     = False       # True = phase accumulator uint32 + LUT nco.vhd
+BLOCK_SIZE   = 65536       # Sampel per blok untuk mode DDS
+USE_CACHE    = True        # Pakai ulang sinyal uji yang sama dari cache .npy
+TRACE        = False       # True = catat tiap write/read -> serial_trace.csv/.json
+CAPTURE      = True        # True = byte TX/RX + konfigurasi dicatat ke CAPTURE_LOG
+CAPTURE_LOG  = LOG_FILE    # Log append-only, lihat capture_log.py
+REPLAY       = None        # ID sesi di CAPTURE_LOG (-1 = terakhir): plot ulang tanpa FPGA
 
-def generate_fm_signal():
+def buat_fm_signal():
     """
     Membuat sinyal FM dan mengembalikan juga sinyal pesan aslinya untuk referensi.
     """
@@ -23,6 +36,14 @@ def generate_fm_signal():
     # 1. Sinyal Audio Asli (Pesan) - Range -1.0 s.d +1.0
     msg = np.sin(2 * np.pi * MSG_FREQ * t)
     
+    if DDS_MODE:
+        # 2+3. Modulasi FM integer per blok, sama persis dengan NCO hardware
+        dds = DDSModulator(SAMPLE_RATE, CARRIER_FREQ, DEV_FREQ)
+        fm_signal = np.empty(len(msg), dtype=np.uint8)
+        for i in range(0, len(msg), BLOCK_SIZE):
+            fm_signal[i:i+BLOCK_SIZE] = dds.process(msg[i:i+BLOCK_SIZE])
+        return fm_signal, t, msg
+
     # 2. Modulasi FM
     phase_accum = np.cumsum(msg) / SAMPLE_RATE
     inst_phase = 2 * np.pi * CARRIER_FREQ * t + 2 * np.pi * DEV_FREQ * phase_accum
@@ -32,50 +53,101 @@ def generate_fm_signal():
     
     return fm_signal.astype(np.uint8), t, msg
 
-def main():
+def generate_fm_signal():
+    """
+    Sinyal FM uji (fm uint8, t, pesan asli), diambil dari cache jika
+    parameter sama dengan run sebelumnya.
+    """
+    if not USE_CACHE:
+        return buat_fm_signal()
+    params = {'SAMPLE_RATE': SAMPLE_RATE, 'CARRIER_FREQ': CARRIER_FREQ, 'DEV_FREQ': DEV_FREQ,
+              'MSG_FREQ': MSG_FREQ, 'DURATION': DURATION, 'DDS_MODE': DDS_MODE}
+    if DDS_MODE:
+        from fm_golden_model import nco_lut_hash
+        params['NCO_LUT'] = nco_lut_hash()          # Tabel baru = sinyal DDS baru
+    arrays = SignalCache().get_or_create(
+        'freqsendder', params, lambda: dict(zip(('fm', 't', 'msg'), buat_fm_signal())))
+    return arrays['fm'], arrays['t'], arrays['msg']
+
+def kirim_terima(tx_data):
+    """Kirim sinyal uji ke FPGA dan kumpulkan balasannya (None jika port gagal dibuka)."""
     print(f"Menghubungkan ke {SERIAL_PORT}...")
     try:
         ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=2)
     except Exception as e:
         print(f"Error: {e}")
-        return
+        return None
+    log = None
+    if CAPTURE:
+        ser, log = mulai_capture(ser, CAPTURE_LOG, 'freqsendder', konfigurasi(globals()))
 
-    # --- 1. GENERATE ---
-    tx_data, time_axis, original_msg = generate_fm_signal()
     print(f"Mengirim {len(tx_data)} bytes...")
-
-    # --- 2. KIRIM & TERIMA ---
     ser.reset_input_buffer()
     ser.reset_output_buffer()
     rx_data = bytearray()
     CHUNK_SIZE = 2048 
+    tracer = SerialTracer() if TRACE else None
     
     start_time = time.time()
     
     for i in range(0, len(tx_data), CHUNK_SIZE):
-        ser.write(tx_data[i:i+CHUNK_SIZE].tobytes())
+        chunk = tx_data[i:i+CHUNK_SIZE].tobytes()
+        if tracer is not None:
+            t_write = tracer.now()
+        ser.write(chunk)
+        if tracer is not None:
+            tracer.catat('write', t_write, tracer.now(), len(chunk), i + len(chunk) - len(rx_data))
         time.sleep(0.002) 
-        while ser.in_waiting > 0:
-            rx_data.extend(ser.read(ser.in_waiting))
+        baca_tersedia(ser, rx_data, tracer)
 
     # Timeout loop untuk sisa data
     timeout_counter = 0
     while len(rx_data) < len(tx_data) and timeout_counter < 50:
         if ser.in_waiting > 0:
-            rx_data.extend(ser.read(ser.in_waiting))
+            baca_tersedia(ser, rx_data, tracer)
             timeout_counter = 0
         else:
+            if tracer is not None:
+                t_wait = tracer.now()
             time.sleep(0.01)
+            if tracer is not None:
+                tracer.catat('stall', t_wait, tracer.now())
             timeout_counter += 1
             
     print(f"Selesai. Diterima: {len(rx_data)} bytes.")
+    if tracer is not None:
+        tracer.catat_sisa(len(tx_data), len(rx_data))
     ser.close()
+    if log is not None:
+        log.close()
+    if tracer is not None:
+        print_ringkasan(tracer.ringkasan())
+        print(f"Trace tersimpan di: {', '.join(tracer.simpan())}")
+    return rx_data
+
+def main():
+    # --- 1. GENERATE ---
+    tx_data, time_axis, original_msg = generate_fm_signal()
+
+    # --- 2. KIRIM & TERIMA (atau ambil dari capture log) ---
+    if REPLAY is not None:
+        try:
+            reader, sesi = buka_replay(CAPTURE_LOG, REPLAY)
+            rx_data = reader.baca(sesi)
+        except (OSError, ValueError) as e:
+            print(f"Replay gagal: {e}")
+            return
+        print(f"Replay sesi {sesi}: {len(rx_data)} bytes dari {CAPTURE_LOG}")
+    else:
+        rx_data = kirim_terima(tx_data)
+        if rx_data is None:
+            return
 
     if len(rx_data) == 0:
         return
 
     # --- 3. PROSES DATA ---
-    rx_values = np.array(list(rx_data), dtype=np.uint8).astype(float)
+    rx_values = np.frombuffer(rx_data, dtype=np.uint8).astype(float)
 
     # Scalling Pesan Asli supaya bisa dibandingkan dengan Unsigned 0-255
     # Asli (-1..1) -> Geser jadi (0..255)
@@ -1,11 +1,149 @@
 import numpy as np
 import scipy.io.wavfile as wav
 import scipy.signal as signal
+import time
+import wave
+
+from stream_resampler import StreamResampler
 
 # CONFIGURATION
 INPUT_FILE = 'fm_signal.wav'
 OUTPUT_FILE = 'verified_software_demod.wav'
 
+# Streaming demodulator settings
+STREAM_MODE  = True        # False = original whole-file Hilbert method
+CARRIER_FREQ = 50000       # Must match the modulator
+DEV_FREQ     = 5000        # Full-scale deviation (audio 1.0 <-> 5 kHz)
+CHANNEL_BW   = 15000       # Low-pass cutoff after mixing to baseband (Hz)
+NUM_TAPS     = 127         # Channel filter length
+AUDIO_RATE   = 44100       # Output WAV rate
+BLOCK_SIZE   = 1 << 16     # Input samples per block
+NORMALIZE    = True        # Second pass over the output WAV to boost to full scale
+
+class OverlapSaveFilter:
+    """FIR filter applied block by block with FFT overlap-save (state kept between blocks)."""
+
+    def __init__(self, taps, block_size):
+        self.taps = np.asarray(taps)
+        self.n_fft = 1 << int(np.ceil(np.log2(block_size + len(taps) - 1)))
+        self.H = np.fft.fft(self.taps, self.n_fft).astype(np.complex64)
+        self.history = np.zeros(len(taps) - 1, dtype=np.complex64)
+
+    def process(self, x):
+        out = np.empty(len(x), dtype=np.complex64)
+        keep = len(self.taps) - 1
+        step = self.n_fft - keep
+        for i in range(0, len(x), step):
+            seg = np.concatenate((self.history, x[i:i+step]))
+            y = np.fft.ifft(np.fft.fft(seg, self.n_fft) * self.H)
+            n = len(seg) - keep
+            out[i:i+n] = y[keep:keep+n]
+            self.history = seg[len(seg)-keep:] if keep else seg[:0]
+        return out
+
+def quadrature_blocks(data, fs):
+    """
+    Generator: FM samples (uint8) -> instantaneous frequency deviation in Hz, per block.
+    Mix to baseband, channel low-pass (overlap-save), then conjugate-product angle.
+    """
+    lpf = OverlapSaveFilter(signal.firwin(NUM_TAPS, CHANNEL_BW / (fs / 2)), BLOCK_SIZE)
+    w = 2 * np.pi * CARRIER_FREQ / fs
+    lo_phase = 0.0
+    prev = np.complex64(0)
+    skip = (NUM_TAPS - 1) // 2      # Channel filter group delay, dropped so output lines up with input
+
+    for i in range(0, len(data), BLOCK_SIZE):
+        block = np.asarray(data[i:i+BLOCK_SIZE])
+        if len(block.shape) > 1:
+            block = block[:, 0]
+        x = (block.astype(np.float32) - 127.5) / 127.5
+
+        # 1. Mix down (phase continuous across blocks)
+        n = np.arange(len(x))
+        lo = np.exp(-1j * (lo_phase + w * n)).astype(np.complex64)
+        lo_phase = (lo_phase + w * len(x)) % (2 * np.pi)
+        z = lpf.process(x * lo)
+
+        # 2. Quadrature discriminator: angle(z[n] * conj(z[n-1]))
+        z_prev = np.concatenate(([prev], z[:-1]))
+        prev = z[-1]
+        freq_dev = np.angle(z * np.conj(z_prev)) * (fs / (2 * np.pi))
+        if skip:
+            cut = min(skip, len(freq_dev))
+            freq_dev = freq_dev[cut:]
+            skip -= cut
+        if len(freq_dev):
+            yield freq_dev
+
+def normalize_wav_in_place(path):
+    """Scale an int16 WAV to full scale without loading it (memmap, in place)."""
+    with wave.open(path, 'rb') as f:
+        n = f.getnframes()
+    if n == 0:
+        return
+    audio = np.memmap(path, dtype=np.int16, mode='r+', offset=44, shape=(n,))
+    peak = 0
+    for i in range(0, n, BLOCK_SIZE):
+        peak = max(peak, int(np.max(np.abs(audio[i:i+BLOCK_SIZE].astype(np.int32)))))
+    if peak > 0:
+        gain = 32767 / peak
+        for i in range(0, n, BLOCK_SIZE):
+            audio[i:i+BLOCK_SIZE] = (audio[i:i+BLOCK_SIZE] * gain).astype(np.int16)
+    audio.flush()
+    del audio
+
+def demodulate_streaming(input_file=None, output_file=None):
+    input_file = input_file or INPUT_FILE
+    output_file = output_file or OUTPUT_FILE
+    print(f"Analyzing {input_file} (streaming)...")
+
+    try:
+        fs, data = wav.read(input_file, mmap=True)
+        start_time = time.time()
+
+        resampler = StreamResampler(fs, AUDIO_RATE)
+        max_dev = 0.0
+        n_out = 0
+
+        with wave.open(output_file, 'wb') as f_out:
+            f_out.setnchannels(1)
+            f_out.setsampwidth(2)
+            f_out.setframerate(AUDIO_RATE)
+
+            def write(audio):
+                nonlocal n_out
+                f_out.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+                n_out += len(audio)
+
+            for freq_dev in quadrature_blocks(data, fs):
+                max_dev = max(max_dev, float(np.max(np.abs(freq_dev))))
+                # Deviation in Hz -> audio (-1..1), decimated inside the pipeline
+                write(resampler.process(freq_dev / DEV_FREQ))
+            write(resampler.flush())
+
+        elapsed = time.time() - start_time
+        duration = len(data) / fs
+
+        # Same unit as the original check: radians per sample
+        max_val = max_dev * 2 * np.pi / fs
+        print(f"Detected Max Deviation: {max_val:.6f}")
+        if max_val < 0.01:
+            print("WARNING: The modulation is extremely weak!")
+            print("The FPGA probably can't detect these tiny changes.")
+            print("Solution: Increase MODULATION_INDEX in your modulator script.")
+        else:
+            print("Signal strength looks good.")
+
+        if NORMALIZE:
+            normalize_wav_in_place(output_file)
+
+        print(f"Processed {duration:.2f} s of signal in {elapsed:.2f} s "
+              f"({duration/elapsed:.1f}x real time, {len(data)/elapsed/1e6:.2f} Msamples/s)")
+        print(f"Success! Listen to '{output_file}' to hear what the file contains.")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
 def verify_modulation():
     print(f"Analyzing {INPUT_FILE}...")
     
@@ -55,5 +193,11 @@ def verify_modulation():
     except Exception as e:
         print(f"Error: {e}")
 
+def main():
+    if STREAM_MODE:
+        demodulate_streaming()
+    else:
+        verify_modulation()
+
 if __name__ == "__main__":
-    verify_modulation()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import wave
+import argparse
+
+import numpy as np
+import scipy.io.wavfile as wav
+import scipy.signal as signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Modulator import baca_blok_mono, FPGA_RATE, DEV_FREQ
+from stream_resampler import StreamResampler
+
+# Beberapa stasiun FM dalam satu pita 200 kSps (FDM) + channelizer.
+#
+# Pemancar: tiap stasiun (WAV sendiri) dinormalisasi, dibatasi bandwidth
+# audionya (resample ke STATION_AUDIO_RATE), di-resample ke FPGA_RATE dan
+# dimodulasi FM dengan fase kontinu di carrier kanalnya. Semua stasiun
+# dijumlah per blok -> satu WAV 8-bit, memori tetap kecil berapapun
+# panjang lagunya. Stasiun di kanal CENTER_CHANNEL (50 kHz) adalah yang
+# dikunci PLL FPGA; stasiun lain menjadi interferensi kanal tetangga.
+#
+# Penerima: filterbank polyphase berbasis FFT, N_CHANNELS kanal berjarak
+# fs/N, oversampled 2x (output kanal di 2 fs / N). Tiap output = satu filter
+# prototype (M x P tap) dilipat ke M cabang + satu FFT ukuran M, jadi biaya
+# per sampel ~ M*P + M log M untuk SEMUA kanal, bukan M filter penuh.
+#   y_k[n] = sum_m h[m] x[nD - m] e^{-j 2 pi k (nD - m) / M}
+#          = e^{-j 2 pi k nD / M} * M * IFFT_k( sum_p h[pM + r] x[nD - pM - r] )
+# Tiap kanal stasiun lalu didemodulasi (diskriminator kuadratur) ke WAV.
+
+# === KONFIGURASI ===
+STATIONS           = ['London.wav', 'Prague.wav', 'HBDInstrument.wav']
+N_CHANNELS         = 8                  # Kanal filterbank, jarak FPGA_RATE / N (25 kHz)
+STATION_CHANNELS   = [1, 2, 3]          # Kanal tiap stasiun -> carrier 25, 50, 75 kHz
+CENTER_CHANNEL     = 2                  # Kanal 50 kHz (CW0 demodulator FPGA)
+STATION_AUDIO_RATE = 12000              # Audio dibatasi ~6 kHz agar muat di kanal 25 kHz
+TAPS_PER_BRANCH    = 24                 # Panjang filter prototype = N_CHANNELS x ini
+OVERSAMPLE         = 2                  # Output kanal di OVERSAMPLE x FPGA_RATE / N_CHANNELS
+BLOCK_SIZE         = 1 << 16            # Sampel komposit per blok
+OUTPUT_FM          = 'fm_multistasiun.wav'
+OUTPUT_PREFIX      = 'stasiun'          # -> stasiun_<kanal>.wav
+AUDIO_RATE         = 44100
+
+
+def carrier_kanal(k, n_channels=N_CHANNELS, fs=FPGA_RATE):
+    return k * fs / n_channels
+
+
+class Stasiun:
+    """Satu sumber audio -> sampel FM float (-1..1) di carrier-nya, diambil per blok."""
+
+    def __init__(self, path, carrier, fs=FPGA_RATE, dev=DEV_FREQ):
+        rate, self.data = wav.read(path, mmap=True)
+        self.path = path
+        self.carrier = carrier
+        self.fs = fs
+        self.dev = dev
+        max_val = 0.0
+        for blok in baca_blok_mono(self.data, BLOCK_SIZE):
+            max_val = max(max_val, float(np.max(np.abs(blok.astype(float)))))
+        self.skala = 1.0 / max_val if max_val > 0 else 1.0
+        self.lpf = StreamResampler(rate, STATION_AUDIO_RATE)
+        self.up = StreamResampler(STATION_AUDIO_RATE, fs)
+        self.n_total = self.up.output_length(self.lpf.output_length(len(self.data)))
+        self._blok = baca_blok_mono(self.data, BLOCK_SIZE)
+        self._buf = np.zeros(0)
+        self._habis = False
+        self.phase = 0.0
+
+    def _isi(self, n):
+        while len(self._buf) < n and not self._habis:
+            blok = next(self._blok, None)
+            if blok is None:
+                a = self.up.process(self.lpf.flush())
+                a = np.concatenate((a, self.up.flush()))
+                self._habis = True
+            else:
+                a = self.up.process(self.lpf.process(blok.astype(float) * self.skala))
+            self._buf = np.concatenate((self._buf, a))
+
+    def ambil(self, n):
+        """n sampel FM berikutnya; setelah audio habis hanya carrier (audio 0)."""
+        self._isi(n)
+        audio = self._buf[:n]
+        self._buf = self._buf[n:]
+        if len(audio) < n:
+            audio = np.concatenate((audio, np.zeros(n - len(audio))))
+        d_phase = 2 * np.pi * (self.carrier + self.dev * audio) / self.fs
+        inst_phase = self.phase + np.cumsum(d_phase)
+        self.phase = inst_phase[-1] % (2 * np.pi)
+        return np.sin(inst_phase)
+
+
+def stream_komposit(stations, block_size=BLOCK_SIZE):
+    """Generator blok komposit uint8 (jumlah semua stasiun / jumlah stasiun)."""
+    n_total = max(s.n_total for s in stations)
+    for i in range(0, n_total, block_size):
+        n = min(block_size, n_total - i)
+        total = np.zeros(n)
+        for s in stations:
+            total += s.ambil(n)
+        yield (127.5 + 127.5 * total / len(stations)).astype(np.uint8)
+
+
+def modulasi_multistasiun(files=None, channels=None, output_fm=None):
+    files = files or STATIONS
+    channels = channels or STATION_CHANNELS
+    output_fm = output_fm or OUTPUT_FM
+    if len(channels) < len(files):
+        raise ValueError(f"{len(files)} stasiun tapi hanya {len(channels)} kanal")
+    stations = [Stasiun(f, carrier_kanal(k)) for f, k in zip(files, channels)]
+    for s in stations:
+        tanda = " (kanal demodulator FPGA)" if s.carrier == carrier_kanal(CENTER_CHANNEL) else ""
+        print(f"  {s.path}: carrier {s.carrier / 1000:.1f} kHz, {s.n_total / FPGA_RATE:.1f} detik{tanda}")
+
+    start_time = time.time()
+    n_out = 0
+    with wave.open(output_fm, 'wb') as f_out:
+        f_out.setnchannels(1)
+        f_out.setsampwidth(1)
+        f_out.setframerate(FPGA_RATE)
+        for fm_bytes in stream_komposit(stations):
+            f_out.writeframes(fm_bytes.tobytes())
+            n_out += len(fm_bytes)
+    elapsed = time.time() - start_time
+    print(f"Komposit {len(stations)} stasiun: {n_out} sampel -> '{output_fm}' dalam {elapsed:.2f} detik")
+    return n_out
+
+
+class PolyphaseChannelizer:
+    """
+    Filterbank polyphase FFT M kanal, decimasi D = M / oversample.
+    process(blok real) -> array (n_out, M) complex64, kolom k = baseband kanal k
+    (pusat k fs / M). State (history) disimpan antar blok.
+    """
+
+    def __init__(self, n_channels=N_CHANNELS, taps_per_branch=TAPS_PER_BRANCH,
+                 oversample=OVERSAMPLE):
+        if n_channels % oversample:
+            raise ValueError("N_CHANNELS harus kelipatan OVERSAMPLE")
+        self.M = n_channels
+        self.P = taps_per_branch
+        self.D = n_channels // oversample
+        self.rate_factor = oversample / n_channels          # rate output / rate input
+        n_taps = self.M * self.P
+        # Prototype low-pass: -6 dB di tepi kanal (fs / 2M)
+        self.h = signal.firwin(n_taps, 1.0 / self.M, window=('kaiser', 8.0))
+        self.h_rev = self.h[::-1].astype(np.float32)
+        # Koreksi fase e^{-j 2 pi k nD / M}, berulang dengan periode M / gcd(D, M)
+        period = self.M // np.gcd(self.D, self.M)
+        n = np.arange(period)[:, None]
+        k = np.arange(self.M)[None, :]
+        self.rotasi = np.exp(-2j * np.pi * k * ((n * self.D) % self.M) / self.M).astype(np.complex64)
+        self._hist = np.zeros(n_taps - 1, dtype=np.float32)     # Input sebelum t = 0 dianggap 0
+        self._n = 0                                              # Indeks output berikutnya
+
+    def process(self, block):
+        n_taps = self.M * self.P
+        # buf[j] = x[n D - (n_taps - 1) + j] untuk output berikutnya n = self._n
+        buf = np.concatenate((self._hist, np.asarray(block, dtype=np.float32)))
+        n_out = (len(buf) - n_taps) // self.D + 1 if len(buf) >= n_taps else 0
+        if n_out <= 0:
+            self._hist = buf
+            return np.zeros((0, self.M), dtype=np.complex64)
+
+        win = sliding_window_view(buf, n_taps)[::self.D][:n_out]
+        # Lipat ke M cabang: kolom c di segmen p = tap m = (P-1-p) M + (M-1-c)
+        u = (win * self.h_rev).reshape(n_out, self.P, self.M).sum(axis=1)[:, ::-1]
+        y = np.fft.ifft(u, axis=1) * self.M
+        idx = (self._n + np.arange(n_out)) % len(self.rotasi)
+        y = (y * self.rotasi[idx]).astype(np.complex64)
+
+        self._n += n_out
+        self._hist = buf[n_out * self.D:]
+        return y
+
+
+class DemodKanal:
+    """Diskriminator kuadratur + resampler untuk satu kanal channelizer."""
+
+    def __init__(self, channel_rate, dev=DEV_FREQ, audio_rate=AUDIO_RATE):
+        self.channel_rate = channel_rate
+        self.dev = dev
+        self.prev = np.complex64(0)
+        self.resampler = StreamResampler(channel_rate, audio_rate)
+
+    def process(self, z):
+        if len(z) == 0:
+            return np.zeros(0)
+        z_prev = np.concatenate(([self.prev], z[:-1]))
+        self.prev = z[-1]
+        freq_dev = np.angle(z * np.conj(z_prev)) * (self.channel_rate / (2 * np.pi))
+        return self.resampler.process(freq_dev / self.dev)
+
+    def flush(self):
+        return self.resampler.flush()
+
+
+def pisahkan_stasiun(input_fm=None, channels=None, prefix=None):
+    """
+    Channelize satu rekaman komposit (WAV 8-bit di FPGA_RATE) sekali jalan,
+    demodulasi tiap kanal stasiun ke <prefix>_<kanal>.wav. Mengembalikan daftar file.
+    """
+    input_fm = input_fm or OUTPUT_FM
+    channels = channels or STATION_CHANNELS
+    prefix = prefix or OUTPUT_PREFIX
+    fs, data = wav.read(input_fm, mmap=True)
+    chz = PolyphaseChannelizer()
+    channel_rate = fs * chz.rate_factor
+    print(f"Channelizer {chz.M} kanal x {chz.P} tap/cabang, output kanal {channel_rate / 1000:.0f} kSps")
+
+    names = [f"{prefix}_{k}.wav" for k in channels]
+    demods = [DemodKanal(channel_rate) for _ in channels]
+    files = [wave.open(name, 'wb') for name in names]
+    for f in files:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(AUDIO_RATE)
+
+    def tulis(f, audio):
+        f.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+
+    start_time = time.time()
+    try:
+        for i in range(0, len(data), BLOCK_SIZE):
+            x = (np.asarray(data[i:i + BLOCK_SIZE]).astype(np.float32) - 127.5) / 127.5
+            y = chz.process(x)
+            for k, dm, f in zip(channels, demods, files):
+                tulis(f, dm.process(y[:, k]))
+        for dm, f in zip(demods, files):
+            tulis(f, dm.flush())
+    finally:
+        for f in files:
+            f.close()
+    elapsed = time.time() - start_time
+    print(f"{len(data)} sampel, {len(channels)} stasiun dalam {elapsed:.2f} detik "
+          f"({len(data) / max(elapsed, 1e-9) / 1e6:.1f} juta sampel/detik)")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modulasi multi-stasiun FDM + channelizer polyphase")
+    parser.add_argument('mode', choices=['modulate', 'channelize', 'both'])
+    parser.add_argument('--stations', nargs='+', default=STATIONS)
+    parser.add_argument('--channels', type=int, nargs='+', default=STATION_CHANNELS)
+    parser.add_argument('--fm', default=OUTPUT_FM, help="WAV komposit (output modulate / input channelize)")
+    parser.add_argument('--score', action='store_true',
+                        help="Bandingkan audio hasil channelize dengan WAV stasiun asli")
+    args = parser.parse_args()
+
+    bad = [k for k in args.channels if not 0 < k < N_CHANNELS // 2]
+    if bad:
+        parser.error(f"kanal {bad} di luar 1..{N_CHANNELS // 2 - 1}")
+    if args.mode in ('modulate', 'both'):
+        missing = [f for f in args.stations if not os.path.exists(f)]
+        if missing:
+            print(f"Error: {', '.join(missing)} tidak ditemukan.")
+            return 1
+        modulasi_multistasiun(args.stations, args.channels, args.fm)
+    if args.mode in ('channelize', 'both'):
+        if not os.path.exists(args.fm):
+            print(f"Error: '{args.fm}' tidak ditemukan.")
+            return 1
+        names = pisahkan_stasiun(args.fm, args.channels)
+        if args.score:
+            from batch_process import skor_kualitas
+            for src, k, name in zip(args.stations, args.channels, names):
+                snr, korelasi, _ = skor_kualitas(src, name)
+                print(f"  kanal {k} ({carrier_kanal(k) / 1000:.0f} kHz) {src}: SNR {snr:.1f} dB, "
+                      f"korelasi {korelasi:.3f}")
+        else:
+            print(f"Tersimpan: {', '.join(names)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
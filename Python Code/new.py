@@ -22,77 +22,117 @@ F_CARRIER = 50000.0       # 50 kHz Carrier
 F_MESSAGE = 440.0          # 10 Hz Message
 MODULATION_INDEX = 1.0   # Strength of FM modulation
 
+# Reuse the generated vectors from the .npy cache when the parameters match
+USE_CACHE = True
+
+# Raw TX/RX bytes of every run go to an append-only log (see capture_log.py).
+# REPLAY = session id (-1 = latest) re-plots a logged run without the FPGA.
+CAPTURE     = True
+CAPTURE_LOG = 'capture.fmlog'
+REPLAY      = None
+
 # ==========================================
 # 2. SIGNAL GENERATION (FM)
 # ==========================================
-print("Generating FM Signal...")
-
-# Time array
-t = np.arange(NUM_SAMPLES) / F_SAMPLE_VIRTUAL
-
-# 1. Original Message (10 Hz Sine)
-msg_signal = np.sin(2 * np.pi * F_MESSAGE * t)
-
-# 2. Modulated Carrier (FM)
-# FM equation: y(t) = A * sin(2*pi*Fc*t + I * integral(m(t)))
-integral_msg = cumulative_trapezoid(msg_signal, t, initial=0)
-phase_mod = 2 * np.pi * F_CARRIER * t + (MODULATION_INDEX * integral_msg)
-modulated_signal_raw = np.sin(phase_mod)
-
-# 3. Format for FPGA (Offset Binary 8-bit)
-# Map -1.0..1.0 to 0..255 (Center at 128)
-# We multiply by 127 to fill the range, then add 128.
-tx_data_float = (modulated_signal_raw * 127.0) + 128.0
-tx_data_bytes = np.clip(tx_data_float, 0, 255).astype(np.uint8)
+def generate_signals():
+    print("Generating FM Signal...")
+
+    # Time array
+    t = np.arange(NUM_SAMPLES) / F_SAMPLE_VIRTUAL
+
+    # 1. Original Message (10 Hz Sine)
+    msg_signal = np.sin(2 * np.pi * F_MESSAGE * t)
+
+    # 2. Modulated Carrier (FM)
+    # FM equation: y(t) = A * sin(2*pi*Fc*t + I * integral(m(t)))
+    integral_msg = cumulative_trapezoid(msg_signal, t, initial=0)
+    phase_mod = 2 * np.pi * F_CARRIER * t + (MODULATION_INDEX * integral_msg)
+    modulated_signal_raw = np.sin(phase_mod)
+
+    # 3. Format for FPGA (Offset Binary 8-bit)
+    # Map -1.0..1.0 to 0..255 (Center at 128)
+    # We multiply by 127 to fill the range, then add 128.
+    tx_data_float = (modulated_signal_raw * 127.0) + 128.0
+    tx_data_bytes = np.clip(tx_data_float, 0, 255).astype(np.uint8)
+    return {'t': t, 'msg': msg_signal, 'tx': tx_data_bytes}
+
+if USE_CACHE:
+    from signal_cache import SignalCache
+    params = {'NUM_SAMPLES': NUM_SAMPLES, 'F_SAMPLE_VIRTUAL': F_SAMPLE_VIRTUAL, 'F_CARRIER': F_CARRIER,
+              'F_MESSAGE': F_MESSAGE, 'MODULATION_INDEX': MODULATION_INDEX}
+    signals = SignalCache().get_or_create('new_py', params, generate_signals)
+else:
+    signals = generate_signals()
+t, msg_signal, tx_data_bytes = signals['t'], signals['msg'], signals['tx']
 
 # ==========================================
 # 3. UART TRANSMISSION LOOP
 # ==========================================
-rx_data_buffer = []
-
-try:
-    print(f"Opening Serial Port {SERIAL_PORT} at {BAUD_RATE} baud...")
-    with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
-        # Reset FPGA buffers if needed (optional)
-        ser.reset_input_buffer()
-        ser.reset_output_buffer()
-        time.sleep(1) # Wait for connection to stabilize
-
-        print(f"Sending {NUM_SAMPLES} samples...")
-        
-        # Send data in chunks to avoid overflowing buffers
-        # but read immediately to capture the stream.
-        chunk_size = 100 
-        for i in range(0, NUM_SAMPLES, chunk_size):
-            # Slice current chunk
-            chunk = tx_data_bytes[i : i + chunk_size]
+rx_data_buffer = bytearray()
+
+if REPLAY is not None:
+    from capture_log import buka_replay
+    try:
+        reader, session = buka_replay(CAPTURE_LOG, REPLAY)
+        reader.info(session)
+    except (OSError, ValueError) as e:
+        print(f"Replay failed: {e}")
+        exit()
+    rx_data_buffer = reader.baca(session)
+    print(f"Replaying session {session}: {len(rx_data_buffer)} bytes from {CAPTURE_LOG}")
+else:
+    try:
+        print(f"Opening Serial Port {SERIAL_PORT} at {BAUD_RATE} baud...")
+        with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
+            log = None
+            if CAPTURE:
+                from capture_log import mulai_capture, konfigurasi
+                ser, log = mulai_capture(ser, CAPTURE_LOG, 'new', konfigurasi(globals()))
+
+            # The session is finalized in the log even if the transfer fails or is interrupted
+            try:
+                # Reset FPGA buffers if needed (optional)
+                ser.reset_input_buffer()
+                ser.reset_output_buffer()
+                time.sleep(1) # Wait for connection to stabilize
+
+                print(f"Sending {NUM_SAMPLES} samples...")
             
-            # Write to FPGA
-            ser.write(chunk.tobytes())
-            
-            # Read response from FPGA
-            # We expect exactly 1 byte back for every 1 byte sent
-            response = ser.read(len(chunk))
-            
-            # Store response
-            for byte in response:
-                rx_data_buffer.append(byte)
-            
-            # Simple progress bar
-            if i % 500 == 0:
-                print(f"Progress: {i}/{NUM_SAMPLES}")
-
-    print("Transmission Complete.")
-
-except serial.SerialException as e:
-    print(f"Error opening serial port: {e}")
-    exit()
+                # Send data in chunks to avoid overflowing buffers
+                # but read immediately to capture the stream.
+                chunk_size = 100 
+                for i in range(0, NUM_SAMPLES, chunk_size):
+                    # Slice current chunk
+                    chunk = tx_data_bytes[i : i + chunk_size]
+                
+                    # Write to FPGA
+                    ser.write(chunk.tobytes())
+                
+                    # Read response from FPGA
+                    # We expect exactly 1 byte back for every 1 byte sent
+                    response = ser.read(len(chunk))
+                
+                    # Store response
+                    rx_data_buffer += response
+                
+                    # Simple progress bar
+                    if i % 500 == 0:
+                        print(f"Progress: {i}/{NUM_SAMPLES}")
+            finally:
+                if log is not None:
+                    log.close()
+
+        print("Transmission Complete.")
+
+    except serial.SerialException as e:
+        print(f"Error opening serial port: {e}")
+        exit()
 
 # ==========================================
 # 4. DATA PROCESSING
 # ==========================================
 # Convert received bytes to numpy array
-rx_data = np.array(rx_data_buffer, dtype=float)
+rx_data = np.frombuffer(rx_data_buffer, dtype=np.uint8).astype(float)
 
 # Optional: Remove DC offset from received data for better plotting
 # The FPGA outputs 0-255, centered at 128.
@@ -0,0 +1,187 @@
+import os
+import csv
+import time
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import scipy.io.wavfile as wav
+import scipy.signal as signal
+
+import Modulator
+from fm_golden_model import FMDemodulatorModel, CW0_VAL_OVERRIDE
+
+# Sweep parameter loop PLL memakai golden model, dibagi ke semua core.
+# Sinyal input (FM 8-bit + referensi audio) dibuat sekali lalu ditaruh di
+# shared memory; worker hanya menempel (attach) ke buffer yang sama,
+# tidak ada salinan/pickle sinyal untuk tiap titik sweep.
+
+# === KONFIGURASI ===
+INPUT_FILE   = 'Prague.wav'        # Lagu yang dimodulasi untuk sweep
+DURATION     = None                # Detik (None = seluruh lagu)
+OUTPUT_CSV   = 'pll_sweep_results.csv'
+NUM_WORKERS  = None                # None = semua core
+
+# Grid parameter (nilai di uart_fm_system.vhd: KP 32000, KI 50, FILTER_SHIFT 4, STAGES 3)
+KP_LIST        = [4000, 8000, 16000, 32000]
+KI_LIST        = [25, 50, 100, 200]
+LF_SHIFT_LIST  = [0]               # SHIFT_AMT loop_filter
+FILTER_SHIFT_LIST = [2, 3, 4, 5]   # SHIFT_FACTOR low_pass_filter
+STAGES_LIST    = [1, 2, 3]         # STAGES low_pass_filter
+
+# Metrik
+FPGA_RATE     = Modulator.FPGA_RATE
+EVAL_DECIM    = 10                 # Audio dibandingkan di 20 kHz
+LOCK_SPAN     = 0.1                # Detik awal yang dilacak untuk lock time
+LOCK_WINDOW   = 200                # Sampel per jendela rata-rata frekuensi NCO
+LOCK_TOL_HZ   = 500.0              # Lock jika |f_nco - f_input| rata-rata < toleransi
+SKIP_START    = 0.05               # Detik awal diabaikan saat menghitung SNR
+MAX_LAG       = 0.01               # Pencarian delay output maksimum (detik)
+
+_shared = {}
+
+
+def siapkan_input(input_file, duration=None):
+    """Modulasi lagu (sama seperti Modulator.py) -> (fm uint8, audio referensi float32)."""
+    orig_rate, audio_data = wav.read(input_file, mmap=True)
+    if duration is not None:
+        audio_data = audio_data[:int(duration * orig_rate)]
+    fm_blocks, ref_blocks = [], []
+    for audio_resampled, fm_bytes in Modulator.stream_modulasi(audio_data, orig_rate):
+        ref_blocks.append(audio_resampled.astype(np.float32))
+        fm_blocks.append(fm_bytes)
+    return np.concatenate(fm_blocks), np.concatenate(ref_blocks)
+
+
+def _buat_shared(arr):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _init_worker(fm_spec, ref_spec):
+    for key, (name, shape, dtype) in (('fm', fm_spec), ('ref', ref_spec)):
+        shm = shared_memory.SharedMemory(name=name)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        _shared[key] = arr
+        _shared[key + '_shm'] = shm
+
+
+def hitung_lock_time(cw_out, ref):
+    """Waktu (detik) sampai frekuensi NCO mengikuti frekuensi input, -1 jika tidak lock."""
+    n = (len(cw_out) // LOCK_WINDOW) * LOCK_WINDOW
+    if n == 0:
+        return -1.0
+    f_nco = (cw_out[:n].astype(np.float64) % 2**32) * FPGA_RATE / 2**32
+    f_in = Modulator.CARRIER_FREQ + Modulator.DEV_FREQ * ref[:n].astype(np.float64)
+    err = np.abs((f_nco - f_in).reshape(-1, LOCK_WINDOW).mean(axis=1))
+    unlocked = np.nonzero(err >= LOCK_TOL_HZ)[0]
+    if len(unlocked) == 0:
+        return 0.0
+    if unlocked[-1] == len(err) - 1:
+        return -1.0
+    return (unlocked[-1] + 1) * LOCK_WINDOW / FPGA_RATE
+
+
+def hitung_snr(audio_out, ref):
+    """SNR output (dB) terhadap pesan asli, setelah delay & gain disesuaikan."""
+    skip = int(SKIP_START * FPGA_RATE)
+    y = signal.resample_poly(audio_out[skip:].astype(np.float64) - 128.0, 1, EVAL_DECIM)
+    r = signal.resample_poly(ref[skip:].astype(np.float64), 1, EVAL_DECIM)
+    n = min(len(y), len(r))
+    y, r = y[:n] - np.mean(y[:n]), r[:n] - np.mean(r[:n])
+    if n < 16 or not np.any(y) or not np.any(r):
+        return float('nan'), 0
+
+    # Cari delay dengan korelasi silang (FFT), hanya di rentang +-MAX_LAG
+    max_lag = int(MAX_LAG * FPGA_RATE / EVAL_DECIM)
+    corr = signal.correlate(y, r, mode='full', method='fft')
+    center = n - 1
+    window = corr[center - max_lag:center + max_lag + 1]
+    lag = int(np.argmax(np.abs(window))) - max_lag
+
+    if lag >= 0:
+        y_al, r_al = y[lag:], r[:n - lag]
+    else:
+        y_al, r_al = y[:n + lag], r[-lag:]
+    gain = np.dot(y_al, r_al) / np.dot(r_al, r_al)
+    resid = y_al - gain * r_al
+    snr = 10 * np.log10(np.sum((gain * r_al) ** 2) / max(np.sum(resid ** 2), 1e-20))
+    return float(snr), lag * EVAL_DECIM
+
+
+def evaluasi_titik(params):
+    """Jalankan golden model untuk satu titik grid dan hitung metriknya."""
+    kp, ki, lf_shift, filter_shift, stages = params
+    fm, ref = _shared['fm'], _shared['ref']
+    model = FMDemodulatorModel(cw0=CW0_VAL_OVERRIDE, filter_shift=filter_shift, kp=kp,
+                               ki=ki, stages=stages, lf_shift=lf_shift)
+
+    start = time.time()
+    span = min(len(fm), int(LOCK_SPAN * FPGA_RATE))
+    out_head, dbg = model.process(fm[:span], debug=True)
+    out = np.concatenate((out_head, model.process(fm[span:])))
+    sim_time = time.time() - start
+
+    snr, delay = hitung_snr(out, ref)
+    return {
+        'kp': kp, 'ki': ki, 'lf_shift': lf_shift,
+        'filter_shift': filter_shift, 'stages': stages,
+        'snr_db': round(snr, 2),
+        'lock_time_ms': round(hitung_lock_time(dbg['cw_out'], ref) * 1000, 3),
+        'delay_samples': delay,
+        'integrator_sat': model.integrator_saturations,
+        'lpf_sat': model.lpf_saturations,
+        'output_clipped': int(np.count_nonzero((out == 0) | (out == 255))),
+        'sim_seconds': round(sim_time, 3),
+    }
+
+
+def main():
+    if not os.path.exists(INPUT_FILE):
+        print(f"Error: '{INPUT_FILE}' tidak ditemukan.")
+        return
+
+    print(f"Menyiapkan sinyal FM dari {INPUT_FILE}...")
+    fm, ref = siapkan_input(INPUT_FILE, DURATION)
+    grid = list(itertools.product(KP_LIST, KI_LIST, LF_SHIFT_LIST, FILTER_SHIFT_LIST, STAGES_LIST))
+    workers = NUM_WORKERS or os.cpu_count()
+    print(f"{len(fm)} sampel, {len(grid)} titik sweep, {workers} worker")
+
+    shm_fm, fm_spec = _buat_shared(fm)
+    shm_ref, ref_spec = _buat_shared(ref)
+    del fm, ref
+
+    results = []
+    start = time.time()
+    try:
+        with mp.Pool(workers, initializer=_init_worker, initargs=(fm_spec, ref_spec)) as pool:
+            for i, r in enumerate(pool.imap_unordered(evaluasi_titik, grid), 1):
+                results.append(r)
+                print(f"\r[{i}/{len(grid)}] Kp={r['kp']} Ki={r['ki']} shift={r['filter_shift']} "
+                      f"stages={r['stages']} -> SNR {r['snr_db']} dB", end="")
+    finally:
+        shm_fm.close(); shm_fm.unlink()
+        shm_ref.close(); shm_ref.unlink()
+
+    elapsed = time.time() - start
+    print(f"\nSelesai dalam {elapsed:.1f} detik ({len(grid)/elapsed:.2f} titik/detik)")
+
+    results.sort(key=lambda r: -np.nan_to_num(r['snr_db'], nan=-1e9))
+    with open(OUTPUT_CSV, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Hasil tersimpan di {OUTPUT_CSV}")
+
+    print("\n10 titik terbaik (SNR):")
+    for r in results[:10]:
+        print(f"  Kp={r['kp']:>6} Ki={r['ki']:>4} SHIFT_AMT={r['lf_shift']} "
+              f"FILTER_SHIFT={r['filter_shift']} STAGES={r['stages']} | SNR {r['snr_db']:6.2f} dB | "
+              f"lock {r['lock_time_ms']} ms | sat int/lpf {r['integrator_sat']}/{r['lpf_sat']}")
+
+
+if __name__ == "__main__":
+    main()
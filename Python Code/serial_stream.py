@@ -0,0 +1,191 @@
+import threading
+import time
+
+# === KONFIGURASI DEFAULT ===
+FIFO_DEPTH    = 256                       # Kedalaman FIFO RX & TX di uart_fm_system.vhd
+WINDOW_SIZE   = 2 * FIFO_DEPTH - 64       # Maks. byte "in-flight" (dikirim tapi belum kembali)
+CHUNK_SIZE    = 256                       # Maks. byte per panggilan write()
+READ_TIMEOUT  = 0.05                      # Timeout read() per panggilan (detik)
+DRAIN_MARGIN  = 0.5                       # Waktu tambahan saat menunggu sisa data (detik)
+STALL_TIMEOUT = 0.5                       # Tanpa balasan selama ini = byte dianggap hilang
+BITS_PER_BYTE = 10                        # 1 start + 8 data + 1 stop
+
+
+def line_rate(baud_rate):
+    """Kecepatan teoretis link UART dalam byte/detik (2 Mbaud -> 200 kB/s)."""
+    return baud_rate / BITS_PER_BYTE
+
+
+def stream_full_duplex(ser, tx_bytes, window=WINDOW_SIZE, chunk_size=CHUNK_SIZE,
+                       show_progress=True, on_data=None, tracer=None):
+    """
+    Kirim tx_bytes ke FPGA dan terima balasannya secara bersamaan.
+
+    Writer dan reader berjalan di thread terpisah. Writer hanya boleh
+    mengirim selama jumlah byte in-flight (dikirim - diterima) < window,
+    sehingga FIFO RX/TX di FPGA tidak pernah overflow dan tidak ada sleep tetap.
+    Setelah semua terkirim, reader menunggu sisa byte berdasarkan jumlahnya
+    (waktu = sisa byte x waktu per byte), bukan polling berulang.
+    Jika balasan macet (byte hilang di FPGA), kredit window dikembalikan
+    supaya writer tidak terkunci selamanya. Byte yang ternyata datang
+    terlambat mengurangi kredit itu lagi, jadi in-flight tidak pernah negatif
+    dan writer tidak pernah mengirim lebih dari window
+    (stats: 'late' = byte terlambat, 'lost' = tidak pernah kembali).
+
+    Byte diterima langsung ke buffer yang dialokasikan sekali (readinto),
+    tanpa bytearray yang terus tumbuh. on_data(view), jika diberikan,
+    dipanggil dari thread reader untuk tiap potongan baru (memoryview,
+    bisa dibaca dengan np.frombuffer tanpa salinan) selama data masih datang.
+
+    tracer (serial_trace.SerialTracer, opsional) mencatat durasi tiap
+    write/read, byte in-flight, kedalaman in_waiting dan jeda; None = tanpa biaya.
+
+    Mengembalikan (rx_data, stats); rx_data adalah memoryview dari byte
+    yang benar-benar diterima.
+    """
+    total = len(tx_bytes)
+    tx_view = memoryview(tx_bytes).cast('B')
+    byte_time = 1.0 / line_rate(ser.baudrate)
+
+    rx_buf = memoryview(bytearray(total))
+    state = {'sent': 0, 'received': 0, 'reclaimed': 0, 'late': 0, 'writer_done': False,
+             'error': None}
+    cond = threading.Condition()
+
+    old_timeout = ser.timeout
+    ser.timeout = READ_TIMEOUT
+
+    def in_flight():
+        return state['sent'] - state['received'] - state['reclaimed']
+
+    def writer():
+        try:
+            while state['sent'] < total:
+                t_wait = None
+                with cond:
+                    if tracer is not None and in_flight() >= window:
+                        t_wait = tracer.now()
+                    while in_flight() >= window and state['error'] is None:
+                        last_rx = state['received']
+                        if not cond.wait(STALL_TIMEOUT) and state['received'] == last_rx:
+                            if tracer is not None:
+                                tracer.catat('reclaim', t_wait, tracer.now(), in_flight())
+                            state['reclaimed'] = state['sent'] - state['received']
+                    if t_wait is not None:
+                        tracer.catat('stall', t_wait, tracer.now())
+                    if state['error'] is not None:
+                        return
+                    space = window - in_flight()
+                n = min(chunk_size, space, total - state['sent'])
+                if tracer is not None:
+                    t_write = tracer.now()
+                ser.write(tx_view[state['sent']:state['sent'] + n])
+                with cond:
+                    state['sent'] += n
+                    if tracer is not None:
+                        tracer.catat('write', t_write, tracer.now(), n, in_flight())
+        except Exception as e:
+            with cond:
+                state['error'] = e
+                cond.notify_all()
+        finally:
+            with cond:
+                state['writer_done'] = True
+                cond.notify_all()
+
+    def reader():
+        deadline = None
+        try:
+            while state['received'] < total:
+                pos = state['received']
+                waiting = ser.in_waiting
+                want = max(1, min(waiting, total - pos))
+                if tracer is not None:
+                    t_read = tracer.now()
+                n = ser.readinto(rx_buf[pos:pos + want])
+                if tracer is not None:
+                    tracer.catat('read' if n else 'stall', t_read, tracer.now(), n, waiting)
+                if n and on_data is not None:
+                    on_data(rx_buf[pos:pos + n])
+                with cond:
+                    if n:
+                        state['received'] += n
+                        # Lebih banyak byte kembali daripada yang masih di jalan:
+                        # kelebihannya byte terlambat yang kreditnya sudah dikembalikan
+                        late = state['received'] + state['reclaimed'] - state['sent']
+                        if late > 0:
+                            state['reclaimed'] -= late
+                            state['late'] += late
+                        cond.notify_all()
+                    if state['error'] is not None:
+                        return
+                    if state['writer_done']:
+                        # Batas tunggu dihitung dari sisa byte yang masih di jalan
+                        if n or deadline is None:
+                            sisa = state['sent'] - state['received']
+                            deadline = time.time() + sisa * byte_time + DRAIN_MARGIN
+                        elif time.time() > deadline:
+                            return
+        except Exception as e:
+            with cond:
+                state['error'] = e
+                cond.notify_all()
+
+    start_time = time.time()
+    t_writer = threading.Thread(target=writer, daemon=True)
+    t_reader = threading.Thread(target=reader, daemon=True)
+    t_writer.start()
+    t_reader.start()
+
+    try:
+        while t_reader.is_alive():
+            t_reader.join(0.25)
+            if show_progress and total:
+                print(f"\rProgress: TX {state['sent']/total*100:5.1f}% | "
+                      f"RX {state['received']/total*100:5.1f}%", end="")
+        t_writer.join()
+    finally:
+        ser.timeout = old_timeout
+
+    elapsed = time.time() - start_time
+    if tracer is not None:
+        tracer.catat_sisa(state['sent'], state['received'])
+    if show_progress:
+        print()
+    if state['error'] is not None:
+        raise state['error']
+
+    stats = {
+        'sent': state['sent'],
+        'received': state['received'],
+        'lost': state['sent'] - state['received'],
+        'late': state['late'],
+        'elapsed': elapsed,
+        'bytes_per_sec': state['received'] / elapsed if elapsed > 0 else 0.0,
+        'line_rate': line_rate(ser.baudrate),
+    }
+    stats['efficiency'] = stats['bytes_per_sec'] / stats['line_rate']
+    return rx_buf[:state['received']], stats
+
+
+def baca_tersedia(ser, rx_data, tracer=None):
+    """Baca semua byte yang sudah ada di buffer; dicatat ke tracer jika ada."""
+    while True:
+        waiting = ser.in_waiting
+        if waiting <= 0:
+            return
+        if tracer is not None:
+            t_read = tracer.now()
+        data = ser.read(waiting)
+        rx_data.extend(data)
+        if tracer is not None:
+            tracer.catat('read', t_read, tracer.now(), len(data), waiting)
+
+
+def print_stats(stats):
+    print(f"Waktu transfer : {stats['elapsed']:.2f} detik")
+    print(f"Throughput     : {stats['bytes_per_sec']/1000:.1f} kB/s "
+          f"dari teoretis {stats['line_rate']/1000:.1f} kB/s "
+          f"({stats['efficiency']*100:.1f}%)")
+    if stats.get('lost') or stats.get('late'):
+        print(f"Byte hilang    : {stats['lost']} (terlambat tapi diterima: {stats.get('late', 0)})")
@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+# Instrumentasi loop kirim/terima serial. Semua fungsi streaming menerima
+# argumen tracer=None; jika None, satu-satunya biaya adalah cek 'is not None'
+# (tanpa panggilan perf_counter), jadi aman tetap dipasang di run produksi.
+# Jika diisi SerialTracer, tiap write()/read()/jeda dicatat sebagai satu
+# tuple di list (append atomik, aman dari thread writer & reader sekaligus):
+#   (jenis, t_mulai, durasi, n_byte, kedalaman)
+#   write : kedalaman = byte in-flight setelah write
+#   read  : kedalaman = ser.in_waiting sebelum read
+#   stall : writer menunggu window / reader tanpa data; n_byte = 0
+#   reclaim : kredit window diambil kembali karena balasan macet; n_byte = jumlahnya
+#             (byte itu masih bisa datang terlambat, jadi belum tentu hilang)
+#   lost    : dicatat sekali di akhir stream; n_byte = terkirim - diterima
+
+# === KONFIGURASI ===
+TIMELINE_BIN = 0.01                 # Lebar bin timeline throughput (detik)
+TRACE_PREFIX = 'serial_trace'       # -> serial_trace.csv + serial_trace.json
+
+JENIS = ('write', 'read', 'stall', 'reclaim', 'lost')
+
+
+class SerialTracer:
+    """Pencatat event serial; waktu relatif terhadap pembuatan tracer (perf_counter)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.events = []
+
+    def now(self):
+        return time.perf_counter()
+
+    def catat(self, jenis, t_mulai, t_selesai, n_byte=0, kedalaman=0):
+        self.events.append((jenis, t_mulai - self.t0, t_selesai - t_mulai, n_byte, kedalaman))
+
+    def catat_sisa(self, n_kirim, n_terima):
+        """Akhir stream: byte yang tidak pernah kembali dicatat sebagai event 'lost'."""
+        if n_kirim > n_terima:
+            t = self.now()
+            self.catat('lost', t, t, n_kirim - n_terima)
+
+    def _kolom(self, jenis):
+        """(t_mulai, durasi, n_byte, kedalaman) sebagai array untuk satu jenis event."""
+        rows = [e[1:] for e in self.events if e[0] == jenis]
+        if not rows:
+            return np.zeros((0, 4))
+        return np.array(rows, dtype=np.float64)
+
+    @staticmethod
+    def _statistik(durasi):
+        if len(durasi) == 0:
+            return {'count': 0}
+        us = durasi * 1e6
+        return {
+            'count': int(len(us)), 'total_s': float(durasi.sum()),
+            'mean_us': float(us.mean()), 'p50_us': float(np.percentile(us, 50)),
+            'p99_us': float(np.percentile(us, 99)), 'max_us': float(us.max()),
+        }
+
+    def timeline(self, bin_width=TIMELINE_BIN):
+        """(waktu tengah bin, byte/s terkirim, byte/s diterima) per bin."""
+        wr, rd = self._kolom('write'), self._kolom('read')
+        t_end = max([0.0] + [float((k[:, 0] + k[:, 1]).max()) for k in (wr, rd) if len(k)])
+        edges = np.arange(0.0, t_end + bin_width, bin_width)
+        if len(edges) < 2:
+            edges = np.array([0.0, bin_width])
+        tx, _ = np.histogram(wr[:, 0] + wr[:, 1], bins=edges, weights=wr[:, 2])
+        rx, _ = np.histogram(rd[:, 0] + rd[:, 1], bins=edges, weights=rd[:, 2])
+        return (edges[:-1] + edges[1:]) / 2, tx / bin_width, rx / bin_width
+
+    def ringkasan(self):
+        """Dict ringkasan: statistik durasi per jenis, kedalaman buffer, jeda, throughput."""
+        wr, rd = self._kolom('write'), self._kolom('read')
+        stall, lost = self._kolom('stall'), self._kolom('lost')
+        reclaim = self._kolom('reclaim')
+        _, tx, rx = self.timeline()
+        aktif = rx[rx > 0]
+        return {
+            'write': dict(self._statistik(wr[:, 1]), bytes=int(wr[:, 2].sum())),
+            'read': dict(self._statistik(rd[:, 1]), bytes=int(rd[:, 2].sum())),
+            'stall': self._statistik(stall[:, 1]),
+            'lost_bytes': int(lost[:, 2].sum()),
+            'reclaims': len(reclaim),
+            'reclaim_bytes': int(reclaim[:, 2].sum()),
+            'in_flight_max': int(wr[:, 3].max()) if len(wr) else 0,
+            'in_waiting_mean': float(rd[:, 3].mean()) if len(rd) else 0.0,
+            'in_waiting_max': int(rd[:, 3].max()) if len(rd) else 0,
+            'rx_rate_min': float(aktif.min()) if len(aktif) else 0.0,
+            'rx_rate_mean': float(aktif.mean()) if len(aktif) else 0.0,
+            'rx_rate_max': float(aktif.max()) if len(aktif) else 0.0,
+            'timeline_bin': TIMELINE_BIN,
+        }
+
+    def simpan(self, prefix=TRACE_PREFIX):
+        """Tulis semua event ke <prefix>.csv dan ringkasan + timeline ke <prefix>.json."""
+        with open(prefix + '.csv', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['jenis', 't_mulai', 'durasi', 'n_byte', 'kedalaman'])
+            writer.writerows(self.events)
+        t, tx, rx = self.timeline()
+        data = {
+            'ringkasan': self.ringkasan(),
+            'timeline': {'t': t.round(4).tolist(), 'tx_bytes_per_sec': tx.tolist(),
+                         'rx_bytes_per_sec': rx.tolist()},
+        }
+        with open(prefix + '.json', 'w') as f:
+            json.dump(data, f, indent=1)
+        return prefix + '.csv', prefix + '.json'
+
+
+def print_ringkasan(ringkasan):
+    for jenis in ('write', 'read'):
+        st = ringkasan[jenis]
+        if st['count']:
+            print(f"{jenis:<6}: {st['count']:>6} panggilan, {st['bytes']} byte, durasi rata-rata "
+                  f"{st['mean_us']:.0f} us (p99 {st['p99_us']:.0f} us, maks {st['max_us']:.0f} us)")
+    st = ringkasan['stall']
+    if st['count']:
+        print(f"Jeda  : {st['count']} kali, total {st['total_s']*1e3:.1f} ms, "
+              f"terlama {st['max_us']/1e3:.1f} ms")
+    print(f"In-flight maks {ringkasan['in_flight_max']} byte, in_waiting rata-rata "
+          f"{ringkasan['in_waiting_mean']:.0f} (maks {ringkasan['in_waiting_max']}), "
+          f"byte hilang {ringkasan['lost_bytes']}")
+    if ringkasan['reclaims']:
+        print(f"Kredit window diambil kembali {ringkasan['reclaims']} kali "
+              f"({ringkasan['reclaim_bytes']} byte)")
+    print(f"Throughput RX per {ringkasan['timeline_bin']*1e3:.0f} ms: min "
+          f"{ringkasan['rx_rate_min']/1000:.1f}, rata-rata {ringkasan['rx_rate_mean']/1000:.1f}, "
+          f"maks {ringkasan['rx_rate_max']/1000:.1f} kB/s")
@@ -0,0 +1,176 @@
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+import serial
+
+from serial_stream import stream_full_duplex, WINDOW_SIZE
+
+# Satu sinyal FM dibagi ke beberapa board (satu port serial per board) yang
+# jalan bersamaan: N board ~ N x throughput 200 kSps satu port.
+# Tiap segmen (kecuali yang pertama) dimulai LEAD_IN sampel lebih awal;
+# output lead-in dibuang karena PLL board itu baru mulai lock.
+# Sebelum disambung, latensi tiap segmen dicek terhadap segmen sebelumnya
+# yang sudah ditempatkan di output: bagian akhir lead-in (PLL sudah lock)
+# dibandingkan untuk sampel input yang sama. Lag tiap segmen relatif ke
+# latensi struktural (0), tidak dijumlahkan berantai.
+
+# === KONFIGURASI ===
+SHARD_PORTS = ['COM7', 'COM8']
+BAUD_RATE   = 2000000
+LEAD_IN     = 4000             # Sampel overlap per segmen (20 ms @ 200 kSps)
+MAX_LAG     = 16               # Selisih latensi antar board yang dicari (sampel)
+LAG_MARGIN  = 0.3              # Lag != 0 hanya dipakai jika selisihnya >= 30% lebih kecil dari lag 0
+INPUT_FM_WAV = 'fm_modulated_signal.wav'
+
+
+def bagi_segmen(n, n_shards, lead_in=LEAD_IN):
+    """List (mulai_kirim, mulai, akhir) per segmen; mulai_kirim = mulai - lead-in."""
+    bounds = np.linspace(0, n, n_shards + 1).astype(int)
+    return [(max(0, bounds[k] - lead_in), int(bounds[k]), int(bounds[k + 1]))
+            for k in range(n_shards)]
+
+
+def estimasi_lag(prev_tail, cur_head, max_lag=MAX_LAG, margin=LAG_MARGIN):
+    """
+    Geseran d sehingga cur_head[i + d] ~ prev_tail[i], dari selisih absolut
+    rata-rata. Hanya paruh kedua overlap yang dipakai (PLL segmen baru sudah
+    lock). Board yang baru lock bisa tertinggal/mendahului beberapa sampel
+    dibanding board yang berjalan kontinu, jadi ini tetap perlu walau hardware sama.
+    Tapi pada audio frekuensi rendah selisihnya hampir datar terhadap d, jadi
+    lag 0 (latensi struktural, hardware sama) dipertahankan kecuali lag lain
+    menurunkan selisih minimal sebesar margin (relatif).
+    """
+    n = min(len(prev_tail), len(cur_head))
+    half = n // 2
+    ref = prev_tail[half:n].astype(np.int16)
+    cost = {}
+    for d in range(-max_lag, max_lag + 1):
+        lo, hi = half + d, n + d
+        if lo < 0 or hi > len(cur_head):
+            continue
+        cost[d] = np.mean(np.abs(cur_head[lo:hi].astype(np.int16) - ref))
+    if 0 not in cost:
+        return 0
+    best = min(cost, key=cost.get)
+    return best if cost[best] <= (1 - margin) * cost[0] else 0
+
+
+def sambung(n, segments, outputs):
+    """
+    Sambung output per segmen jadi n sampel: segmen k mengisi [mulai, akhir),
+    digeser sesuai latensinya. Mengembalikan (output uint8, list lag).
+    """
+    out = np.full(n, 128, dtype=np.uint8)
+    lags = []
+    for k, (send_start, start, end) in enumerate(segments):
+        rx = outputs[k]
+        lag = 0
+        if k > 0:
+            # Dibandingkan dengan segmen sebelumnya SETELAH digeser ke posisinya di
+            # output, jadi lag langsung relatif ke latensi struktural (board sama)
+            # dan tidak dijumlahkan berantai dari segmen ke segmen
+            prev_send = segments[k - 1][0]
+            shift = start - prev_send + lags[-1]
+            prev_tail = outputs[k - 1][max(0, shift - (start - send_start)):shift]
+            lag = estimasi_lag(prev_tail, rx[start - send_start - len(prev_tail):start - send_start])
+        lags.append(lag)
+        src0 = start - send_start + lag
+        count = max(0, min(end - start, len(rx) - src0))
+        out[start:start + count] = rx[src0:src0 + count]
+    return out, lags
+
+
+def stream_sharded(ports, samples, baud_rate=BAUD_RATE, lead_in=LEAD_IN,
+                   window=WINDOW_SIZE, show_progress=True):
+    """
+    Kirim segmen-segmen 'samples' (uint8) ke tiap port secara paralel,
+    lalu sambung outputnya. Mengembalikan (output uint8, stats).
+    """
+    data = np.frombuffer(memoryview(samples).cast('B'), dtype=np.uint8)
+    segments = bagi_segmen(len(data), len(ports), lead_in)
+    results = [None] * len(ports)
+    errors = [None] * len(ports)
+
+    def worker(k):
+        send_start, _, end = segments[k]
+        try:
+            ser = serial.Serial(ports[k], baud_rate, timeout=2)
+            try:
+                ser.reset_input_buffer()
+                rx, st = stream_full_duplex(ser, data[send_start:end], window=window,
+                                            show_progress=False)
+                results[k] = (np.frombuffer(rx, dtype=np.uint8), st)
+            finally:
+                ser.close()
+        except Exception as e:
+            errors[k] = e
+
+    start_time = time.time()
+    threads = [threading.Thread(target=worker, args=(k,), daemon=True) for k in range(len(ports))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start_time
+    for k, e in enumerate(errors):
+        if e is not None:
+            raise RuntimeError(f"Port {ports[k]} gagal: {e}")
+
+    out, lags = sambung(len(data), segments, [r[0] for r in results])
+
+    stats = {
+        'shards': len(ports),
+        'received': sum(len(r[0]) for r in results),
+        'sent': sum(r[1]['sent'] for r in results),
+        'lags': lags,
+        'elapsed': elapsed,
+        'samples_per_sec': len(data) / elapsed if elapsed > 0 else 0.0,
+        'per_port_bytes_per_sec': [r[1]['bytes_per_sec'] for r in results],
+    }
+    if show_progress:
+        print_sharded_stats(stats)
+    return out, stats
+
+
+def print_sharded_stats(stats):
+    print(f"{stats['shards']} board, {stats['sent']} byte dikirim, {stats['received']} diterima "
+          f"dalam {stats['elapsed']:.2f} detik")
+    print(f"Throughput total: {stats['samples_per_sec']/1000:.1f} kSps "
+          f"(per port: {', '.join(f'{b/1000:.1f}' for b in stats['per_port_bytes_per_sec'])} kB/s)")
+    print(f"Latensi relatif per segmen: {stats['lags']}")
+
+
+def main():
+    # Uji tanpa hardware: N FPGA virtual, hasil dibandingkan dengan golden model satu board
+    import scipy.io.wavfile as wav
+    from virtual_fpga import VirtualFPGA
+    from fm_golden_model import demodulate
+
+    parser = argparse.ArgumentParser(description="Uji sharding dengan beberapa FPGA virtual")
+    parser.add_argument('--virtual', type=int, default=2, help="Jumlah FPGA virtual")
+    parser.add_argument('--input', default=INPUT_FM_WAV)
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    fpga_rate, fm = wav.read(args.input, mmap=True)
+    fm = np.ascontiguousarray(fm[:int(args.seconds * fpga_rate)])
+    devices = [VirtualFPGA(personality='demod').start() for _ in range(args.virtual)]
+    try:
+        out, stats = stream_sharded([d.port for d in devices], fm)
+    finally:
+        for d in devices:
+            d.stop()
+
+    # Referensi: satu board memproses semua sampel (termasuk byte basi di awal)
+    ref = np.concatenate(([0], demodulate(fm)[:-1])).astype(np.uint8)
+    diff = np.abs(out.astype(np.int16) - ref)
+    print(f"Dibanding satu board: {np.mean(diff == 0)*100:.2f}% sampel identik, "
+          f"selisih maks {diff.max()}, rata-rata {diff.mean():.3f} LSB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
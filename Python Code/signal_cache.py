@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+
+# Cache sinyal uji FM berbasis isi (content-addressed).
+# Kunci = hash SHA-256 dari jenis sinyal + semua parameter modulasi
+# (+ hash isi file input jika ada), jadi ganti lagu atau setting apapun
+# otomatis menghasilkan entri baru. Tiap entri adalah folder berisi file
+# .npy yang dibuka dengan mmap_mode='r' (tidak dimuat ke RAM).
+# Total ukuran dibatasi MAX_CACHE_BYTES, entri yang paling lama tidak
+# dipakai dibuang lebih dulu (LRU).
+#
+# Perintah:
+#   python signal_cache.py list               -> daftar entri
+#   python signal_cache.py purge [KEY ...]     -> hapus entri (semua jika tanpa KEY)
+
+# === KONFIGURASI ===
+CACHE_DIR       = 'fm_cache'
+MAX_CACHE_BYTES = 2 * 1024**3      # 2 GB
+INDEX_FILE      = 'index.json'
+HASH_CHUNK      = 1 << 20
+
+
+def file_hash(path):
+    """SHA-256 isi file (dibaca per potongan)."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _json_default(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    raise TypeError(f"Parameter tidak bisa di-hash: {v!r}")
+
+
+class SignalCache:
+    """Cache .npy ber-mmap dengan index JSON (ukuran, waktu akses terakhir, parameter)."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+
+    # --- index ---
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=1, default=_json_default)
+        os.replace(tmp, self.index_path)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    # --- API ---
+    def key(self, kind, params, input_file=None):
+        """Kunci entri dari jenis sinyal, parameter, dan (opsional) isi file input."""
+        desc = {'kind': kind, 'params': params}
+        if input_file is not None:
+            desc['input'] = file_hash(input_file)
+        blob = json.dumps(desc, sort_keys=True, default=_json_default)
+        return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+    def load(self, key):
+        """dict nama -> array (memmap read-only), atau None jika belum ada."""
+        index = self._load_index()
+        entry = index.get(key)
+        folder = self._entry_dir(key)
+        if entry is None or not os.path.isdir(folder):
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode='r')
+                      for name in entry['arrays']}
+        except (OSError, ValueError):
+            self.purge([key])
+            return None
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self._save_index(index)
+        return arrays
+
+    def begin(self, key):
+        """Folder sementara untuk menulis entri baru (mis. np.lib.format.open_memmap)."""
+        tmp = self._entry_dir(key) + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        return tmp
+
+    def commit(self, key, tmp_dir, kind='', params=None):
+        """Pindahkan folder sementara menjadi entri jadi, lalu jalankan eviction LRU."""
+        folder = self._entry_dir(key)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp_dir, folder)
+        names = sorted(f[:-4] for f in os.listdir(folder) if f.endswith('.npy'))
+        size = sum(os.path.getsize(os.path.join(folder, n + '.npy')) for n in names)
+
+        index = self._load_index()
+        now = time.time()
+        index[key] = {'kind': kind, 'params': params or {}, 'arrays': names,
+                      'size': size, 'created': now, 'last_used': now, 'hits': 0}
+        self._save_index(index)
+        self.evict(keep=key)
+
+    def abort(self, tmp_dir):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def store(self, key, arrays, kind='', params=None):
+        """Simpan dict nama -> array sekaligus, kembalikan versi memmap-nya."""
+        tmp = self.begin(key)
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, name + '.npy'), np.asarray(arr))
+        self.commit(key, tmp, kind, params)
+        folder = self._entry_dir(key)
+        return {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode='r') for name in arrays}
+
+    def get_or_create(self, kind, params, builder, input_file=None):
+        """Kembalikan entri dari cache, atau panggil builder() -> dict array lalu simpan."""
+        key = self.key(kind, params, input_file)
+        arrays = self.load(key)
+        if arrays is None:
+            arrays = self.store(key, builder(), kind, params)
+        return arrays
+
+    def evict(self, keep=None):
+        """Buang entri yang paling lama tidak dipakai sampai total <= max_bytes."""
+        index = self._load_index()
+        total = sum(e['size'] for e in index.values())
+        removed = []
+        for key, entry in sorted(index.items(), key=lambda kv: kv[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entry['size']
+            removed.append(key)
+        if removed:
+            self.purge(removed)
+        return removed
+
+    def purge(self, keys=None):
+        """Hapus entri tertentu (atau semua jika keys=None)."""
+        index = self._load_index()
+        keys = list(index) if keys is None else keys
+        for key in keys:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            index.pop(key, None)
+        self._save_index(index)
+        return keys
+
+    def entries(self):
+        return self._load_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspeksi / hapus cache sinyal FM")
+    parser.add_argument('command', choices=['list', 'purge'])
+    parser.add_argument('keys', nargs='*', help="Kunci entri untuk purge (kosong = semua)")
+    parser.add_argument('--dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = SignalCache(args.dir)
+    if args.command == 'list':
+        entries = cache.entries()
+        total = 0
+        for key, e in sorted(entries.items(), key=lambda kv: -kv[1]['last_used']):
+            total += e['size']
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['last_used']))
+            params = ', '.join(f"{k}={v}" for k, v in sorted(e['params'].items()))
+            print(f"{key}  {e['size']/1e6:9.2f} MB  {used}  hit {e.get('hits', 0):>3}  "
+                  f"{e['kind']}: {params}")
+        print(f"{len(entries)} entri, {total/1e6:.2f} MB dari batas {cache.max_bytes/1e6:.0f} MB")
+    else:
+        removed = cache.purge(args.keys or None)
+        print(f"{len(removed)} entri dihapus.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import scipy.fft
+import scipy.signal as signal
+import scipy.io.wavfile as wav
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Streaming Welch PSD + spectrogram for FM captures and demodulated audio.
+# The WAV is memory-mapped and processed a batch of segments at a time
+# (float32 in, complex64 rfft out), so memory stays flat for any length.
+# scipy.fft keeps its twiddle/plan cache between calls with the same
+# segment length, so every batch reuses the same plan.
+# Results are cached next to the WAV (<file>.spec.npz) and rebuilt when the
+# file or the analysis settings change, like the .lod.npz cache of
+# audio_visualisation.py.
+
+# CONFIGURATION
+FILENAME       = 'fm_modulated_signal.wav'
+NPERSEG        = 4096        # Samples per FFT segment (~49 Hz bins at 200 kSps)
+OVERLAP        = 0.5         # Segment overlap (Hann window)
+BATCH_SEGMENTS = 256         # Segments transformed per rfft call
+SPEC_COLUMNS   = 800         # Max spectrogram time columns (segments are averaged into them)
+OBW_FRACTION   = 0.99        # Occupied bandwidth = band holding this fraction of the power
+SPUR_THRESHOLD = 10.0        # dB above the out-of-band noise floor to count as a spur
+MAX_SPURS      = 10
+CARRIER_FREQ   = 50000       # Expected FM carrier (Modulator.py)
+DEV_FREQ       = 5000        # Expected peak deviation
+AUDIO_BW       = 15000       # Highest audio frequency assumed for Carson's rule
+
+
+def cache_path(filename):
+    return filename + '.spec.npz'
+
+
+class WelchEngine:
+    """Accumulates one-sided PSD (V^2/Hz, like scipy.signal.welch) and a time-averaged spectrogram."""
+
+    def __init__(self, fs, n_samples, nperseg=NPERSEG, overlap=OVERLAP, columns=SPEC_COLUMNS):
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg - int(nperseg * overlap)
+        self.window = signal.get_window('hann', nperseg).astype(np.float32)
+        self.scale = 1.0 / (fs * float(np.sum(self.window.astype(np.float64) ** 2)))
+        self.freqs = scipy.fft.rfftfreq(nperseg, 1 / fs)
+        self.n_segments = max(0, (n_samples - nperseg) // self.step + 1)
+        self.columns = max(1, min(columns, self.n_segments))
+        self.total = np.zeros(len(self.freqs))
+        self.spec = np.zeros((self.columns, len(self.freqs)))
+        self.spec_count = np.zeros(self.columns)
+
+    def segment_power(self, x):
+        """|rfft|^2 of every full segment in x (float32 block starting on a segment boundary)."""
+        segs = sliding_window_view(x, self.nperseg)[::self.step]
+        segs = segs - segs.mean(axis=1, keepdims=True)      # detrend='constant', makes a copy
+        segs *= self.window
+        X = scipy.fft.rfft(segs, axis=1, workers=-1)
+        return X.real ** 2 + X.imag ** 2
+
+    def add(self, power, first_segment):
+        self.total += power.sum(axis=0, dtype=np.float64)
+        cols = (np.arange(first_segment, first_segment + len(power)) * self.columns) // self.n_segments
+        starts = np.flatnonzero(np.diff(cols, prepend=-1))
+        self.spec[cols[starts]] += np.add.reduceat(power, starts, axis=0, dtype=np.float64)
+        self.spec_count[cols[starts]] += np.diff(np.append(starts, len(cols)))
+
+    def run(self, data):
+        """Feed a whole (memory-mapped) 1-D array batch by batch."""
+        for k0 in range(0, self.n_segments, BATCH_SEGMENTS):
+            k1 = min(self.n_segments, k0 + BATCH_SEGMENTS)
+            block = np.asarray(data[k0 * self.step:(k1 - 1) * self.step + self.nperseg], dtype=np.float32)
+            self.add(self.segment_power(block), k0)
+        return self
+
+    def result(self):
+        onesided = np.full(len(self.freqs), 2.0)
+        onesided[0] = 1.0
+        if self.nperseg % 2 == 0:
+            onesided[-1] = 1.0
+        psd = self.total / max(1, self.n_segments) * self.scale * onesided
+        spec = self.spec / np.maximum(self.spec_count, 1)[:, None] * self.scale * onesided
+        times = ((np.arange(self.columns) + 0.5) * self.n_segments / self.columns * self.step
+                 + self.nperseg / 2) / self.fs
+        return {
+            'fs': self.fs, 'freqs': self.freqs, 'psd': psd,
+            'spec_db': (10 * np.log10(spec + 1e-20)).astype(np.float32), 'times': times,
+        }
+
+
+def load_or_build_cache(filename, nperseg=NPERSEG, overlap=OVERLAP, columns=SPEC_COLUMNS):
+    """PSD + spectrogram for a WAV, from <file>.spec.npz if the file and settings are unchanged."""
+    st = os.stat(filename)
+    path = cache_path(filename)
+    settings = np.array([nperseg, overlap, columns], dtype=np.float64)
+    if os.path.exists(path):
+        try:
+            cache = np.load(path)
+            if (int(cache['size']) == st.st_size and float(cache['mtime']) == st.st_mtime
+                    and np.array_equal(cache['settings'], settings)):
+                return {k: cache[k] for k in ('freqs', 'psd', 'spec_db', 'times')} | {'fs': int(cache['fs'])}
+        except Exception as e:
+            print(f"Cache unreadable ({e}), rebuilding...")
+
+    fs, data = wav.read(filename, mmap=True)
+    if len(data.shape) > 1:
+        data = data[:, 0]
+    if len(data) < nperseg:
+        raise ValueError(f"{filename} is shorter than one segment ({nperseg} samples)")
+    print(f"Computing spectrum of {filename} ({len(data)} samples)...")
+    res = WelchEngine(fs, len(data), nperseg, overlap, columns).run(data).result()
+    try:
+        with open(path, 'wb') as f:
+            np.savez(f, size=st.st_size, mtime=st.st_mtime, settings=settings, **res)
+    except OSError as e:
+        print(f"Could not write cache: {e}")
+    return res
+
+
+def occupied_bandwidth(freqs, psd, fraction=OBW_FRACTION):
+    """(f_low, f_high) holding 'fraction' of the power, DC bin excluded."""
+    p = psd.copy()
+    p[0] = 0.0
+    c = np.cumsum(p)
+    lo = np.searchsorted(c, c[-1] * (1 - fraction) / 2)
+    hi = np.searchsorted(c, c[-1] * (1 + fraction) / 2)
+    return float(freqs[lo]), float(freqs[min(hi, len(freqs) - 1)])
+
+
+def find_spurs(freqs, psd, band, threshold=SPUR_THRESHOLD, max_spurs=MAX_SPURS):
+    """
+    Narrow peaks outside the occupied band that stand 'threshold' dB above
+    the out-of-band median. Returns [(freq, dBc)], dBc relative to the total
+    in-band power, strongest first.
+    """
+    psd_db = 10 * np.log10(psd + 1e-20)
+    out = (freqs < band[0]) | (freqs > band[1])
+    out[0] = False
+    if not np.any(out):
+        return []
+    floor = np.median(psd_db[out])
+    peaks, _ = signal.find_peaks(np.where(out, psd_db, -np.inf), height=floor + threshold,
+                                 prominence=threshold)
+    carrier_power = psd[~out].sum()
+    spurs = []
+    for p in peaks:
+        # Hann main lobe is +-2 bins
+        power = psd[max(0, p - 2):p + 3].sum()
+        spurs.append((float(freqs[p]), float(10 * np.log10(power / carrier_power))))
+    return sorted(spurs, key=lambda s: -s[1])[:max_spurs]
+
+
+def measure(res, carrier_freq=CARRIER_FREQ, dev_freq=DEV_FREQ, audio_bw=AUDIO_BW):
+    """
+    Occupied bandwidth for any file. If the strongest bin lies inside the
+    Carson band around the expected carrier the file is treated as FM and
+    the carrier centroid and spurs (outside both the occupied and the
+    Carson band, so modulation sidebands are not counted) are added.
+    """
+    freqs, psd = res['freqs'], res['psd']
+    lo, hi = occupied_bandwidth(freqs, psd)
+    peak = float(freqs[1:][np.argmax(psd[1:])])
+    carson = 2 * (dev_freq + audio_bw)
+    m = {'obw_low': lo, 'obw_high': hi, 'obw': hi - lo, 'peak_freq': peak,
+         'is_fm': abs(peak - carrier_freq) <= carson / 2}
+    if m['is_fm']:
+        band = (freqs >= lo) & (freqs <= hi)
+        centroid = float(np.sum(freqs[band] * psd[band]) / np.sum(psd[band]))
+        guard = (min(lo, carrier_freq - carson / 2), max(hi, carrier_freq + carson / 2))
+        m.update({'carson_bw': carson, 'carrier_centroid': centroid,
+                  'carrier_error': centroid - carrier_freq,
+                  'spurs': find_spurs(freqs, psd, guard)})
+    return m
+
+
+def print_report(filename, res, m):
+    print(f"\n{filename}: fs = {res['fs']} Hz, {len(res['freqs'])} bins "
+          f"({res['freqs'][1]:.1f} Hz resolution)")
+    print(f"Occupied bandwidth ({OBW_FRACTION*100:.0f}%): {m['obw_low']/1000:.2f} - "
+          f"{m['obw_high']/1000:.2f} kHz = {m['obw']/1000:.2f} kHz, "
+          f"strongest bin {m['peak_freq']/1000:.3f} kHz")
+    if not m['is_fm']:
+        return
+    print(f"FM carrier centroid: {m['carrier_centroid']/1000:.3f} kHz "
+          f"({m['carrier_error']:+.0f} Hz from {CARRIER_FREQ/1000:.1f} kHz), "
+          f"Carson bandwidth {m['carson_bw']/1000:.1f} kHz")
+    if m['spurs']:
+        print("Spurs outside the occupied band:")
+        for f, dbc in m['spurs']:
+            print(f"  {f/1000:9.3f} kHz  {dbc:7.1f} dBc")
+    else:
+        print(f"No spurs more than {SPUR_THRESHOLD:.0f} dB above the noise floor.")
+
+
+def plot_spectrum(filename, res, m):
+    import matplotlib.pyplot as plt
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+    ax1.plot(res['freqs'] / 1000, 10 * np.log10(res['psd'] + 1e-20), color='blue', linewidth=0.7)
+    ax1.axvspan(m['obw_low'] / 1000, m['obw_high'] / 1000, color='green', alpha=0.15,
+                label=f"OBW {m['obw']/1000:.1f} kHz")
+    for f, _ in m.get('spurs', []):
+        ax1.axvline(f / 1000, color='red', linestyle=':', linewidth=0.8)
+    ax1.set_title(f"Welch PSD: {filename}")
+    ax1.set_xlabel("Frequency (kHz)")
+    ax1.set_ylabel("PSD (dB/Hz)")
+    ax1.legend(loc='upper right')
+    ax1.grid(True, alpha=0.3)
+
+    spec = res['spec_db']
+    vmax = float(spec.max())
+    ax2.imshow(spec.T, origin='lower', aspect='auto', cmap='viridis', vmin=vmax - 80, vmax=vmax,
+               extent=[res['times'][0], res['times'][-1], 0, res['freqs'][-1] / 1000])
+    ax2.set_title("Spectrogram")
+    ax2.set_xlabel("Time (s)")
+    ax2.set_ylabel("Frequency (kHz)")
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming PSD / spectrogram of WAV captures")
+    parser.add_argument('files', nargs='*', default=[FILENAME])
+    parser.add_argument('--nperseg', type=int, default=NPERSEG)
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
+    for filename in args.files:
+        if not os.path.exists(filename):
+            print(f"Error: {filename} not found.")
+            return 1
+        res = load_or_build_cache(filename, args.nperseg)
+        m = measure(res)
+        print_report(filename, res, m)
+        if not args.no_plot:
+            plot_spectrum(filename, res, m)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
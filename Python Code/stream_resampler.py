@@ -0,0 +1,103 @@
+import numpy as np
+import scipy.signal as signal
+from math import gcd
+
+# Resampler polyphase rasional (L/M) yang bisa dipanggil per blok.
+# Hasilnya sama dengan signal.resample_poly() pada sinyal utuh, tapi
+# state filter disimpan antar blok sehingga memori tetap kecil.
+
+
+class StreamResampler:
+    """
+    Resampler polyphase streaming dari rate_in ke rate_out.
+    Panggil process(blok) berulang kali, lalu flush() di akhir.
+    """
+
+    def __init__(self, rate_in, rate_out, window=('kaiser', 5.0)):
+        g = gcd(int(rate_in), int(rate_out))
+        self.up = int(rate_out) // g
+        self.down = int(rate_in) // g
+
+        # Rate sama: resample_poly hanya menyalin input, tanpa filter
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            self.h = np.ones(1)
+            self.delay = 0
+        else:
+            # Desain filter sama persis dengan resample_poly()
+            max_rate = max(self.up, self.down)
+            half_len = 10 * max_rate
+            self.h = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=window) * self.up
+            self.delay = half_len
+
+        self._h_shifted = {}     # Cache filter yang sudah digeser (per offset)
+        self._hist = np.zeros(0) # Sisa input yang masih dibutuhkan filter
+        self._hist_start = 0     # Indeks absolut sampel pertama di _hist
+        self._n_in = 0           # Total sampel input yang sudah masuk
+        self._n_out = 0          # Indeks output berikutnya
+
+    def _filter_for(self, offset):
+        h = self._h_shifted.get(offset)
+        if h is None:
+            h = np.concatenate((np.zeros(offset), self.h))
+            self._h_shifted[offset] = h
+        return h
+
+    def _run(self, buf, n_end):
+        L, M, D = self.up, self.down, self.delay
+        n0 = self._n_out
+        count = n_end - n0
+        if count <= 0:
+            return np.zeros(0)
+
+        # Posisi output n di domain upsampled (relatif ke awal buf) = n*M + D - s*L.
+        # Filter digeser 'z' sampel supaya posisi itu jatuh tepat di grid output upfirdn.
+        pos = n0 * M + D - self._hist_start * L
+        z = (-pos) % M
+        start = (pos + z) // M
+
+        # Potong input seperlunya agar upfirdn tidak menghitung ekor yang dibuang
+        last_in = ((n_end - 1) * M + D) // L - self._hist_start + 1
+        seg = buf[:min(len(buf), last_in)]
+        y = signal.upfirdn(self._filter_for(z), seg, up=L, down=M)
+        out = y[start:start + count]
+        if len(out) < count:
+            out = np.concatenate((out, np.zeros(count - len(out))))
+
+        # Buang input yang sudah tidak dibutuhkan lagi oleh output berikutnya
+        k_min = max(0, -(-(n_end * M + D - (len(self.h) - 1)) // L))
+        k_min = max(k_min, self._hist_start)
+        self._hist = buf[k_min - self._hist_start:].copy()
+        self._hist_start = k_min
+        self._n_out = n_end
+        return out
+
+    def process(self, block):
+        """Masukkan satu blok input, kembalikan output yang sudah lengkap."""
+        block = np.asarray(block, dtype=np.float64)
+        if self.passthrough:
+            self._n_in += len(block)
+            self._n_out = self._n_in
+            return block.copy()
+        buf = np.concatenate((self._hist, block)) if len(self._hist) else block
+        self._n_in += len(block)
+
+        # Output n siap jika semua input yang dibutuhkan sudah ada
+        n_end = (self._n_in * self.up - 1 - self.delay) // self.down + 1
+        if n_end <= self._n_out:
+            self._hist = buf.copy()
+            return np.zeros(0)
+        return self._run(buf, n_end)
+
+    def flush(self):
+        """Keluarkan sisa output (ekor filter) di akhir stream."""
+        n_total = -(-self._n_in * self.up // self.down)
+        if n_total <= self._n_out:
+            return np.zeros(0)
+        pad = np.zeros(len(self.h) // self.up + 2)
+        buf = np.concatenate((self._hist, pad))
+        return self._run(buf, n_total)
+
+    def output_length(self, n_in):
+        """Panjang output total untuk n_in sampel input (sama seperti resample_poly)."""
+        return -(-int(n_in) * self.up // self.down)
@@ -0,0 +1,342 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import scipy.io.wavfile as wav
+import scipy.signal as signal
+
+from fm_golden_model import FMDemodulatorModel
+
+# Checks a Questa testbench output dump against the software golden model.
+# The dump is parsed in bulk straight from a memory map: every byte goes
+# through a digit lookup table, tokens are found from digit/non-digit edges
+# and their values summed with np.add.reduceat, so there is no per-line
+# Python loop. Multi-GB dumps are handled block by block (cut at a newline).
+#
+# Accepted dump text (one of):
+#   - one value per line, like simulation_input.txt ("A5")
+#   - several columns per line, e.g. Questa 'list' output or a textio
+#     process writing "<time> <audio_out>"; pick the column with --column
+#   - $readmemh style files; lines starting with '/', '@' or '#' are skipped
+# Values are whitespace/comma separated fields. A field with any character
+# that is not a digit of BASE ('U', 'X', 'Z', '-', units like "ns") is
+# undefined: counted, kept for column numbering, never compared.
+#
+# The reference is the golden model run over the testbench input
+# (simulation_input.txt from wavtohex.py, or the FM WAV). The dump is aligned
+# to it by FFT cross-correlation before comparing. The model defaults to the
+# uart_fm_system.vhd settings; a testbench around fm_demodulator_top alone
+# needs --testbench (its generic defaults, enable high every clock) or the
+# individual --cw0/--filter-shift/... options.
+
+# CONFIGURATION
+DUMP_FILE     = 'simulation_output.txt'
+INPUT_FILE    = 'simulation_input.txt'   # Or the 8-bit FM .wav it was made from
+BASE          = 16                       # Number base of the dump values
+COLUMN        = None                     # Column per line to use (None = every value)
+BLOCK_BYTES   = 16 << 20                 # Dump bytes parsed per block
+ALIGN_SAMPLES = 1 << 18                  # Samples used to find the alignment
+MAX_LAG       = 4096                     # Alignment search range (samples)
+TOLERANCE     = 0                        # |dut - ref| above this counts as a divergence
+
+# Golden model settings of fm_demodulator_top.vhd instantiated on its own
+# (generic defaults, as in tb_fm_demodulator.vhd): --testbench
+TESTBENCH_MODEL = dict(cw0=4294967, filter_shift=12, kp=32000, ki=50, stages=3,
+                       lf_shift=0, continuous_enable=True)
+
+# ASCII byte -> digit value (-1 = separator, -2 = not a digit)
+DIGITS = np.full(256, -2, dtype=np.int8)
+DIGITS[np.frombuffer(b' \t\r\n,', dtype=np.uint8)] = -1
+DIGITS[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+DIGITS[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+DIGITS[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+MINUS = ord('-')
+COMMENT_CHARS = np.frombuffer(b'/@#', dtype=np.uint8)
+NEWLINE = ord('\n')
+
+
+def parse_block(buf, base=BASE, column=COLUMN):
+    """
+    Parse one block of dump text (uint8 array ending on a line boundary).
+    Returns (values int64, defined bool). Undefined values are 0.
+    """
+    if len(buf) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    # Fast path: exactly "XX\n" per line (wavtohex 'hex' format)
+    if base == 16 and column in (None, 0) and len(buf) % 3 == 0:
+        rows = buf.reshape(-1, 3)
+        if np.all(rows[:, 2] == NEWLINE):
+            hi, lo = DIGITS[rows[:, 0]].astype(np.int64), DIGITS[rows[:, 1]]
+            defined = (hi >= 0) & (lo >= 0)
+            if np.all(hi != -1) and np.all(lo != -1):
+                return np.where(defined, hi * 16 + lo, 0), defined
+
+    # Per-byte arrays stay 1 byte wide and token indices int32, so a block
+    # costs a small multiple of its size (int64 per byte was ~40x)
+    digit = DIGITS[buf]
+    if base == 10:
+        digit[digit >= 10] = -2
+    newlines = np.flatnonzero(buf == NEWLINE).astype(np.int32)
+    # Skip comment / address lines
+    line_start = np.concatenate(([0], newlines[newlines < len(buf) - 1] + 1))
+    comment = np.isin(buf[line_start], COMMENT_CHARS)
+    if np.any(comment):
+        line_len = np.diff(np.append(line_start, len(buf)))
+        digit[np.repeat(comment, line_len)] = -1
+
+    in_tok = digit != -1
+    edges = np.diff(np.concatenate(([False], in_tok, [False])).view(np.int8))
+    starts = np.flatnonzero(edges == 1).astype(np.int32)
+    ends = np.flatnonzero(edges == -1).astype(np.int32)
+    del edges
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    # Negative decimal values ("-12"): the leading '-' counts as a 0 digit
+    neg = np.zeros(len(starts), dtype=bool)
+    if base == 10:
+        neg = (buf[starts] == MINUS) & (ends - starts > 1)
+        digit[starts[neg]] = 0
+
+    # Token characters are contiguous in 'd', so token k starts at the
+    # running sum of the previous lengths. Place value of every character:
+    # base ** (distance to token end - 1), from a small power table.
+    lengths = ends - starts
+    last = np.cumsum(lengths, dtype=np.int32)
+    first = last - lengths
+    last -= 1
+    d = digit[in_tok]
+    del digit, in_tok
+    exp = np.repeat(last, lengths)
+    exp -= np.arange(len(d), dtype=np.int32)
+    powers = base ** np.arange(int(lengths.max()), dtype=np.int64)
+    terms = powers[exp]
+    del exp
+    terms *= np.maximum(d, 0)
+    values = np.add.reduceat(terms, first)
+    del terms
+    defined = ~np.logical_or.reduceat(d < 0, first)
+    values[neg] *= -1
+
+    if column is not None:
+        # Token index within its line: newlines before each token start
+        # give the line, the first token of each run of equal lines gives the offset
+        line_of_tok = np.searchsorted(newlines, starts)
+        changed = np.diff(line_of_tok, prepend=-1) != 0
+        run = np.cumsum(changed) - 1
+        keep = (np.arange(len(starts)) - np.flatnonzero(changed)[run]) == column
+        values, defined = values[keep], defined[keep]
+    return np.where(defined, values, 0), defined
+
+
+def read_dump(path, base=BASE, column=COLUMN, block_bytes=BLOCK_BYTES):
+    """Generator of (values, defined) blocks from a text dump (memory-mapped)."""
+    if os.path.getsize(path) == 0:
+        return
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    pos = 0
+    while pos < len(raw):
+        end = min(len(raw), pos + block_bytes)
+        if end < len(raw):
+            # Cut after the last newline so no value is split between blocks
+            nl = np.flatnonzero(raw[pos:end] == NEWLINE)
+            if len(nl):
+                end = pos + int(nl[-1]) + 1
+        yield parse_block(np.asarray(raw[pos:end]), base, column)
+        pos = end
+
+
+def read_input(path, block_bytes=BLOCK_BYTES):
+    """Generator of uint8 testbench input blocks from a hex text file or an 8-bit WAV."""
+    if path.lower().endswith('.wav'):
+        _, data = wav.read(path, mmap=True)
+        if data.dtype != np.uint8:
+            raise ValueError(f"{path}: expected 8-bit unsigned WAV")
+        for i in range(0, len(data), block_bytes):
+            yield np.asarray(data[i:i + block_bytes])
+        return
+    for values, _ in read_dump(path, 16, None, block_bytes):
+        yield values.astype(np.uint8)
+
+
+def reference_blocks(input_path, block_bytes=BLOCK_BYTES, model_params=None):
+    """Golden-model output, block by block (state carried between blocks)."""
+    model = FMDemodulatorModel(**(model_params or {}))
+    for block in read_input(input_path, block_bytes):
+        yield model.process(block)
+
+
+def find_lag(dut, ref, max_lag=MAX_LAG):
+    """Lag L (dut[n + L] ~ ref[n]) and normalized peak correlation, by FFT cross-correlation."""
+    n = min(len(dut), len(ref))
+    a = dut[:n].astype(np.float64) - np.mean(dut[:n])
+    b = ref[:n].astype(np.float64) - np.mean(ref[:n])
+    if n < 2 or not np.any(a) or not np.any(b):
+        return 0, 0.0
+    corr = signal.correlate(a, b, mode='full', method='fft')
+    center = n - 1
+    lag_max = min(max_lag, n - 1)
+    window = corr[center - lag_max:center + lag_max + 1]
+    k = int(np.argmax(window))
+    return k - lag_max, float(window[k] / np.sqrt(np.dot(a, a) * np.dot(b, b)))
+
+
+class Comparison:
+    """Running comparison statistics over aligned blocks."""
+
+    def __init__(self, tolerance=TOLERANCE):
+        self.tolerance = tolerance
+        self.n = 0
+        self.undefined = 0
+        self.exact = 0
+        self.first_divergence = None
+        self.max_abs = 0
+        self.err_hist = {}
+        self.ref_sum = 0.0
+        self.ref_sumsq = 0.0
+        self.err_sumsq = 0.0
+
+    def add(self, dut, defined, ref):
+        diff = dut - ref.astype(np.int64)
+        bad = (np.abs(diff) > self.tolerance) & defined
+        if self.first_divergence is None:
+            idx = np.flatnonzero(bad | ~defined)
+            if len(idx):
+                k = int(idx[0])
+                self.first_divergence = (self.n + k, int(dut[k]) if defined[k] else None, int(ref[k]))
+        d = diff[defined]
+        r = ref[defined].astype(np.float64)
+        self.undefined += int(np.count_nonzero(~defined))
+        self.exact += int(np.count_nonzero(d == 0))
+        if len(d):
+            self.max_abs = max(self.max_abs, int(np.abs(d).max()))
+            vals, counts = np.unique(d, return_counts=True)
+            for v, c in zip(vals.tolist(), counts.tolist()):
+                self.err_hist[v] = self.err_hist.get(v, 0) + c
+        self.ref_sum += r.sum()
+        self.ref_sumsq += np.dot(r, r)
+        self.err_sumsq += float(np.dot(d, d))
+        self.n += len(dut)
+
+    def summary(self):
+        compared = self.n - self.undefined
+        mean = self.ref_sum / compared if compared else 0.0
+        power = self.ref_sumsq / compared - mean ** 2 if compared else 0.0
+        noise = self.err_sumsq / compared if compared else 0.0
+        return {
+            'compared': compared, 'undefined': self.undefined,
+            'exact_pct': 100.0 * self.exact / compared if compared else 0.0,
+            'max_abs_error': self.max_abs,
+            'rms_error': float(np.sqrt(noise)),
+            'snr_db': float(10 * np.log10(power / noise)) if noise > 0 else float('inf'),
+            'first_divergence': self.first_divergence,
+            'error_hist': dict(sorted(self.err_hist.items())),
+        }
+
+
+def check(dump_path, input_path, base=BASE, column=COLUMN, tolerance=TOLERANCE,
+          block_bytes=BLOCK_BYTES, max_lag=MAX_LAG, model_params=None):
+    """Stream both sides, align once on the first ALIGN_SAMPLES, then compare everything."""
+    dut_iter = read_dump(dump_path, base, column, block_bytes)
+    ref_iter = reference_blocks(input_path, block_bytes, model_params)
+    dut_buf = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)]
+    ref_buf = np.zeros(0, dtype=np.uint8)
+    dut_done = ref_done = False
+
+    def fill(need):
+        nonlocal ref_buf, dut_done, ref_done
+        while not dut_done and len(dut_buf[0]) < need:
+            try:
+                v, ok = next(dut_iter)
+                dut_buf[0] = np.concatenate((dut_buf[0], v))
+                dut_buf[1] = np.concatenate((dut_buf[1], ok))
+            except StopIteration:
+                dut_done = True
+        while not ref_done and len(ref_buf) < need:
+            try:
+                ref_buf = np.concatenate((ref_buf, next(ref_iter)))
+            except StopIteration:
+                ref_done = True
+
+    fill(ALIGN_SAMPLES + max_lag)
+    lag, peak = find_lag(dut_buf[0], ref_buf, max_lag)
+    if lag > 0:
+        dut_buf = [dut_buf[0][lag:], dut_buf[1][lag:]]
+    elif lag < 0:
+        ref_buf = ref_buf[-lag:]
+
+    cmp = Comparison(tolerance)
+    while True:
+        fill(1)
+        n = min(len(dut_buf[0]), len(ref_buf))
+        if n == 0:
+            break
+        cmp.add(dut_buf[0][:n], dut_buf[1][:n], ref_buf[:n])
+        dut_buf = [dut_buf[0][n:], dut_buf[1][n:]]
+        ref_buf = ref_buf[n:]
+
+    res = cmp.summary()
+    res.update({'lag': lag, 'align_corr': peak,
+                'dut_extra': len(dut_buf[0]), 'ref_extra': len(ref_buf)})
+    return res
+
+
+def print_report(res):
+    print(f"Alignment: DUT lags the model by {res['lag']} samples "
+          f"(correlation {res['align_corr']:.4f})")
+    print(f"Compared {res['compared']} samples ({res['undefined']} undefined U/X skipped); "
+          f"{res['dut_extra']} extra DUT / {res['ref_extra']} extra model samples at the end")
+    print(f"Exact match: {res['exact_pct']:.3f}%, max |error| {res['max_abs_error']}, "
+          f"RMS error {res['rms_error']:.3f} LSB, SNR {res['snr_db']:.2f} dB")
+    fd = res['first_divergence']
+    if fd is None:
+        print("No divergence found.")
+    else:
+        dut_val = 'U/X' if fd[1] is None else fd[1]
+        print(f"First divergence at model sample {fd[0]}: DUT {dut_val}, model {fd[2]}")
+    hist = res['error_hist']
+    if hist:
+        total = sum(hist.values())
+        print("Error distribution (DUT - model):")
+        for v, c in sorted(hist.items(), key=lambda kv: -kv[1])[:9]:
+            print(f"  {v:+5d}: {c:>10} ({100.0 * c / total:.3f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a testbench output dump with the golden model")
+    parser.add_argument('dump', nargs='?', default=DUMP_FILE)
+    parser.add_argument('--input', default=INPUT_FILE, help="Testbench input (hex text or 8-bit WAV)")
+    parser.add_argument('--base', type=int, choices=[10, 16], default=BASE)
+    parser.add_argument('--column', type=int, default=COLUMN, help="Value column per line (0-based)")
+    parser.add_argument('--tolerance', type=int, default=TOLERANCE)
+    model = parser.add_argument_group('golden model', "Default: uart_fm_system.vhd settings")
+    model.add_argument('--testbench', action='store_true',
+                       help="fm_demodulator_top generic defaults, enable every clock")
+    model.add_argument('--cw0', type=int)
+    model.add_argument('--filter-shift', type=int)
+    model.add_argument('--kp', type=int)
+    model.add_argument('--ki', type=int)
+    model.add_argument('--stages', type=int)
+    model.add_argument('--lf-shift', type=int)
+    model.add_argument('--continuous-enable', action='store_const', const=True,
+                       help="enable high every clock instead of once per UART byte")
+    args = parser.parse_args()
+    model_params = dict(TESTBENCH_MODEL) if args.testbench else {}
+    for name in ('cw0', 'filter_shift', 'kp', 'ki', 'stages', 'lf_shift', 'continuous_enable'):
+        if getattr(args, name) is not None:
+            model_params[name] = getattr(args, name)
+
+    for path in (args.dump, args.input):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found.")
+            return 1
+    res = check(args.dump, args.input, args.base, args.column, args.tolerance,
+                model_params=model_params)
+    print_report(res)
+    return 0 if res['first_divergence'] is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+import sys
+import argparse
+
+import numpy as np
+
+from serial_stream import WINDOW_SIZE, CHUNK_SIZE, STALL_TIMEOUT, BITS_PER_BYTE, line_rate
+
+# Model throughput tingkat clock untuk datapath uart_fm_system.vhd:
+#   uart_rx -> FIFO RX (256) -> kontroler 3 state -> FIFO TX (256) -> uart_tx
+# Bukan simulasi per clock: tiap byte punya waktu event (dalam clock 50 MHz)
+# yang dihitung dengan rekursi max-plus per blok, jadi beberapa detik trafik
+# disimulasikan dalam hitungan ratus milidetik.
+#
+# Event per byte (dari VHDL):
+#   - kabel/uart_rx : byte mulai di kabel paling cepat saat byte sebelumnya selesai,
+#                     o_Rx_DV setelah 10 x CLKS_PER_BIT clock
+#   - FIFO RX       : tulis saat count = 256 -> byte DIBUANG (fifo.vhd)
+#   - kontroler     : IDLE hanya lanjut jika FIFO RX tidak kosong DAN FIFO TX
+#                     tidak penuh (backpressure), 3 clock per sampel
+#   - uart_tx       : 10 x CLKS_PER_BIT + 2 clock per byte (CLEANUP + handshake
+#                     tx_dv), jadi saat streaming kontinu TX ~0.8% lebih lambat
+#                     dari RX dan backlog di FIFO terus bertambah.
+#
+# Pola kirim host yang dimodelkan:
+#   'chunk_sleep' : write(chunk) lalu sleep (FPGAProcessing bergantian, freqsendder)
+#   'lockstep'    : write(chunk) lalu tunggu semua balasan (new.py, Audiotest)
+#   'window'      : full-duplex, maks. 'window' byte in-flight (serial_stream)
+
+# === KONFIGURASI ===
+CLK_FREQ      = 50000000
+BAUD_RATE     = 2000000
+FIFO_DEPTH    = 256
+CTRL_CLKS     = 3                   # IDLE -> PROCESS_SAMPLE -> WRITE_OUTPUT
+TX_EXTRA_CLKS = 2                   # CLEANUP + handshake tx_dv per byte TX
+WIRE_BUFFER   = 4096                # Buffer chip USB-UART (write() blok jika penuh)
+HOST_LATENCY  = 0.001               # Latency timer USB-UART sebelum host melihat balasan (detik)
+SIM_SECONDS   = 2.0                 # Lama trafik yang disimulasikan untuk rekomendasi
+SLEEP_MARGIN  = 0.05                # Cadangan sleep di atas batas teoretis (jitter OS)
+FIFO_MARGIN   = 64                  # Kapasitas FIFO yang tidak dipakai window rekomendasi
+
+# Pola kirim di script yang ada: (nama, pola, chunk, sleep detik / window byte)
+POLA_SKRIP = [
+    ('FPGAProcessing bergantian', 'chunk_sleep', 4096, 0.004),
+    ('freqsendder', 'chunk_sleep', 2048, 0.002),
+    ('serial_stream full-duplex', 'window', CHUNK_SIZE, WINDOW_SIZE),
+    ('lockstep 100 B (new.py)', 'lockstep', 100, 0),
+    ('lockstep 32 B (Audiotest)', 'lockstep', 32, 0),
+]
+KANDIDAT_WINDOW = [64, 128, 192, 256, 320, 384, 448, 480, 512, 576, 768]
+KANDIDAT_CHUNK  = [32, 64, 128, 256, 512, 1024, 2048, 4096]
+
+
+def _schedule(t_ready, t_start, period):
+    """t[i] = max(t[i-1] + period, t_ready[i]), t[-1] + period = t_start (sama dengan virtual_fpga)."""
+    k = np.arange(len(t_ready), dtype=np.int64) * period
+    return k + np.maximum(t_start, np.maximum.accumulate(t_ready - k))
+
+
+class ThroughputModel:
+    """Model event per byte; semua waktu internal dalam clock (int64)."""
+
+    def __init__(self, baud_rate=BAUD_RATE, clk_freq=CLK_FREQ, fifo_depth=FIFO_DEPTH,
+                 wire_buffer=WIRE_BUFFER, host_latency=HOST_LATENCY):
+        self.baud_rate = baud_rate
+        self.clk_freq = clk_freq
+        self.depth = fifo_depth
+        self.wire_buffer = wire_buffer
+        self.clks_per_bit = int(round(clk_freq / baud_rate))
+        self.t_byte = BITS_PER_BYTE * self.clks_per_bit
+        self.t_tx = self.t_byte + TX_EXTRA_CLKS
+        self.latency = self.clocks(host_latency)
+        self.stall = self.clocks(STALL_TIMEOUT)
+
+    def clocks(self, seconds):
+        return int(round(seconds * self.clk_freq))
+
+    def simulate(self, n_bytes, pattern='window', chunk=CHUNK_SIZE, sleep=0.0, window=WINDOW_SIZE):
+        """
+        Simulasikan pengiriman n_bytes dengan pola host tertentu.
+        Mengembalikan dict statistik (drop, okupansi maks. FIFO, throughput)
+        plus trace okupansi FIFO RX/TX per byte untuk plot.
+        """
+        if pattern == 'lockstep':
+            return self._lockstep(int(n_bytes), int(chunk))
+        if pattern not in ('chunk_sleep', 'window'):
+            raise ValueError(f"Pola tidak dikenal: {pattern}")
+        n = int(n_bytes)
+        block = min(self.depth, window) if pattern == 'window' else min(self.depth, self.wire_buffer)
+        sleep_clk = self.clocks(sleep)
+
+        a = np.zeros(n, dtype=np.int64)          # Host menyerahkan byte ke USB-UART
+        r = np.zeros(n, dtype=np.int64)          # o_Rx_DV uart_rx
+        h = np.zeros(n, dtype=np.int64)          # Balasan terlihat host (atau kredit dikembalikan)
+        keep = np.ones(n, dtype=bool)
+        c = np.zeros(n, dtype=np.int64)          # Kontroler membaca FIFO RX (per byte yang disimpan)
+        s = np.zeros(n, dtype=np.int64)          # uart_tx mulai mengirim
+        rx_occ = np.zeros(n, dtype=np.int32)
+        tx_occ = np.zeros(n, dtype=np.int32)
+        t_chunk = np.zeros(-(-n // chunk), dtype=np.int64) if pattern == 'chunk_sleep' else None
+        n_chunk = 0
+        wire_free = c_next = s_next = 0
+        K = 0
+
+        for i0 in range(0, n, block):
+            i1 = min(n, i0 + block)
+
+            # 1. Waktu host menulis tiap byte
+            if pattern == 'chunk_sleep':
+                while n_chunk * chunk < i1:
+                    if n_chunk == 0:
+                        t = 0
+                    else:
+                        # write() kembali saat byte terakhir chunk sebelumnya masuk buffer USB-UART
+                        t = t_chunk[n_chunk - 1]
+                        last = n_chunk * chunk - 1 - self.wire_buffer
+                        if last >= 0:
+                            t = max(t, int(r[last]) - self.t_byte)
+                        t += sleep_clk
+                    t_chunk[n_chunk] = t
+                    n_chunk += 1
+                a[i0:i1] = t_chunk[np.arange(i0, i1) // chunk]
+            else:
+                prev = a[i0 - 1] if i0 else 0
+                ready = np.zeros(i1 - i0, dtype=np.int64)
+                back = np.arange(i0, i1) - window
+                ok = back >= 0
+                ready[ok] = h[back[ok]]
+                a[i0:i1] = np.maximum.accumulate(np.maximum(ready, prev))
+
+            # 2. Kabel + uart_rx
+            start = _schedule(a[i0:i1], wire_free, self.t_byte)
+            r[i0:i1] = start + self.t_byte
+            wire_free = r[i1 - 1]
+
+            # 3. Kontroler dengan backpressure FIFO TX; byte yang datang saat FIFO RX penuh dibuang
+            r_blk = r[i0:i1]
+            blk_keep = np.ones(i1 - i0, dtype=bool)
+            while True:
+                idx = np.nonzero(blk_keep)[0]
+                rr = r_blk[idx]
+                j = K + np.arange(len(idx))
+                ready = rr + 1
+                back = j - self.depth
+                ok = back >= 0
+                ready[ok] = np.maximum(ready[ok], s[back[ok]] + 1)
+                cc = _schedule(ready, c_next, CTRL_CLKS)
+                c[K:K + len(idx)] = cc
+                occ = j - np.searchsorted(c[:K + len(idx)], rr, side='left')
+                full = np.nonzero(occ >= self.depth)[0]
+                if len(full) == 0:
+                    break
+                blk_keep[idx[full[0]]] = False
+            L = len(idx)
+            keep[i0:i1] = blk_keep
+            rx_occ[K:K + L] = occ + 1
+            if L:
+                c_next = cc[-1] + CTRL_CLKS
+
+                # 4. uart_tx: rd_en + tx_dv setelah count FIFO TX naik
+                ss = _schedule(cc + CTRL_CLKS + 1, s_next, self.t_tx)
+                s[K:K + L] = ss
+                s_next = ss[-1] + self.t_tx
+                tx_occ[K:K + L] = j + 1 - np.searchsorted(s[:K + L], cc + CTRL_CLKS, side='left')
+                h[i0 + idx] = ss + 1 + self.t_byte + self.latency
+            # Byte yang hilang: serial_stream mengembalikan kreditnya setelah STALL_TIMEOUT
+            lost = np.nonzero(~blk_keep)[0]
+            h[i0 + lost] = r_blk[lost] + self.stall
+            K += L
+
+        return self._hasil(n, a, r, keep, c[:K], s[:K], rx_occ[:K], tx_occ[:K])
+
+    def _lockstep(self, n, chunk):
+        """Tiap chunk mulai saat FIFO sudah kosong lagi, jadi semua chunk identik: cukup simulasi satu."""
+        one = self.simulate(min(chunk, n), 'chunk_sleep', chunk=chunk)
+        n_chunks = -(-n // chunk)
+        period = one['duration'] + self.latency / self.clk_freq
+        one.update({
+            'bytes_in': n, 'bytes_out': one['bytes_out'] * n_chunks,
+            'dropped': one['dropped'] * n_chunks, 'duration': period * n_chunks,
+        })
+        one['throughput'] = one['bytes_out'] / one['duration']
+        one['efficiency'] = one['throughput'] / line_rate(self.baud_rate)
+        return one
+
+    def _hasil(self, n, a, r, keep, c, s, rx_occ, tx_occ):
+        K = len(c)
+        drops = np.nonzero(~keep)[0]
+        t_end = (s[-1] + 1 + self.t_byte) if K else r[-1]
+        duration = max(1, t_end - a[0]) / self.clk_freq
+        return {
+            'bytes_in': n,
+            'bytes_out': K,
+            'dropped': len(drops),
+            'first_drop': int(drops[0]) if len(drops) else None,
+            'first_drop_time': r[drops[0]] / self.clk_freq if len(drops) else None,
+            'rx_max': int(rx_occ.max()) if K else 0,
+            'tx_max': int(tx_occ.max()) if K else 0,
+            'duration': duration,
+            'throughput': K / duration,
+            'efficiency': K / duration / line_rate(self.baud_rate),
+            # Trace: okupansi FIFO RX saat byte ditulis, FIFO TX saat kontroler menulis
+            't_rx': r[keep] / self.clk_freq,
+            'rx_occupancy': rx_occ,
+            't_ctrl': c / self.clk_freq,
+            'tx_occupancy': tx_occ,
+        }
+
+    # --- Rekomendasi ---
+    def min_sleep(self, chunk):
+        """Sleep minimum antar chunk agar rata-rata input <= kecepatan uart_tx (detik)."""
+        return chunk * self.t_tx / self.clk_freq * (1 + SLEEP_MARGIN)
+
+    def overflow_bytes(self):
+        """Panjang burst kontinu (byte) sebelum FIFO RX + TX penuh karena TX lebih lambat."""
+        return int(2 * self.depth * self.t_tx / (self.t_tx - self.t_byte))
+
+    def rekomendasi(self, seconds=SIM_SECONDS):
+        """Window terbaik (tanpa drop, throughput tertinggi) dan sleep minimum per ukuran chunk."""
+        n = int(seconds * line_rate(self.baud_rate))
+        windows = []
+        for w in KANDIDAT_WINDOW:
+            res = self.simulate(n, 'window', window=w)
+            windows.append((w, res))
+        safe = [(w, res) for w, res in windows if res['dropped'] == 0]
+        min_window = best = None
+        if safe:
+            top = max(res['throughput'] for _, res in safe)
+            full = [w for w, res in safe if res['throughput'] >= 0.99 * top]
+            # Terkecil = cukup untuk menutup latensi USB; terbaik = terbesar yang masih
+            # menyisakan FIFO_MARGIN byte kapasitas FIFO untuk jitter host
+            min_window = min(full)
+            fits = [w for w in full if w <= 2 * self.depth - FIFO_MARGIN]
+            best = max(fits) if fits else min_window
+        chunks = []
+        for ch in KANDIDAT_CHUNK:
+            sl = self.min_sleep(ch)
+            res = self.simulate(n, 'chunk_sleep', chunk=ch, sleep=sl)
+            chunks.append((ch, sl, res))
+        return {'windows': windows, 'min_window': min_window, 'best_window': best, 'chunks': chunks}
+
+
+def print_hasil(nama, res):
+    drop = (f"{res['dropped']} drop (pertama byte ke-{res['first_drop']} @ {res['first_drop_time']*1e3:.1f} ms)"
+            if res['dropped'] else "tanpa drop")
+    print(f"{nama:<28} {res['throughput']/1000:7.1f} kB/s ({res['efficiency']*100:5.1f}%)  "
+          f"FIFO RX maks {res['rx_max']:>3}, TX maks {res['tx_max']:>3}  {drop}")
+
+
+def plot_okupansi(model, res, judul):
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(10, 4))
+    plt.plot(res['t_rx'] * 1e3, res['rx_occupancy'], label='FIFO RX')
+    plt.plot(res['t_ctrl'] * 1e3, res['tx_occupancy'], label='FIFO TX')
+    plt.axhline(model.depth, color='r', linestyle='--', label='Penuh')
+    plt.xlabel('Waktu (ms)')
+    plt.ylabel('Okupansi (byte)')
+    plt.title(judul)
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model throughput FIFO/UART uart_fm_system")
+    parser.add_argument('--baud', type=int, default=BAUD_RATE)
+    parser.add_argument('--seconds', type=float, default=SIM_SECONDS, help="Lama trafik yang disimulasikan")
+    parser.add_argument('--pattern', choices=['chunk_sleep', 'lockstep', 'window'],
+                        help="Simulasikan satu pola saja")
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--sleep', type=float, default=0.0, help="Sleep antar chunk (detik)")
+    parser.add_argument('--window', type=int, default=WINDOW_SIZE)
+    parser.add_argument('--plot', action='store_true', help="Plot okupansi FIFO (dengan --pattern)")
+    args = parser.parse_args()
+
+    model = ThroughputModel(args.baud)
+    n = int(args.seconds * line_rate(args.baud))
+    print(f"{args.baud} baud, CLKS_PER_BIT = {model.clks_per_bit}: RX {model.t_byte} clock/byte, "
+          f"TX {model.t_tx} clock/byte, {n} byte disimulasikan")
+    print(f"Burst kontinu maks. sebelum overflow: ~{model.overflow_bytes()} byte")
+
+    if args.pattern:
+        res = model.simulate(n, args.pattern, chunk=args.chunk, sleep=args.sleep, window=args.window)
+        print_hasil(args.pattern, res)
+        if args.plot:
+            plot_okupansi(model, res, f"{args.pattern} @ {args.baud} baud")
+        return 0 if res['dropped'] == 0 else 1
+
+    print("\nPola kirim script yang ada:")
+    for nama, pattern, chunk, param in POLA_SKRIP:
+        if pattern == 'window':
+            res = model.simulate(n, pattern, chunk=chunk, window=param)
+        else:
+            res = model.simulate(n, pattern, chunk=chunk, sleep=param)
+        print_hasil(nama, res)
+
+    rek = model.rekomendasi(args.seconds)
+    print("\nFull-duplex (serial_stream), per window:")
+    for w, res in rek['windows']:
+        print_hasil(f"window {w}", res)
+    print("\nchunk + sleep minimum (tanpa drop):")
+    for ch, sl, res in rek['chunks']:
+        print_hasil(f"chunk {ch}, sleep {sl*1e3:.2f} ms", res)
+    if rek['best_window']:
+        print(f"\nRekomendasi: WINDOW_SIZE = {rek['best_window']} (full-duplex, minimal "
+              f"{rek['min_window']} untuk kecepatan penuh), atau chunk N byte dengan "
+              f"sleep >= N x {model.t_tx / model.clk_freq * 1e6:.2f} us")
+    else:
+        print("\nTidak ada window tanpa drop di antara kandidat.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import os
+import sys
+import tty
+import time
+import select
+import bisect
+import threading
+from collections import deque
+
+import numpy as np
+
+# Pengganti board FPGA di Linux: membuka pseudo-terminal (pty) dan
+# berperilaku seperti uart_fm_system.vhd (atau uart_loopback_top.vhd).
+# Script host cukup mengganti SERIAL_PORT ke path pty yang dicetak.
+#
+# Model timing (per byte, bukan per clock):
+#   - uart_rx  : 1 byte tiap 10 x CLKS_PER_BIT clock (start + 8 data + stop)
+#   - FIFO RX + FIFO TX : 256 + 256 byte, byte baru DIBUANG jika penuh (fifo.vhd)
+#   - Kontroler IDLE -> PROCESS_SAMPLE -> WRITE_OUTPUT : 3 clock
+#   - uart_tx  : 10 x CLKS_PER_BIT + 2 clock per byte (CLEANUP + handshake tx_dv),
+#                jadi TX sedikit lebih lambat dari RX saat streaming kontinu.
+#   - uart_fm_system meng-assert fifo_tx_rd_en dan tx_dv di clock yang sama,
+#     sehingga uart_tx mengunci o_Rd_Data LAMA: byte keluar tertunda satu
+#     sampel dan byte pertama adalah isi awal register (0x00).
+#   - 'framed': protokol framed_transport.py di atas demodulator yang sama.
+#     Frame dengan CRC salah (mis. karena byte dibuang FIFO) diabaikan,
+#     balasan dikirim setelah byte terakhir frame diterima.
+
+# === KONFIGURASI ===
+BAUD_RATE   = 2000000
+CLK_FREQ    = 50000000
+PERSONALITY = 'demod'              # 'demod' (uart_fm_system), 'loopback' atau 'framed'
+FIFO_DEPTH  = 256
+WIRE_BUFFER = 4096                 # Buffer chip USB-UART (byte yang belum terkirim ke FPGA)
+LINK_PATH   = '/tmp/ttyFPGA'       # Symlink ke pty agar nama port tetap
+
+# Parameter per personality: (jumlah FIFO, latensi kontroler, clock ekstra TX, byte basi)
+PERSONALITIES = {
+    'demod':    (2, 3, 2, True),   # uart_fm_system.vhd
+    'loopback': (1, 2, 3, False),  # uart_loopback_top.vhd
+    'framed':   (2, 3, 2, False),  # uart_fm_system + decoder frame
+}
+
+
+class VirtualFPGA:
+    """
+    Perangkat virtual di atas pty. Panggil start() lalu buka self.port
+    dengan pyserial seperti port FPGA biasa, stop() untuk menutup.
+    """
+
+    def __init__(self, baud_rate=BAUD_RATE, personality=PERSONALITY, fifo_depth=FIFO_DEPTH,
+                 clk_freq=CLK_FREQ, link_path=None, **model_params):
+        if personality not in PERSONALITIES:
+            raise ValueError(f"Personality tidak dikenal: {personality}")
+        n_fifo, latency_clks, tx_extra_clks, stale_tx = PERSONALITIES[personality]
+
+        self.personality = personality
+        self.clks_per_bit = round(clk_freq / baud_rate)
+        self.t_rx = 10 * self.clks_per_bit / clk_freq
+        self.t_tx = (10 * self.clks_per_bit + tx_extra_clks) / clk_freq
+        self.t_line = 10 * self.clks_per_bit / clk_freq
+        self.latency = latency_clks / clk_freq
+        self.capacity = n_fifo * fifo_depth
+        self.stale_tx = stale_tx
+
+        self.model = None
+        if personality in ('demod', 'framed'):
+            from fm_golden_model import FMDemodulatorModel
+            self.model = FMDemodulatorModel(**model_params)
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.port = os.ttyname(self.slave_fd)
+        self.link_path = link_path
+        if link_path:
+            if os.path.islink(link_path):
+                os.remove(link_path)
+            os.symlink(self.port, link_path)
+
+        self.reset()
+        self._running = False
+        self._thread = None
+
+    def reset(self):
+        """Seperti menekan rst_n: semua FIFO, register, dan model kembali ke awal."""
+        self.wire_buf = bytearray()    # Byte dari host yang belum diterima uart_rx
+        self.wire_seg = deque()        # [waktu datang, jumlah byte] per potongan
+        self.rx_busy_until = 0.0
+        self.q_t = np.zeros(0)         # Waktu masuk FIFO tiap byte yang antri
+        self.q_out = np.zeros(0, dtype=np.uint8)   # Output (sudah diproses) tiap byte
+        self.tx_next = 0.0
+        self.tx_reg = 0
+        self.outbox = bytearray()
+        self.outbox_t = []             # Waktu byte output selesai di jalur TX
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.dropped = 0
+        self.decoder = None
+        if self.personality == 'framed':
+            from framed_transport import FrameDecoder
+            self.decoder = FrameDecoder()
+        if self.model is not None:
+            self.model.reset()
+
+    def _process(self, values):
+        if self.model is None:
+            return values
+        return self.model.process(values)
+
+    def _process_frames(self, t_in, values):
+        """Frame lengkap -> frame balasan; tiap byte balasan siap saat frame selesai diterima."""
+        from framed_transport import encode_frame
+        t_out, v_out = [], []
+        for seq, warmup, payload, end in self.decoder.feed(values.tobytes()):
+            out = self.model.process(np.frombuffer(payload, dtype=np.uint8))
+            reply = np.frombuffer(encode_frame(seq, out.tobytes(), warmup), dtype=np.uint8)
+            t_out.append(np.full(len(reply), t_in[end - 1]))
+            v_out.append(reply)
+        if not t_out:
+            return np.zeros(0), np.zeros(0, dtype=np.uint8)
+        return np.concatenate(t_out), np.concatenate(v_out)
+
+    @staticmethod
+    def _schedule(t_ready, t_start, period):
+        """t[i] = max(t[i-1] + period, t_ready[i]), t[-1] + period = t_start (rekursi max-plus)."""
+        k = np.arange(len(t_ready)) * period
+        return k + np.maximum(t_start, np.maximum.accumulate(t_ready - k))
+
+    def _advance(self, now):
+        """Jalankan event RX/TX sampai waktu 'now' (divektorisasi per batch)."""
+        while True:
+            # Waktu selesai uart_rx untuk byte di "kabel"
+            if len(self.wire_buf):
+                arrival = np.repeat([seg[0] for seg in self.wire_seg],
+                                    [seg[1] for seg in self.wire_seg])
+                t_rx = self._schedule(arrival, self.rx_busy_until, self.t_rx) + self.t_rx
+                m = int(np.searchsorted(t_rx, now, side='right'))
+            else:
+                t_rx, m = None, 0
+
+            # Diproses per jendela sebesar kapasitas FIFO agar cek overflow tetap murah
+            if m > self.capacity:
+                self._step(t_rx, self.capacity, t_rx[self.capacity - 1])
+            else:
+                self._step(t_rx, m, now)
+                return
+
+    def _step(self, t_rx, m, now):
+
+        if m:
+            t_new = t_rx[:m]
+            v_new = np.frombuffer(bytes(self.wire_buf[:m]), dtype=np.uint8)
+            self.rx_busy_until = t_new[-1]
+            self.bytes_in += m
+            del self.wire_buf[:m]
+            left = m
+            while left:
+                if self.wire_seg[0][1] <= left:
+                    left -= self.wire_seg.popleft()[1]
+                else:
+                    self.wire_seg[0][1] -= left
+                    left = 0
+
+            # 2. Byte yang datang saat FIFO penuh dibuang (hitung ulang setelah tiap drop)
+            keep = np.ones(m, dtype=bool)
+            while True:
+                idx = np.nonzero(keep)[0]
+                entries = np.concatenate((self.q_t, t_new[idx]))
+                t_tx = self._schedule(entries + self.latency, self.tx_next, self.t_tx)
+                occupancy = (len(self.q_t) + np.arange(len(idx))
+                             - np.searchsorted(t_tx, t_new[idx], side='left'))
+                full = np.nonzero(occupancy >= self.capacity)[0]
+                if len(full) == 0:
+                    break
+                keep[idx[full[0]]] = False
+                self.dropped += 1
+
+            if self.decoder is None:
+                self.q_t = entries
+                self.q_out = np.concatenate((self.q_out, self._process(v_new[keep])))
+            else:
+                # Framed: cek overflow tetap per byte input (pendekatan), antrian TX berisi balasan
+                t_out, v_out = self._process_frames(t_new[idx], v_new[keep])
+                self.q_t = np.concatenate((self.q_t, t_out))
+                self.q_out = np.concatenate((self.q_out, v_out))
+        elif len(self.q_t):
+            t_tx = self._schedule(self.q_t + self.latency, self.tx_next, self.t_tx)
+        else:
+            t_tx = np.zeros(0)
+
+        # 3. uart_tx mengirim byte yang jadwal mulainya sudah lewat
+        n_tx = int(np.searchsorted(t_tx, now, side='right'))
+        if n_tx:
+            values = self.q_out[:n_tx]
+            if self.stale_tx:
+                values = np.concatenate(([self.tx_reg], values))
+                self.tx_reg = int(values[-1])
+                values = values[:-1]
+            self.outbox.extend(values.astype(np.uint8).tobytes())
+            self.outbox_t.extend((t_tx[:n_tx] + self.t_line).tolist())
+            self.tx_next = t_tx[n_tx - 1] + self.t_tx
+            self.q_t = self.q_t[n_tx:]
+            self.q_out = self.q_out[n_tx:]
+
+    def _flush_outbox(self, now):
+        n = bisect.bisect_right(self.outbox_t, now)
+        if n == 0:
+            return
+        try:
+            written = os.write(self.master_fd, self.outbox[:n])
+        except (BlockingIOError, OSError):
+            return                              # Host belum membaca, coba lagi nanti
+        del self.outbox[:written]
+        del self.outbox_t[:written]
+        self.bytes_out += written
+
+    def poll(self, timeout=0.0005):
+        """Satu iterasi event loop (baca pty, simulasi, kirim balasan)."""
+        readable, _, _ = select.select([self.master_fd], [], [], timeout)
+        now = time.perf_counter()
+        if readable and len(self.wire_buf) < WIRE_BUFFER:
+            try:
+                data = os.read(self.master_fd, WIRE_BUFFER - len(self.wire_buf))
+            except (BlockingIOError, OSError):
+                data = b""
+            if data:
+                self.wire_buf.extend(data)
+                self.wire_seg.append([now, len(data)])
+        self._advance(now)
+        self._flush_outbox(now)
+
+    def _loop(self):
+        while self._running:
+            self.poll()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+        if self.link_path and os.path.islink(self.link_path):
+            os.remove(self.link_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def print_stats(self):
+        print(f"Byte masuk: {self.bytes_in}, keluar: {self.bytes_out}, "
+              f"dibuang (FIFO penuh): {self.dropped}")
+
+
+def main():
+    personality = sys.argv[1] if len(sys.argv) > 1 else PERSONALITY
+    dev = VirtualFPGA(personality=personality, link_path=LINK_PATH)
+    print(f"FPGA virtual ({personality}) @ {BAUD_RATE} baud, CLKS_PER_BIT = {dev.clks_per_bit}")
+    print(f"Port: {dev.port} (symlink: {LINK_PATH})")
+    print("Tekan Ctrl+C untuk berhenti.")
+    try:
+        dev._running = True
+        dev._loop()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dev.print_stats()
+        dev.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,115 @@
 import scipy.io.wavfile as wav
 import numpy as np
+import os
 
 # CONFIGURATION
 INPUT_WAV = 'fm_signal.wav'
 OUTPUT_TXT = 'simulation_input.txt'
+OUTPUT_FORMAT = 'hex'      # 'hex' (one "A5" per line), 'readmemh', 'bin' or 'split'
+SPLIT_PARTS = 4            # Number of files for 'split'
+SPLIT_OVERLAP = 0          # Extra leading samples per part (PLL warm-up), 'split' only
+BLOCK_SIZE = 1 << 20       # Samples encoded per write
+READMEMH_PER_LINE = 16     # Words per line for 'readmemh'
 
-def convert_wav_to_hex():
-    print(f"Reading {INPUT_WAV}...")
+# Lookup table: byte value -> b"XX\n" (3 ASCII bytes)
+HEX_TABLE = np.frombuffer(''.join(f"{i:02X}\n" for i in range(256)).encode(), dtype=np.uint8).reshape(256, 3)
+
+def sample_range(data):
+    """Global (min, max) used to normalize non-uint8 data (one vectorized pass over the memmap)."""
+    if data.dtype == np.uint8:
+        return None
+    return float(data.min()), float(data.max())
+
+def to_uint8_blocks(data, block_size=None, value_range=None):
+    """
+    Yield 8-bit unsigned blocks, normalizing non-uint8 data like the original
+    script. value_range = (min, max) of the whole file, so parts of a split
+    scale the same as the full file; None = taken from data itself.
+    """
+    block_size = block_size or BLOCK_SIZE
+    if data.dtype == np.uint8:
+        for i in range(0, len(data), block_size):
+            yield np.asarray(data[i:i+block_size])
+        return
+
+    lo, hi = value_range or sample_range(data)
+    for i in range(0, len(data), block_size):
+        block = data[i:i+block_size].astype(np.float64)
+        if hi > lo:
+            yield ((block - lo) / (hi - lo) * 255).astype(np.uint8)
+        else:
+            yield np.zeros(len(block), dtype=np.uint8)
+
+def encode_hex(block):
+    """Vectorized: uint8 samples -> b"XX\\nXX\\n..." in one buffer."""
+    return HEX_TABLE[block].tobytes()
+
+def encode_readmemh(block, per_line=None):
+    """Vectorized: uint8 samples -> "XX XX ... XX\\n" lines ($readmemh accepts any whitespace)."""
+    per_line = per_line or READMEMH_PER_LINE
+    text = HEX_TABLE[block].copy()
+    text[:, 2] = ord(' ')
+    text[per_line - 1::per_line, 2] = ord('\n')
+    text[-1, 2] = ord('\n')
+    return text.tobytes()
+
+def write_blocks(path, data, encoder, header=b"", value_range=None):
+    with open(path, 'wb') as f:
+        f.write(header)
+        for block in to_uint8_blocks(data, value_range=value_range):
+            f.write(encoder(block))
+
+def split_output_names(output, parts):
+    base, ext = os.path.splitext(output)
+    return [f"{base}_part{k}{ext}" for k in range(parts)]
+
+def convert_wav_to_hex(input_wav=None, output=None, fmt=None, parts=None):
+    input_wav = input_wav or INPUT_WAV
+    output = output or OUTPUT_TXT
+    fmt = fmt or OUTPUT_FORMAT
+    parts = parts or SPLIT_PARTS
+
+    print(f"Reading {input_wav}...")
     try:
-        fs, data = wav.read(INPUT_WAV)
-        
+        fs, data = wav.read(input_wav, mmap=True)
+
         # Ensure data is 8-bit unsigned (0-255)
         if data.dtype != np.uint8:
             print("Converting to 8-bit Unsigned...")
-            # Normalize to 0-255 if it isn't already
-            data = ((data - data.min()) / (data.max() - data.min()) * 255).astype(np.uint8)
-
-        print(f"Writing {len(data)} samples to {OUTPUT_TXT}...")
-        
-        with open(OUTPUT_TXT, 'w') as f:
-            for sample in data:
-                # Write as 2-digit Hex (e.g., "A5", "03", "FF")
-                f.write(f"{sample:02X}\n")
-                
-        print("Done! You can now load 'simulation_input.txt' into Questa.")
-        
+
+        print(f"Writing {len(data)} samples to {output} (format: {fmt})...")
+
+        if fmt == 'hex':
+            # Write as 2-digit Hex (e.g., "A5", "03", "FF"), one per line
+            write_blocks(output, data, encode_hex)
+
+        elif fmt == 'readmemh':
+            header = f"// {os.path.basename(input_wav)}: {len(data)} samples @ {fs} Hz\n@0\n".encode()
+            write_blocks(output, data, encode_readmemh, header)
+
+        elif fmt == 'bin':
+            # Raw bytes, one sample per byte (VHDL: file of character / read via textio)
+            write_blocks(output, data, lambda block: block.tobytes())
+
+        elif fmt == 'split':
+            # N consecutive hex files so long testbenches can run in parallel
+            bounds = np.linspace(0, len(data), parts + 1).astype(int)
+            value_range = sample_range(data)
+            for k, name in enumerate(split_output_names(output, parts)):
+                start = max(0, bounds[k] - SPLIT_OVERLAP)
+                write_blocks(name, data[start:bounds[k+1]], encode_hex, value_range=value_range)
+                print(f"  {name}: samples {start}..{bounds[k+1]-1}")
+            print("Done! Load each part into its own Questa run.")
+            return
+
+        else:
+            print(f"Error: unknown format '{fmt}'")
+            return
+
+        print(f"Done! You can now load '{output}' into Questa.")
+
     except Exception as e:
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    convert_wav_to_hex()
\ No newline at end of file
+    convert_wav_to_hex()
@@ -1,12 +1,39 @@
 import serial
 import time
 import random
+import os
+import sys
+import csv
+import json
+import numpy as np
+
+# Reuse the full-duplex engine from the main host scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Python Code'))
+from serial_stream import stream_full_duplex
 
 # CONFIGURATION
 # Windows uses 'COMx', Linux/Mac uses '/dev/ttyUSBx'
 SERIAL_PORT = 'COM7'  
 BAUD_RATE = 2000000
 
+# BENCHMARK CONFIGURATION (PRBS bulk test)
+BENCHMARK_MODE  = True            # False = old 1000 single-byte round trips
+CLK_FREQ        = 50000000        # FPGA clock, used to map baud -> c_CLKS_PER_BIT
+PRBS_ORDER      = 15              # 7 or 15
+BENCH_BYTES     = 1 << 20         # Bytes streamed per test point
+BLOCK_SIZES     = [32, 64, 128, 256, 512]
+BAUD_RATES      = [115200, 1000000, 2000000, 2500000, 3125000]
+FIFO_DEPTH      = 256             # Single FIFO in uart_loopback_top
+WINDOW          = FIFO_DEPTH - 32 # Max bytes in flight, same for every block size
+                                  # (blocks larger than this are written window-sized)
+SYNC_BYTES      = 8               # Mismatch run that means a dropped byte, not a bit error
+MAX_RESYNC      = 4096            # Furthest the compare looks ahead after a drop
+RESULTS_CSV     = 'baudtest_results.csv'
+RESULTS_JSON    = 'baudtest_results.json'
+
+# Feedback taps for x^7 + x^6 + 1 and x^15 + x^14 + 1
+PRBS_TAPS = {7: (7, 6), 15: (15, 14)}
+
 def test_uart_loopback():
     try:
         # Initialize Serial Connection
@@ -65,5 +92,147 @@ def test_uart_loopback():
     except Exception as e:
         print(f"An error occurred: {e}")
 
+def prbs_bytes(order, n_bytes):
+    """Generate n_bytes of a PRBS-7/PRBS-15 bit stream (LSB first, like the UART)."""
+    a, b = PRBS_TAPS[order]
+    period = (1 << order) - 1
+    state = (1 << order) - 1
+    bits = np.empty(period, dtype=np.uint8)
+    for i in range(period):
+        new_bit = ((state >> (a - 1)) ^ (state >> (b - 1))) & 1
+        bits[i] = new_bit
+        state = ((state << 1) | new_bit) & period
+
+    # One byte-aligned repetition is lcm(period, 8) bits = 'period' bytes
+    one_cycle = np.packbits(np.tile(bits, 8), bitorder='little')
+    reps = -(-n_bytes // len(one_cycle))
+    return np.tile(one_cycle, reps)[:n_bytes]
+
+def count_bit_errors(tx, rx):
+    """
+    Compare rx against tx, re-aligning after dropped bytes so a drop does not
+    turn every later byte into bit errors. The loopback only ever loses bytes,
+    so the tx offset only moves forward: a run of SYNC_BYTES mismatches marks
+    a drop, and the compare resumes where the next SYNC_BYTES received bytes
+    are found in tx. Drops are reported separately, BER only counts bits of
+    bytes that arrived. Returns (bit_errors, compared_bytes, lost_bytes, drop_events).
+    """
+    bit_errors = compared = drops = 0
+    i = j = 0                                   # tx / rx position
+    while j < len(rx) and i < len(tx):
+        n = min(len(rx) - j, len(tx) - i, 65536)
+        diff = np.bitwise_xor(tx[i:i + n], rx[j:j + n])
+        bad = (diff != 0).astype(np.int32)
+        runs = np.convolve(bad, np.ones(SYNC_BYTES, dtype=np.int32), mode='valid')
+        hit = np.flatnonzero(runs == SYNC_BYTES)
+        # Keep a run that straddles the segment end for the next segment
+        last = i + n == len(tx) or j + n == len(rx)
+        limit = n if last else n - SYNC_BYTES + 1
+        k = int(hit[0]) if len(hit) and hit[0] < limit else limit
+        bit_errors += int(np.unpackbits(diff[:k]).sum())
+        compared += k
+        i += k
+        j += k
+        if k == limit:
+            continue
+        # Sync lost at rx[j]: find the received bytes further ahead in tx
+        needle = rx[j:j + SYNC_BYTES]
+        hay = tx[i + 1:i + 1 + MAX_RESYNC + SYNC_BYTES]
+        found = np.array([], dtype=np.intp)
+        if len(needle) == SYNC_BYTES and len(hay) >= SYNC_BYTES:
+            windows = np.lib.stride_tricks.sliding_window_view(hay, SYNC_BYTES)
+            found = np.flatnonzero((windows == needle).all(axis=1))
+        if len(found):
+            skip = int(found[0]) + 1            # Dropped bytes
+            # The drop happened before the run if the last compared bytes already
+            # fit the new alignment: those mismatches were not bit errors
+            b = min(j, i, 64)
+            fits = rx[j - b:j] == tx[i - b + skip:i + skip]
+            t = b - int(np.flatnonzero(~fits)[-1]) - 1 if not fits.all() else b
+            if t:
+                bit_errors -= int(np.unpackbits(np.bitwise_xor(tx[i - t:i], rx[j - t:j])).sum())
+            i += skip
+            drops += 1
+        else:
+            # No match ahead: a burst of real errors, count this byte and move on
+            bit_errors += int(np.unpackbits(np.bitwise_xor(tx[i:i + 1], rx[j:j + 1])).sum())
+            compared += 1
+            i += 1
+            j += 1
+    return bit_errors, compared, len(tx) - len(rx), drops
+
+def run_prbs_block_test(ser, pattern, block_size):
+    """Stream the whole pattern in pipelined blocks and measure BER and throughput."""
+    ser.reset_input_buffer()
+    ser.reset_output_buffer()
+
+    rx_data, stats = stream_full_duplex(ser, pattern.tobytes(),
+                                        window=WINDOW,
+                                        chunk_size=block_size,
+                                        show_progress=False)
+    rx = np.frombuffer(rx_data, dtype=np.uint8)
+    bit_errors, compared, lost, drops = count_bit_errors(pattern, rx)
+
+    return {
+        'baud_rate': ser.baudrate,
+        'clks_per_bit': round(CLK_FREQ / ser.baudrate),
+        'block_size': block_size,
+        'bytes_sent': len(pattern),
+        'bytes_received': len(rx),
+        'lost_bytes': lost,
+        'drop_events': drops,
+        'bit_errors': bit_errors,
+        'ber': bit_errors / (compared * 8) if compared else 1.0,
+        'seconds': round(stats['elapsed'], 4),
+        'bytes_per_sec': round(stats['bytes_per_sec'], 1),
+        'efficiency': round(stats['efficiency'], 4),
+    }
+
+def save_results(results):
+    with open(RESULTS_CSV, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+    with open(RESULTS_JSON, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {RESULTS_CSV} and {RESULTS_JSON}")
+
+def benchmark_uart_loopback():
+    print(f"Generating PRBS-{PRBS_ORDER} pattern ({BENCH_BYTES} bytes)...")
+    pattern = prbs_bytes(PRBS_ORDER, BENCH_BYTES)
+    results = []
+
+    print(f"{'Baud':>9} {'CPB':>4} {'Block':>6} {'Lost':>7} {'Drops':>6} {'BitErr':>8} {'BER':>10} {'kB/s':>8} {'Eff':>6}")
+    for baud in BAUD_RATES:
+        try:
+            ser = serial.Serial(port=SERIAL_PORT, baudrate=baud, timeout=1,
+                                stopbits=serial.STOPBITS_ONE,
+                                bytesize=serial.EIGHTBITS,
+                                parity=serial.PARITY_NONE)
+        except serial.SerialException as e:
+            print(f"Error opening serial port at {baud} baud: {e}")
+            continue
+
+        for block_size in BLOCK_SIZES:
+            try:
+                r = run_prbs_block_test(ser, pattern, block_size)
+            except Exception as e:
+                print(f"{baud:>9} block {block_size}: error {e}")
+                continue
+            results.append(r)
+            print(f"{r['baud_rate']:>9} {r['clks_per_bit']:>4} {r['block_size']:>6} "
+                  f"{r['lost_bytes']:>7} {r['drop_events']:>6} {r['bit_errors']:>8} {r['ber']:>10.2e} "
+                  f"{r['bytes_per_sec']/1000:>8.1f} {r['efficiency']*100:>5.1f}%")
+        ser.close()
+
+    if results:
+        save_results(results)
+
+def main():
+    if BENCHMARK_MODE:
+        benchmark_uart_loopback()
+    else:
+        test_uart_loopback()
+
 if __name__ == "__main__":
-    test_uart_loopback()
\ No newline at end of file
+    main()
\ No newline at end of file
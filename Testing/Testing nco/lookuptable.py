@@ -1,16 +1,265 @@
-import math
+import os
+import argparse
+
+import numpy as np
+
+# NCO sine table generator.
+# Writes the table as a VHDL package (drop-in for sine_lookup_table in
+# nco.vhd) and as a .npy that fm_golden_model.nco_lut / DDSModulator load,
+# so the Python models always run on the exact table that gets synthesized.
+#
+# Modes:
+#   full    : DEPTH entries x WIDTH bits, (sin + 1) * (2^WIDTH - 1) / 2,
+#             same table as the one pasted into nco.vhd.
+#   quarter : DEPTH/4 entries x (WIDTH-1) bits. The table is sampled at
+#             half-step phase ((i + 0.5) / DEPTH) so both symmetries are
+#             plain bit inversions:
+#               addr(MSB-1) = '1' -> mirror: read entry NOT(low address bits)
+#               addr(MSB)   = '1' -> sign  : output = NOT('1' & entry)
+#             (offset binary, 2^WIDTH - 1 - v = NOT v). Costs a fixed
+#             pi/DEPTH phase offset, which the PLL absorbs.
+# Phase dithering adds the low DITHER_BITS of a 16-bit LFSR to phase_acc
+# just below the table address (up to one address step) before it is
+# truncated, turning truncation spurs into a noise floor. The package
+# contains the LFSR step function; the spur check below uses the same
+# sequence (the Python models load the table only, without dither).
+#
+# Every table is checked in software before writing: the NCO is run with
+# TEST_WORD and the spur-free dynamic range (SFDR) is printed next to the
+# ROM size, so depth/width/mode can be traded before synthesis.
 
 # Settings
-depth = 256       # How many lines in your table (2^8)
-width = 8         # Width of output data (8-bit audio)
-
-for i in range(depth):
-    # Calculate 0 to 2*PI
-    angle = (i / depth) * 2 * math.pi
-    
-    # Calculate Sine (-1 to +1) -> Scale to (0 to 255)
-    val = (math.sin(angle) + 1) * (2**width - 1) / 2
-    
-    # Print as Hex
-    print(f'x"{int(round(val)):02X}",', end=" ")
-    if (i + 1) % 8 == 0: print("") # Newline every 8 values
\ No newline at end of file
+DEPTH       = 256          # Table entries over one full period (2^n)
+WIDTH       = 8            # Output width (8-bit samples)
+QUARTER     = False        # Quarter-wave ROM + sign/mirror logic
+DITHER_BITS = 0            # LFSR bits added below the table address (0 = off)
+PHASE_BITS  = 32           # phase_acc width in nco.vhd
+LFSR_SEED   = 0xACE1       # LFSR reset value
+TEST_WORD   = 42949673     # ~1 MHz at 100 MHz, same word as tb_nco.vhd
+TEST_POINTS = 1 << 16      # NCO samples for the SFDR check
+
+HERE        = os.path.dirname(os.path.abspath(__file__))
+VHDL_FILE   = os.path.join(HERE, 'nco_lut_pkg.vhd')
+NPY_FILE    = os.path.normpath(os.path.join(HERE, '..', '..', 'Python Code', 'nco_lut.npy'))
+NPY_WIDTHS  = range(8, 17)     # Widths the Python models can run (fm_golden_model.nco_lut)
+
+
+def addr_bits(depth):
+    bits = int(depth).bit_length() - 1
+    if depth < 8 or (1 << bits) != depth:
+        raise ValueError(f"depth must be a power of two >= 8, got {depth}")
+    return bits
+
+
+def full_table(depth=DEPTH, width=WIDTH):
+    """Full-period table, identical to the original hex printout."""
+    i = np.arange(depth)
+    val = (np.sin(i / depth * 2 * np.pi) + 1) * (2**width - 1) / 2
+    return np.round(val).astype(np.int64)
+
+
+def quarter_rom(depth=DEPTH, width=WIDTH):
+    """First quarter at half-step phase, stored without the top (sign) bit."""
+    i = np.arange(depth // 4)
+    val = (np.sin((i + 0.5) / depth * 2 * np.pi) + 1) * (2**width - 1) / 2
+    return np.round(val).astype(np.int64) - 2**(width - 1)
+
+
+def expand_quarter(rom, width=WIDTH):
+    """Full table as seen at the NCO output, built with the same bit logic as the VHDL."""
+    q = len(rom)
+    k = np.arange(4 * q)
+    low = k & (q - 1)
+    entry = rom[np.where(k & q, (q - 1) - low, low)]
+    val = entry | 2**(width - 1)
+    return np.where(k & (2 * q), (2**width - 1) ^ val, val)
+
+
+def build(depth=DEPTH, width=WIDTH, quarter=QUARTER):
+    """(rom stored in the FPGA, full table for the models)."""
+    addr_bits(depth)
+    if not quarter:
+        table = full_table(depth, width)
+        return table, table
+    rom = quarter_rom(depth, width)
+    return rom, expand_quarter(rom, width)
+
+
+def lfsr_sequence(seed=LFSR_SEED):
+    """One period (65535 states) of x^16 + x^14 + x^13 + x^11 + 1, starting at seed."""
+    seq = np.empty(65535, dtype=np.int64)
+    s = seed
+    for n in range(len(seq)):
+        seq[n] = s
+        bit = ((s >> 15) ^ (s >> 13) ^ (s >> 12) ^ (s >> 10)) & 1
+        s = ((s << 1) & 0xFFFF) | bit
+    return seq
+
+
+def nco_output(table, word=TEST_WORD, n=TEST_POINTS, dither_bits=DITHER_BITS):
+    """sine_out of nco.vhd for a constant phase_in (phase_acc starts at 0)."""
+    mask = (1 << PHASE_BITS) - 1
+    acc = (np.arange(n, dtype=np.uint64) * np.uint64(word)) & np.uint64(mask)
+    if dither_bits:
+        seq = lfsr_sequence()
+        shift = PHASE_BITS - addr_bits(len(table)) - dither_bits
+        dither = (seq[np.arange(n) % len(seq)] & ((1 << dither_bits) - 1)) << shift
+        acc = (acc + dither.astype(np.uint64)) & np.uint64(mask)
+    return table[acc >> np.uint64(PHASE_BITS - addr_bits(len(table)))]
+
+
+def sfdr(samples):
+    """(SFDR dBc, SINAD dB) from a Blackman-Harris windowed FFT."""
+    from scipy.signal import get_window
+    x = samples - np.mean(samples)
+    spec = np.abs(np.fft.rfft(x * get_window('blackmanharris', len(x)))) ** 2
+    spec[:5] = 0.0
+    k = int(np.argmax(spec))
+    lobe = slice(max(0, k - 6), k + 7)
+    carrier = spec[lobe].sum()
+    rest = spec.copy()
+    rest[lobe] = 0.0
+    return (float(10 * np.log10(spec[k] / rest.max())),
+            float(10 * np.log10(carrier / rest.sum())))
+
+
+def rom_bits(depth=DEPTH, width=WIDTH, quarter=QUARTER):
+    return depth // 4 * (width - 1) if quarter else depth * width
+
+
+def _literal(v, bits):
+    if bits % 4 == 0:
+        return f'x"{v:0{bits // 4}X}"'
+    return '"' + format(v, f'0{bits}b') + '"'
+
+
+def vhdl_package(rom, depth=DEPTH, width=WIDTH, quarter=QUARTER, dither_bits=DITHER_BITS,
+                 name='nco_lut_pkg'):
+    rom_width = width - 1 if quarter else width
+    lines = [_literal(int(v), rom_width) for v in rom]
+    rows = [", ".join(lines[i:i + 8]) for i in range(0, len(lines), 8)]
+    table = ",\n        ".join(rows)
+    mode = 'quarter-wave' if quarter else 'full'
+
+    if quarter:
+        lookup = f"""        variable k : unsigned(LUT_ADDR_BITS-3 downto 0);
+        variable v : std_logic_vector(LUT_WIDTH-1 downto 0);
+    begin
+        k := addr(LUT_ADDR_BITS-3 downto 0);
+        if addr(LUT_ADDR_BITS-2) = '1' then
+            k := not k;                                -- Mirror (2nd/4th quarter)
+        end if;
+        v := '1' & SINE_ROM(to_integer(k));
+        if addr(LUT_ADDR_BITS-1) = '1' then
+            v := not v;                                -- Sign (2nd half)
+        end if;
+        return v;"""
+    else:
+        lookup = """    begin
+        return SINE_ROM(to_integer(addr));"""
+
+    return f"""-- Generated by Testing nco/lookuptable.py, do not edit by hand.
+-- {depth} x {width} bit sine, {mode} ROM ({len(rom)} x {rom_width} bit), dither {dither_bits} bit.
+--
+-- Use in nco.vhd:
+--   sine_out <= nco_lookup(phase_acc(31 downto 32-LUT_ADDR_BITS));
+-- With DITHER_BITS > 0 keep an LFSR register (reset to LFSR_SEED,
+-- lfsr <= lfsr_next(lfsr) on every enable) and look up
+--   dithered := phase_acc + shift_left(resize(unsigned(lfsr(DITHER_BITS-1 downto 0)), 32),
+--                                      32-LUT_ADDR_BITS-DITHER_BITS);
+--   sine_out <= nco_lookup(dithered(31 downto 32-LUT_ADDR_BITS));
+library IEEE;
+use IEEE.STD_LOGIC_1164.ALL;
+use IEEE.NUMERIC_STD.ALL;
+
+package {name} is
+
+    constant LUT_DEPTH     : integer := {depth};
+    constant LUT_ADDR_BITS : integer := {addr_bits(depth)};
+    constant LUT_WIDTH     : integer := {width};
+    constant DITHER_BITS   : integer := {dither_bits};
+    constant LFSR_SEED     : std_logic_vector(15 downto 0) := x"{LFSR_SEED:04X}";
+
+    type sine_rom_t is array (0 to {len(rom) - 1}) of std_logic_vector({rom_width - 1} downto 0);
+
+    constant SINE_ROM : sine_rom_t := (
+        {table}
+    );
+
+    function nco_lookup(addr : unsigned(LUT_ADDR_BITS-1 downto 0)) return std_logic_vector;
+    function lfsr_next(s : std_logic_vector(15 downto 0)) return std_logic_vector;
+
+end package {name};
+
+package body {name} is
+
+    function nco_lookup(addr : unsigned(LUT_ADDR_BITS-1 downto 0)) return std_logic_vector is
+{lookup}
+    end function;
+
+    -- x^16 + x^14 + x^13 + x^11 + 1 (maximal length, period 65535)
+    function lfsr_next(s : std_logic_vector(15 downto 0)) return std_logic_vector is
+    begin
+        return s(14 downto 0) & (s(15) xor s(13) xor s(12) xor s(10));
+    end function;
+
+end package body {name};
+"""
+
+
+def print_hex(table, width=WIDTH):
+    """The old behaviour: table as hex literals, 8 per line, for pasting into nco.vhd."""
+    for i, v in enumerate(table):
+        print(_literal(int(v), width) + ",", end=" ")
+        if (i + 1) % 8 == 0:
+            print("")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the NCO sine table (VHDL package + .npy)")
+    parser.add_argument('--depth', type=int, default=DEPTH)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--quarter', action='store_true', default=QUARTER)
+    parser.add_argument('--dither', type=int, default=DITHER_BITS, help="LFSR dither bits (0-16)")
+    parser.add_argument('--vhdl', default=VHDL_FILE)
+    parser.add_argument('--npy', default=NPY_FILE)
+    parser.add_argument('--compare', action='store_true',
+                        help="Only print SFDR / ROM size for full vs quarter, with and without dither")
+    parser.add_argument('--print', action='store_true', help="Also print the full table as hex")
+    args = parser.parse_args()
+
+    bits = addr_bits(args.depth)
+    if not 0 <= args.dither <= min(16, PHASE_BITS - bits):
+        parser.error(f"--dither must be 0..{min(16, PHASE_BITS - bits)}")
+
+    if args.compare:
+        print(f"{'mode':<8} {'dither':>6} {'ROM bits':>9} {'SFDR (dBc)':>11} {'SINAD (dB)':>11}")
+        for quarter in (False, True):
+            _, table = build(args.depth, args.width, quarter)
+            for dither in sorted({0, args.dither or 8}):
+                s, snr = sfdr(nco_output(table, dither_bits=dither))
+                print(f"{'quarter' if quarter else 'full':<8} {dither:>6} "
+                      f"{rom_bits(args.depth, args.width, quarter):>9} {s:>11.1f} {snr:>11.1f}")
+        return
+
+    rom, table = build(args.depth, args.width, args.quarter)
+    s, snr = sfdr(nco_output(table, dither_bits=args.dither))
+    print(f"{args.depth} x {args.width} bit, {'quarter-wave' if args.quarter else 'full'} ROM "
+          f"({rom_bits(args.depth, args.width, args.quarter)} bits), dither {args.dither} bit: "
+          f"SFDR {s:.1f} dBc, SINAD {snr:.1f} dB")
+
+    with open(args.vhdl, 'w') as f:
+        f.write(vhdl_package(rom, args.depth, args.width, args.quarter, args.dither))
+    print(f"Written {args.vhdl}")
+    if args.width in NPY_WIDTHS:
+        np.save(args.npy, table.astype(np.uint8 if args.width <= 8 else np.uint16))
+        print(f"Written {args.npy}")
+    else:
+        print(f"Not writing {args.npy}: the Python models support {NPY_WIDTHS.start}-"
+              f"{NPY_WIDTHS.stop - 1} bit tables, they keep using the current one.")
+    if args.print:
+        print_hex(table, args.width)
+
+
+if __name__ == "__main__":
+    main()